@@ -0,0 +1,240 @@
+"""
+Program Analysis:
+
+    Works out what a block program will do without running the sim: how long it takes compared to the 15 second
+    autonomous period, where the robot ends up, which cells it drives through, whether every Shoot block will have
+    a note to shoot, and which parallel groups move or turn the robot from both sides at once.
+
+    The program is followed one cell at a time instead of one tick at a time. The robot stops in front of obstacles,
+    picks up a note it drives onto with the intake on (and nothing in it) and pushes it one cell ahead otherwise,
+    and a shot note lands shotDistance cells ahead. Other robots are ignored, each program is analysed on its own.
+
+    The result of every block and everything after it is kept per starting state (pose, intake, held note, notes
+    left on the field). An edit only clears the blocks above the edited one (invalidate), so analysing the program
+    again after an edit redoes only that path and is cheap enough to do every frame.
+"""
+
+from simField import NOTE, OBSTACLE
+
+tickSeconds = 0.02  # WPILib runs the scheduled commands every 20 ms
+autoSeconds = 15  # length of the autonomous period
+simDuration = 50  # the least ticks a block takes, same as main.simDuration
+shotDistance = 4  # cells a shot note travels, same as ShootObject.distance
+cacheLimit = 16  # starting states kept per block, the oldest are dropped
+# direction (0-right,1-down,2-left,3-up) -> cell steps for forward and strafe
+forwardSteps = ((1, 0), (0, 1), (-1, 0), (0, -1))
+strafeSteps = ((0, 1), (-1, 0), (0, -1), (1, 0))
+moveBlocks = {
+    "MoveForward": (1, 0),
+    "MoveBackward": (-1, 0),
+    "MoveRight": (0, 1),
+    "MoveLeft": (0, -1),
+}
+turnBlocks = {"TurnRight": 1, "TurnLeft": -1}
+
+
+class State:
+    # Where the robot is and what it holds before a block runs, hashable so it can key the cache
+    __slots__ = ("x", "y", "direction", "intake", "held", "notes", "key")
+
+    def __init__(self, x, y, direction, intake, held, notes):
+        self.x = x  # cell
+        self.y = y
+        self.direction = direction % 4
+        self.intake = intake
+        self.held = held  # has a note in it
+        self.notes = notes  # frozenset of the cells that have a note
+        self.key = (x, y, self.direction, intake, held, notes)
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class Result:
+    # What a block and everything after it (up to the end of its group) does from one starting state
+    __slots__ = ("ticks", "state", "cells", "shots", "conflicts", "bumps", "drives")
+
+    def __init__(
+        self, ticks, state, cells, shots=(), conflicts=(), bumps=(), drives=False
+    ):
+        self.ticks = ticks
+        self.state = state  # state after the last block
+        self.cells = cells  # frozenset of cells the robot drove through
+        self.shots = shots  # (Shoot block, had a note) for every shot
+        self.conflicts = conflicts  # parallel groups that drive from both sides
+        self.bumps = bumps  # blocks that ran into an obstacle
+        self.drives = drives  # some block moves or turns the robot
+
+    def then(self, other):
+        # this result followed by another one that starts where this one ended
+        return Result(
+            self.ticks + other.ticks,
+            other.state,
+            self.cells | other.cells,
+            self.shots + other.shots,
+            self.conflicts + other.conflicts,
+            self.bumps + other.bumps,
+            self.drives or other.drives,
+        )
+
+
+class Analysis:
+    # The report for a whole program
+    def __init__(self, result):
+        self.ticks = result.ticks
+        self.seconds = result.ticks * tickSeconds
+        self.overBudget = self.seconds > autoSeconds
+        state = result.state
+        self.pose = (state.x, state.y, state.direction)  # final cell and direction
+        self.cells = result.cells
+        self.emptyShots = [block for block, hadNote in result.shots if not hadNote]
+        self.conflicts = list(result.conflicts)
+        self.bumps = list(result.bumps)
+
+    def problems(self):
+        # messages for everything that will go wrong, empty if nothing will
+        found = []
+        if self.overBudget:
+            found.append(f"Takes {self.seconds:.1f}s, auto is only {autoSeconds}s")
+        if self.emptyShots:
+            found.append(f"{len(self.emptyShots)} Shoot block(s) won't have a note")
+        if self.conflicts:
+            found.append(
+                f"{len(self.conflicts)} ParallelGroup(s) move or turn from both sides"
+            )
+        if self.bumps:
+            found.append(f"{len(self.bumps)} block(s) drive into an obstacle")
+        return found
+
+
+class Analyzer:
+    # Analyses block programs on one field, keeping the results of every block until it is edited
+    def __init__(self):
+        self.cache = {}  # block -> {State: Result}
+        self.obstacles = frozenset()
+        self.notes = frozenset()
+
+    def setField(self, cellSize, kinds, xs, ys):
+        # the obstacles and notes the programs run on, every cached result depends on them
+        cells = [(x // cellSize, y // cellSize) for x, y in zip(xs, ys)]
+        self.obstacles = frozenset(c for c, k in zip(cells, kinds) if k == OBSTACLE)
+        self.notes = frozenset(c for c, k in zip(cells, kinds) if k == NOTE)
+        self.cache = {}
+
+    def invalidate(self, block):
+        # a block was edited or moved, forget it and every block above it
+        self.cache.pop(block, None)
+        for ancestor in block.ancestors:
+            self.cache.pop(ancestor, None)
+
+    def analyse(self, start, x, y, direction):
+        # the report for the program below a Start block, for a robot starting at a cell facing direction
+        state = State(x, y, round(direction), False, False, self.notes)
+        return Analysis(self.chain(start, state))
+
+    def chain(self, block, state):
+        # result of a block and the blocks after it, up to the end of the group it is in
+        if block is None or str(block) in ("EndParallelGroup", "EndLoop"):
+            return Result(0, state, frozenset())
+        results = self.cache.setdefault(block, {})
+        if state in results:
+            return results[state]
+        name = str(block)
+        if name == "ParallelGroup":
+            result = self.parallel(block, state)
+            after = block.otherChild
+        elif name == "Loop":
+            result = Result(0, state, frozenset())
+            if block.children:
+                for _ in range(block.item):
+                    result = result.then(self.chain(block.children[0], result.state))
+            after = block.otherChild
+        else:
+            result = self.block(block, state) if name != "Start" else None
+            after = block.children[0] if block.children else None
+            if result is None:
+                result = Result(0, state, frozenset())
+        result = result.then(self.chain(after, result.state))
+        if len(results) >= cacheLimit:
+            del results[next(iter(results))]
+        results[state] = result
+        return result
+
+    def parallel(self, group, state):
+        # both sides start together, the group takes as long as the longer one
+        # the robot ends up where one side then the other would have put it, speeds add up in the sim
+        result = Result(0, state, frozenset())
+        ticks = 0
+        driving = 0
+        for child in group.children:
+            if str(child) == "EndParallelGroup":
+                continue
+            side = self.chain(child, result.state)
+            ticks = max(ticks, side.ticks)
+            driving += side.drives
+            result = result.then(side)
+        result.ticks = ticks
+        if driving > 1:
+            result.conflicts = (group,) + result.conflicts
+        return result
+
+    def block(self, block, state):
+        # result of one ordinary block
+        name = str(block)
+        x, y, direction = state.x, state.y, state.direction
+        intake, held, notes = state.intake, state.held, state.notes
+        cells = [(x, y)]
+        shots = bumps = ()
+        if name in moveBlocks:
+            ticks = 50 * block.item
+            forward, strafe = moveBlocks[name]
+            fx, fy = forwardSteps[direction]
+            sx, sy = strafeSteps[direction]
+            dx, dy = forward * fx + strafe * sx, forward * fy + strafe * sy
+            for _ in range(block.item):
+                cell = (x + dx, y + dy)
+                if cell in self.obstacles:
+                    bumps = (block,)
+                    break
+                if cell in notes:
+                    if intake and not held:
+                        held = True
+                        notes = notes - {cell}
+                    else:
+                        # pushed one cell ahead, unless something is already there
+                        ahead = (cell[0] + dx, cell[1] + dy)
+                        if ahead in self.obstacles or ahead in notes:
+                            bumps = (block,)
+                            break
+                        notes = (notes - {cell}) | {ahead}
+                x, y = cell
+                cells.append(cell)
+        elif name in turnBlocks:
+            ticks = 45 * block.item
+            direction += turnBlocks[name] * block.item
+        elif name == "IntakeStart":
+            ticks = 1
+            intake = True
+        elif name == "IntakeStop":
+            ticks = 1
+            intake = False
+        elif name == "Shoot":
+            ticks = 50
+            shots = ((block, held),)
+            if held:
+                fx, fy = forwardSteps[direction]
+                notes = notes | {(x + fx * shotDistance, y + fy * shotDistance)}
+                held = False
+        else:
+            return None
+        return Result(
+            max(ticks, simDuration),
+            State(x, y, direction, intake, held, notes),
+            frozenset(cells),
+            shots,
+            bumps=bumps,
+            drives=name in moveBlocks or name in turnBlocks,
+        )
@@ -0,0 +1,368 @@
+"""
+Benchmarks:
+
+    Headless benchmark suite for the block editor and simulator. Runs without a window (SDL dummy video driver)
+    so it can be used on any machine, and writes machine readable results that can be compared between versions.
+
+    python benchmark.py                              run everything, write benchmarkResults.json
+    python benchmark.py --quick                      smaller workloads, for a quick check
+    python benchmark.py --out new.json --compare old.json
+                                                     compare against an earlier run
+    python benchmark.py --filter sim.                only run benchmarks whose name contains "sim."
+
+Workloads:
+
+    linear      a Start block followed by a long chain of ordinary blocks
+    nested      loops nested inside each other with a short body
+    parallel    many parallel groups in a row, each with a few blocks on both sides
+    field       a large simulation field with thousands of obstacles and notes
+    lanes       hundreds of random programs run side by side in the vectorized sim (needs numpy)
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+# assets are loaded relative to the project
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import main  # noqa: E402
+from scheduler import CommandScheduler  # noqa: E402
+from simField import SimField  # noqa: E402
+
+main.init()
+# command() and simCommands() recurse once per block, long programs need more than python's default of 1000
+sys.setrecursionlimit(20000)
+
+SIZES = {
+    "full": {
+        "linear": 1000,
+        "nestedDepth": 12,
+        "parallelGroups": 100,
+        "parallelRows": 5,
+        "field": 2000,
+        "ticks": 2000,
+        "lanes": 500,
+    },
+    "quick": {
+        "linear": 200,
+        "nestedDepth": 6,
+        "parallelGroups": 20,
+        "parallelRows": 3,
+        "field": 300,
+        "ticks": 300,
+        "lanes": 100,
+    },
+}
+
+
+# ---------
+# WORKLOADS
+def centerX():
+    # the x center of the main code area
+    return (
+        main.width - main.sideNav["width"] - main.sideSim["width"]
+    ) // 2 + main.sideNav["width"]
+
+
+def place(block, centerx, y):
+    block.rect.centerx = centerx
+    block.rect.y = y
+    return block
+
+
+def settle(blocks):
+    # link and snap the blocks the same way the editor does after a drop
+    main.dragItems = blocks
+    main.rebuildTree()
+    main.rebuildTree()  # second pass links blocks that only lined up after snapping
+    return main.dragItems
+
+
+def linearProgram(n):
+    # Start followed by n blocks of every ordinary kind
+    kinds = [
+        main.ForwardObject,
+        main.TurnLeftObject,
+        main.RightObject,
+        main.IntakeStartObject,
+        main.BackwardObject,
+        main.TurnRightObject,
+        main.LeftObject,
+        main.IntakeStopObject,
+        main.ShootObject,
+    ]
+    blocks = [main.StartObject()]
+    y = blocks[0].rect.bottom + main.blockSize
+    for i in range(n):
+        blocks.append(place(kinds[i % len(kinds)]((180, 100), (0, 0)), centerX(), y))
+        y += 100 + main.blockSize
+    return settle(blocks)
+
+
+def nestedProgram(depth):
+    # depth loops inside each other, each repeating twice, around a two block body
+    blocks = [main.StartObject()]
+    y = blocks[0].rect.bottom + main.blockSize
+    for i in range(depth):
+        blocks.append(place(main.LoopObject((220, 100), (0, 0)), centerX(), y))
+        y += 100 + main.blockSize
+    for kind in (main.ForwardObject, main.TurnLeftObject):
+        blocks.append(place(kind((180, 100), (0, 0)), centerX(), y))
+        y += 100 + main.blockSize
+    for i in range(depth):
+        blocks.append(place(main.EndLoopObject((260, 100), (0, 0)), centerX(), y))
+        y += 100 + main.blockSize
+    return settle(blocks)
+
+
+def parallelProgram(groups, rows):
+    # groups parallel groups one after another, each with rows blocks on the left and right side
+    area = main.width - main.sideNav["width"] - main.sideSim["width"]
+    leftX = area / 4 + main.sideNav["width"] + 5
+    rightX = area / 4 * 3 + main.sideNav["width"] - 5
+    blocks = [main.StartObject()]
+    y = blocks[0].rect.bottom + main.blockSize
+    for g in range(groups):
+        blocks.append(place(main.ParallelObject((420, 100), (0, 0)), centerX(), y))
+        y += 100 + main.blockSize
+        for r in range(rows):
+            blocks.append(place(main.ForwardObject((180, 100), (0, 0)), leftX, y + 1))
+            blocks.append(place(main.TurnRightObject((180, 100), (0, 0)), rightX, y))
+            y += 100 + main.blockSize
+        blocks.append(place(main.EndParallelObject((420, 100), (0, 0)), centerX(), y))
+        y += 100 + main.blockSize
+    return settle(blocks)
+
+
+def field(count, seed=2869):
+    # a robot in the corner of a field with count obstacles and count notes scattered around it
+    rng = random.Random(seed)
+    side = int((count * 4) ** 0.5) + 2  # keep the field about half empty
+    cells = [(x, y) for x in range(side) for y in range(side) if (x, y) != (0, 0)]
+    rng.shuffle(cells)
+    entities = [("RobotIcon", 0, 0)]
+    entities += [("ObstacleIcon", x, y) for x, y in cells[:count]]
+    entities += [("NoteIcon", x, y) for x, y in cells[count : count * 2]]
+    return SimField.fromEntities(entities, main.simBlockSize)
+
+
+def randomPrograms(lanes, blocks=12, seed=2869):
+    # compiled programs of random ordinary blocks, one per lane of the vectorized sim
+    from vectorSim import blockSegments
+
+    rng = random.Random(seed)
+    names = ["MoveForward", "MoveBackward", "MoveLeft", "MoveRight", "TurnLeft"]
+    names += ["TurnRight", "IntakeStart", "IntakeStop", "Shoot"]
+    programs = []
+    for _ in range(lanes):
+        program = []
+        for _ in range(blocks):
+            program += blockSegments(rng.choice(names), rng.randint(1, 3))
+        programs.append(program)
+    return programs
+
+
+def runTicks(blocks, ticks):
+    # run the program through the command scheduler for at most the given number of frames
+    # returns the frames actually run
+    scheduler = CommandScheduler()
+    scheduler.schedule(blocks[0].simCommands(0)[0])
+    for tick in range(ticks):
+        scheduler.run()
+        if not scheduler.scheduled:
+            return tick + 1
+    return ticks
+
+
+# ---------
+# RUNNER
+def measure(fn, setup, repeats):
+    # runs setup then times fn, repeats times. fn returns the number of operations it did
+    times = []
+    ops = 1
+    for _ in range(repeats):
+        state = setup()
+        begin = time.perf_counter()
+        ops = fn(state) or 1
+        times.append(time.perf_counter() - begin)
+    return {
+        "repeats": repeats,
+        "ops": ops,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "perOpUs": statistics.median(times) / ops * 1_000_000,
+    }
+
+
+def benchmarks(size):
+    # name -> (setup, fn). Workloads are built once and shared, setup only resets what a benchmark changes
+    linear = linearProgram(size["linear"])
+    nested = nestedProgram(size["nestedDepth"])
+    parallel = parallelProgram(size["parallelGroups"], size["parallelRows"])
+    bigField = field(size["field"])
+    smallField = SimField.fromEntities([("RobotIcon", 0, 0)], main.simBlockSize)
+    snapshots = {id(f): f.snapshot() for f in (bigField, smallField)}
+    # frames are drawn offscreen, no window is opened
+    canvas = main.pygame.Surface(main.size)
+
+    def use(blocks, simField):
+        def setup():
+            main.dragItems = blocks
+            main.simField = simField
+            simField.restore(snapshots[id(simField)])
+            return blocks
+
+        return setup
+
+    def findParents(blocks):
+        for i in blocks:
+            i.children = ()
+        for i in blocks:
+            i.findParents()
+        return len(blocks)
+
+    def snapToGrid(blocks):
+        for i in blocks:
+            i.snapToGrid()
+        return len(blocks)
+
+    def command(blocks):
+        return len(blocks[0].command())
+
+    def ticks(blocks):
+        return runTicks(blocks, size["ticks"])
+
+    def collisions(blocks):
+        for _ in range(100):
+            main.simField.checkCollisions(0, 0, 0)
+        return 100
+
+    def frame(blocks):
+        main.drawFrame(canvas)
+        return 1
+
+    def startupImport(state):
+        # a fresh interpreter importing main, what every tool pays before doing anything
+        subprocess.run([sys.executable, "-c", "import main"], check=True)
+        return 1
+
+    def startupInit(state):
+        main.init()
+        return 1
+
+    table = {
+        "startup.import": (lambda: None, startupImport),
+        "startup.init": (lambda: None, startupInit),
+    }
+    for name, blocks in (
+        ("linear", linear),
+        ("nested", nested),
+        ("parallel", parallel),
+    ):
+        table[f"tree.findParents.{name}"] = (use(blocks, smallField), findParents)
+        table[f"tree.snapToGrid.{name}"] = (use(blocks, smallField), snapToGrid)
+        table[f"tree.rebuild.{name}"] = (
+            use(blocks, smallField),
+            lambda b: main.rebuildTree() or len(b),
+        )
+        table[f"codegen.command.{name}"] = (use(blocks, smallField), command)
+        table[f"sim.runSim.{name}"] = (use(blocks, smallField), ticks)
+    table["sim.runSim.field"] = (use(linear, bigField), ticks)
+    table["sim.collisions.field"] = (use(linear, bigField), collisions)
+    table["sim.reset.field"] = (
+        use(linear, bigField),
+        lambda b: bigField.restore(snapshots[id(bigField)]) or len(bigField),
+    )
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        pass  # the vectorized sim needs numpy, skip it without
+    else:
+        from vectorSim import VectorSim
+
+        programs = randomPrograms(size["lanes"])
+        table["sim.vector.lanes"] = (
+            lambda: bigField.restore(snapshots[id(bigField)])
+            or VectorSim(bigField, programs),
+            lambda sim: sim.run() * sim.lanes,
+        )
+    table["render.frame.linear"] = (use(linear, smallField), frame)
+    table["render.frame.field"] = (use(linear, bigField), frame)
+    return table
+
+
+def metadata(sizeName):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": main.pygame.version.ver,
+        "platform": platform.platform(),
+        "size": sizeName,
+        "fieldItems": SIZES[sizeName]["field"] * 2 + 1,
+        "fieldBytes": field(SIZES[sizeName]["field"]).nbytes(),
+    }
+
+
+def compare(old, new):
+    # prints the change in median time of every benchmark in both result files
+    print(f"{'benchmark':<32}{'old ms':>10}{'new ms':>10}{'change':>9}")
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before = old["results"][name]["median"] * 1000
+        after = result["median"] * 1000
+        change = (after / before - 1) * 100 if before else 0.0
+        print(f"{name:<32}{before:>10.3f}{after:>10.3f}{change:>+8.1f}%")
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Headless FRCBlocks benchmarks")
+    parser.add_argument("--quick", action="store_true", help="use the small workloads")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks containing this text"
+    )
+    parser.add_argument("--out", default="benchmarkResults.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    sizeName = "quick" if args.quick else "full"
+    main.simDelay = -1  # blocks normally wait 0.1s of wall time between each other
+    results = {}
+    for name, (setup, fn) in benchmarks(SIZES[sizeName]).items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(fn, setup, args.repeats)
+        print(f"{name:<32}{results[name]['median'] * 1000:>10.3f} ms")
+    output = {"meta": metadata(sizeName), "results": results}
+    with open(args.out, "w") as file:
+        json.dump(output, file, indent=2)
+    print(f"Wrote {args.out}")
+    if args.compare:
+        with open(args.compare, "r") as file:
+            compare(json.load(file), output)
+
+
+if __name__ == "__main__":
+    run()
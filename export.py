@@ -0,0 +1,189 @@
+"""
+Frame Export:
+
+    Turns recorded runs (replays/*.replay) into clips without watching them: every frame of the sim pane (grid,
+    robots, notes and obstacles) is drawn offscreen and saved as a PNG sequence or a GIF.
+
+    python export.py replays/*.replay                  one folder of PNGs per run in clips/
+    python export.py replays/*.replay --gif --every 2  one GIF per run, every other tick (25 frames a second)
+    python export.py run.replay --out teamA --workers 4
+
+    The work is spread over a pool of processes: a run is cut into pieces of chunkTicks ticks for PNGs, and each
+    GIF is one piece, so many runs export at once. Every process opens the recordings itself (they are memory
+    mapped) and draws with its own pygame, nothing but file names, tick numbers and the size of the picture is sent
+    between processes. The size is found once per run, from every tick of it, so nothing leaves the picture and the
+    view doesn't move during the clip.
+
+    GIFs need Pillow (pip install pillow), PNGs only need pygame.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+
+from main import SimView  # noqa: E402
+from replay import ReplayReader  # noqa: E402
+from simField import SimField  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+chunkTicks = 100  # ticks per PNG job
+margin = 2  # cells drawn around the items
+background = (224, 191, 92)  # same as the sim pane
+gridColor = (255, 255, 255)
+
+
+def recordingBounds(filename):
+    # (left, top, right, bottom) of the field as far as anything went in a recording, with margin cells around it
+    reader = ReplayReader(filename)
+    cs = reader.cellSize
+    left = top = right = bottom = None
+    for tick in range(reader.ticks):
+        # playing forward only decodes the changes of each tick
+        frame = reader.frame(tick)
+        if not frame.x:
+            continue
+        xs = (min(frame.x), max(frame.x))
+        ys = (min(frame.y), max(frame.y))
+        if left is None:
+            left, right = xs
+            top, bottom = ys
+        else:
+            left, right = min(left, xs[0]), max(right, xs[1])
+            top, bottom = min(top, ys[0]), max(bottom, ys[1])
+    reader.close()
+    if left is None:
+        left = top = right = bottom = 0
+    return (
+        (left // cs - margin) * cs,
+        (top // cs - margin) * cs,
+        (right // cs + margin + 1) * cs,
+        (bottom // cs + margin + 1) * cs,
+    )
+
+
+class FrameRenderer:
+    # Draws frames of one recording onto an offscreen surface the size of its bounds (recordingBounds)
+    def __init__(self, reader, bounds):
+        self.reader = reader
+        cs = reader.cellSize
+        self.left, self.top, right, bottom = bounds
+        self.surface = pygame.Surface((right - self.left, bottom - self.top))
+        self.grid = self.surface.copy()
+        self.grid.fill(background)
+        for x in range(0, self.grid.get_width(), cs):
+            for y in range(0, self.grid.get_height(), cs):
+                pygame.draw.rect(self.grid, gridColor, pygame.Rect(x, y, cs, cs), 1)
+        self.field = SimField(cs)
+        self.view = SimView()
+
+    def render(self, tick):
+        # the surface with the field at a tick, reused by the next call
+        self.field.restore(self.reader.frame(tick).snapshot())
+        self.surface.blit(self.grid, (0, 0))
+        width, height = self.surface.get_size()
+        self.view.draw(self.surface, self.field, -self.left, -self.top, width, height)
+        return self.surface
+
+
+def startWorker(project):
+    # runs once in every process of the pool, images are loaded relative to the project
+    os.chdir(project)
+
+
+def exportPngs(filename, bounds, folder, start, end, every):
+    # one PNG per frame for the ticks start to end, returns the number of frames written
+    reader = ReplayReader(filename)
+    renderer = FrameRenderer(reader, bounds)
+    written = 0
+    for tick in range(start, min(end, reader.ticks), every):
+        surface = renderer.render(tick)
+        pygame.image.save(surface, os.path.join(folder, f"frame{tick // every:05}.png"))
+        written += 1
+    reader.close()
+    return written
+
+
+def exportGif(filename, bounds, output, every):
+    # the whole run as one GIF, returns the number of frames written
+    reader = ReplayReader(filename)
+    renderer = FrameRenderer(reader, bounds)
+    images = []
+    for tick in range(0, reader.ticks, every):
+        surface = renderer.render(tick)
+        image = Image.frombytes(
+            "RGB", surface.get_size(), pygame.image.tobytes(surface, "RGB")
+        )
+        images.append(image.quantize(colors=64))
+    reader.close()
+    images[0].save(
+        output,
+        save_all=True,
+        append_images=images[1:],
+        duration=20 * every,  # WPILib's 20 ms tick
+        loop=0,
+    )
+    return len(images)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export recorded runs as frames")
+    parser.add_argument("replays", nargs="+", help="replay files")
+    parser.add_argument("--out", default="clips", help="folder to write into")
+    parser.add_argument("--gif", action="store_true", help="one GIF per run")
+    parser.add_argument("--every", type=int, default=1, help="ticks per frame")
+    parser.add_argument("--workers", type=int, default=None, help="processes")
+    args = parser.parse_args()
+    if args.gif and Image is None:
+        parser.error("GIFs need Pillow (pip install pillow), or leave out --gif")
+    project = os.path.dirname(os.path.abspath(__file__))
+    out = os.path.abspath(args.out)
+    every = max(args.every, 1)
+    began = time.perf_counter()
+    jobs = []
+    with ProcessPoolExecutor(
+        args.workers, initializer=startWorker, initargs=(project,)
+    ) as pool:
+        filenames = [os.path.abspath(filename) for filename in args.replays]
+        # the bounds of every run are found at once, then its frames are drawn
+        bounds = [pool.submit(recordingBounds, filename) for filename in filenames]
+        for filename, found in zip(filenames, bounds):
+            found = found.result()
+            name = os.path.splitext(os.path.basename(filename))[0]
+            if args.gif:
+                os.makedirs(out, exist_ok=True)
+                output = os.path.join(out, name + ".gif")
+                jobs.append(pool.submit(exportGif, filename, found, output, every))
+                continue
+            reader = ReplayReader(filename)
+            ticks = reader.ticks
+            reader.close()
+            folder = os.path.join(out, name)
+            os.makedirs(folder, exist_ok=True)
+            # pieces start on a frame so every piece keeps the same spacing
+            step = max(chunkTicks // every, 1) * every
+            for start in range(0, ticks, step):
+                jobs.append(
+                    pool.submit(
+                        exportPngs, filename, found, folder, start, start + step, every
+                    )
+                )
+        frames = sum(job.result() for job in jobs)
+    print(
+        f"Wrote {frames} frames of {len(args.replays)} run(s) to {out} "
+        f"in {time.perf_counter() - began:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
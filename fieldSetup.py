@@ -0,0 +1,152 @@
+"""
+Field Setup Files:
+
+    Reads the simulation field (simSetup.txt) one line at a time. Three kinds of lines can be mixed in one file:
+
+    Entity lines, one entity per line (the original format)
+
+        RobotIcon,6,7
+        NoteIcon,5,6
+
+    Grid sections, one character per cell. The section starts at `@grid x,y` (top left corner, default 0,0)
+    and ends at `@end`, the next section or the end of the file
+
+        @grid 0,0
+        ..N..
+        .#R#.
+
+    Run length sections, like a grid but each character can have a count in front of it, so empty space and long
+    walls stay short
+
+        @rle 0,0
+        40.
+        3.12#3.N
+
+    In grids R is the robot, N a note, # or O an obstacle, and . - or space an empty cell. Lines starting with //
+    are comments. Errors don't stop the parse, every bad line is collected and reported together with its number.
+"""
+
+legend = {"R": "RobotIcon", "N": "NoteIcon", "#": "ObstacleIcon", "O": "ObstacleIcon"}
+emptyCells = ".- "
+
+
+class FieldSetupError(Exception):
+    # Raised once the whole file has been read if any line had a problem
+    def __init__(self, filename, errors):
+        self.filename = filename
+        self.errors = errors  # list of (line number, message)
+        super().__init__(
+            "\n".join(f"{filename}:{line}: {message}" for line, message in errors)
+        )
+
+
+def parseOrigin(text, lineNo, errors):
+    # reads the optional "x,y" after a section name
+    if not text:
+        return 0, 0
+    parts = text.split(",")
+    try:
+        return int(parts[0]), int(parts[1])
+    except (ValueError, IndexError):
+        errors.append((lineNo, f"section origin should be x,y not '{text}'"))
+        return 0, 0
+
+
+def iterGridRow(row, x, y, lineNo, errors):
+    # yields the entities of one row of a grid section
+    for ch in row:
+        if ch not in emptyCells:
+            name = legend.get(ch)
+            if name:
+                yield name, x, y
+            else:
+                errors.append((lineNo, f"unknown grid character '{ch}'"))
+        x += 1
+
+
+def iterRleRow(row, x, y, lineNo, errors):
+    # yields the entities of one row of a run length section, empty runs are skipped without being expanded
+    count = 0
+    for ch in row:
+        if ch.isdigit():
+            count = count * 10 + int(ch)
+            continue
+        run = count if count else 1
+        count = 0
+        if ch in emptyCells:
+            x += run
+            continue
+        name = legend.get(ch)
+        if not name:
+            errors.append((lineNo, f"unknown grid character '{ch}'"))
+            x += run
+            continue
+        for _ in range(run):
+            yield name, x, y
+            x += 1
+    if count:
+        errors.append((lineNo, f"run length {count} is missing its character"))
+
+
+def iterField(lines, names=None, errors=None):
+    # yields (name, x, y) for every entity in the lines, in file order
+    # names is the collection of allowed entity names, problems are appended to errors as (line number, message)
+    if errors is None:
+        errors = []
+    section = None  # None, "grid" or "rle"
+    originX, originY, row = 0, 0, 0
+    for lineNo, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+        if stripped.startswith("//"):
+            continue
+        if stripped.startswith("@"):
+            word, _, rest = stripped[1:].partition(" ")
+            if word in ("grid", "rle"):
+                section = word
+                originX, originY = parseOrigin(rest.strip(), lineNo, errors)
+                row = 0
+            elif word == "end":
+                section = None
+            else:
+                errors.append((lineNo, f"unknown section '@{word}'"))
+            continue
+        if section == "grid":
+            yield from iterGridRow(line, originX, originY + row, lineNo, errors)
+            row += 1
+            continue
+        if section == "rle":
+            yield from iterRleRow(stripped, originX, originY + row, lineNo, errors)
+            row += 1
+            continue
+        if not stripped:
+            continue
+        parts = stripped.split(",")
+        if len(parts) < 3:
+            errors.append(
+                (lineNo, "lines should have 3 items separated by commas: Name,x,y")
+            )
+            continue
+        name = parts[0].strip()
+        if names is not None and name not in names:
+            errors.append((lineNo, f"'{name}' is not a sim item name"))
+            continue
+        try:
+            yield name, int(parts[1]), int(parts[2])
+        except ValueError:
+            errors.append(
+                (
+                    lineNo,
+                    f"position should be whole numbers, not '{parts[1].strip()},{parts[2].strip()}'",
+                )
+            )
+
+
+def readField(filename, names=None):
+    # reads every entity in the file, raising FieldSetupError with all the problems if there were any
+    errors = []
+    with open(filename, "r") as file:
+        entities = list(iterField(file, names, errors))
+    if errors:
+        raise FieldSetupError(filename, errors)
+    return entities
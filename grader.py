@@ -0,0 +1,690 @@
+"""
+Grading Server:
+
+    For events: every student sends their program from their own laptop (F7 in the editor) to one machine, which
+    runs them all headlessly on the same field and keeps a live leaderboard. Everything stays on the local network,
+    the leaderboard page doesn't load anything from the internet.
+
+    python grader.py serve                              grade on simSetup.txt, port 8765
+    python grader.py serve field.txt --robot 2 --workers 4
+    python grader.py submit program.json --name teamA   send a program and wait for its result
+    python grader.py load --clients 50                  stand-in for a class: 50 random programs at once
+
+    Open http://<mentor's laptop>:8765/ for the leaderboard. The editors find the server through the FRCBLOCKS_GRADER
+    environment variable (http://localhost:8765 if it isn't set) and send the name in FRCBLOCKS_NAME (the computer's
+    name if it isn't set).
+
+    POST /submit               {"name": ..., "program": [...]}, answers {"id": ..., "position": ...}
+    GET  /submissions/<id>     the state of one submission
+    GET  /leaderboard          the best result of every name
+    GET  /live?id=<id>         WebSocket: the state of everything (or of one submission), then every change as it
+                               happens (queued, progress, result, leaderboard)
+
+    A program is a list of entries (programs.py), loops and parallel groups hold lists of entries:
+    [["MoveForward", 2], ["Loop", 3, [["TurnLeft", 1], ["Shoot", 1]]], ["ParallelGroup", [...], [...]]]
+
+    Submissions wait in a queue, and workers (one thread each) take up to batchSize of them at a time and run them
+    as the lanes of one vectorized sim (vectorSim.py), so the number of programs running at once is bounded by
+    workers * batchSize however many students send at the same time. A run stops at the end of auto. The best
+    result shoots the most notes, then finishes first, then bumps the fewest times.
+
+    Grading needs numpy (pip install numpy), sending programs from the editor doesn't.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from analysis import autoSeconds, tickSeconds
+
+port = 8765
+defaultUrl = f"http://localhost:{port}"
+workers = 2  # batches graded at once
+batchSize = 16  # submissions per batch, one lane each
+queueLimit = 500  # submissions waiting, more are turned away
+progressTicks = 50  # ticks between progress updates
+maxTicks = round(autoSeconds / tickSeconds)
+maxBody = 256 * 1024  # bytes of a submission
+maxDepth = 20  # loops and groups inside each other
+nameLength = 40
+ordinaryBlocks = (
+    "MoveForward",
+    "MoveBackward",
+    "MoveLeft",
+    "MoveRight",
+    "TurnLeft",
+    "TurnRight",
+    "IntakeStart",
+    "IntakeStop",
+    "Shoot",
+)
+websocketGuid = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+statusTexts = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+# ---------
+# PROGRAMS
+def checkEntries(entries, depth=0):
+    # raises ValueError if entries aren't a program the editor could have made
+    if not isinstance(entries, list):
+        raise ValueError("a program is a list of blocks")
+    if depth > maxDepth:
+        raise ValueError(f"blocks are nested more than {maxDepth} deep")
+    for entry in entries:
+        if not isinstance(entry, list) or not entry or not isinstance(entry[0], str):
+            raise ValueError(f"not a block: {entry!r}"[:100])
+        name = entry[0]
+        if name == "ParallelGroup":
+            if not 1 <= len(entry) <= 3:
+                raise ValueError("a ParallelGroup has one or two sides")
+            for side in entry[1:]:
+                checkEntries(side, depth + 1)
+            continue
+        if name not in ordinaryBlocks and name != "Loop":
+            raise ValueError(f"unknown block {name!r}"[:100])
+        if len(entry) != (3 if name == "Loop" else 2):
+            raise ValueError(f"wrong number of values for {name}")
+        item = entry[1]
+        if not isinstance(item, int) or isinstance(item, bool) or not 1 <= item <= 10:
+            raise ValueError(f"{name} needs a number from 1 to 10")
+        if name == "Loop":
+            checkEntries(entry[2], depth + 1)
+
+
+def randomEntries(rng, blocks=12):
+    # a random program, for the stand-in class
+    entries = [[rng.choice(ordinaryBlocks), rng.randint(1, 3)] for _ in range(blocks)]
+    if rng.random() < 0.3:
+        entries.insert(rng.randrange(blocks), ["Loop", rng.randint(2, 4), entries[:3]])
+    return entries
+
+
+class Submission:
+    # One program sent to the server and what became of it
+    def __init__(self, number, name, entries):
+        self.number = number
+        self.name = name
+        self.entries = entries
+        self.state = "queued"  # queued, running, done or failed
+        self.tick = 0  # how far the run has got
+        self.result = None
+        self.error = None
+
+    def status(self):
+        return {
+            "type": "status",
+            "id": self.number,
+            "name": self.name,
+            "state": self.state,
+            "tick": self.tick,
+            "ticks": maxTicks,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+# ---------
+# SERVER
+class GradingServer:
+    # The queue, the workers and everyone watching, all on one asyncio loop
+    def __init__(self, field, robot, workerCount=workers, batch=batchSize):
+        self.field = field
+        self.robot = robot  # row of the robot on the field
+        self.workerCount = workerCount
+        self.batch = batch
+        self.queue = asyncio.Queue(queueLimit)
+        self.submissions = {}  # id -> Submission
+        self.best = {}  # name -> best result
+        # websocket writer -> submission id it watches, None for everything
+        self.watchers = {}
+        self.pool = ThreadPoolExecutor(workerCount, thread_name_prefix="grader")
+
+    async def serve(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        tasks = [asyncio.create_task(self.work()) for _ in range(self.workerCount)]
+        server = await asyncio.start_server(self.handle, host, port, backlog=256)
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # grading
+    async def work(self):
+        # one worker: takes a batch from the queue and grades it on a thread
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            for submission in batch:
+                submission.state = "running"
+                self.publish(submission.status(), submission.number)
+            try:
+                await self.loop.run_in_executor(self.pool, self.grade, batch)
+            except Exception as error:
+                for submission in batch:
+                    if submission.state == "running":
+                        self.fail(submission, f"Grading failed: {error}")
+            for _ in batch:
+                self.queue.task_done()
+
+    def grade(self, batch):
+        # grader thread: runs every submission of a batch as a lane of one sim, until all are done or auto is over
+        from vectorSim import VectorSim, compileEntries
+
+        programs = [compileEntries(s.entries, maxTicks) for s in batch]
+        sim = VectorSim(self.field, programs, self.robot)
+        reported = [False] * len(batch)
+        while True:
+            sim.run(min(progressTicks, maxTicks - sim.tick))
+            over = sim.tick >= maxTicks
+            done = sim.done()
+            results = sim.results()
+            finished = []
+            for lane, submission in enumerate(batch):
+                if not reported[lane] and (done[lane] or over):
+                    reported[lane] = True
+                    finished.append((submission, results[lane]))
+            self.loop.call_soon_threadsafe(self.progress, batch, sim.tick, finished)
+            if over or done.all():
+                return
+
+    def progress(self, batch, tick, finished):
+        # loop thread: publishes how far a batch has got and the results of the lanes that finished
+        for submission, lane in finished:
+            self.finish(submission, lane)
+        for submission in batch:
+            if submission.state == "running":
+                submission.tick = tick
+                self.publish(
+                    {"type": "progress", "id": submission.number, "tick": tick},
+                    submission.number,
+                )
+
+    def finish(self, submission, lane):
+        finishedTick = lane["finishedTick"]
+        result = {
+            "notes": lane["shots"],
+            "seconds": round(
+                (finishedTick + 1) * tickSeconds if finishedTick >= 0 else autoSeconds,
+                2,
+            ),
+            "finished": finishedTick >= 0,
+            "bumps": lane["bumps"],
+            "pose": [lane["x"], lane["y"], lane["direction"]],
+        }
+        submission.result = result
+        submission.state = "done"
+        submission.tick = maxTicks if finishedTick < 0 else finishedTick + 1
+        best = self.best.get(submission.name)
+        result["best"] = best is None or self.score(result) < self.score(best)
+        if result["best"]:
+            self.best[submission.name] = dict(result, id=submission.number)
+        result["rank"] = self.rank(submission.name)
+        self.publish(submission.status(), submission.number)
+        if result["best"]:
+            self.publish({"type": "leaderboard", "leaderboard": self.leaderboard()})
+
+    def fail(self, submission, error):
+        submission.state = "failed"
+        submission.error = error
+        self.publish(submission.status(), submission.number)
+
+    def score(self, result):
+        # smaller is better
+        return (-result["notes"], result["seconds"], result["bumps"])
+
+    def leaderboard(self):
+        board = sorted(self.best.items(), key=lambda item: self.score(item[1]))
+        return [
+            {
+                "name": name,
+                "notes": best["notes"],
+                "seconds": best["seconds"],
+                "bumps": best["bumps"],
+                "id": best["id"],
+            }
+            for name, best in board
+        ]
+
+    def rank(self, name):
+        # place of a name on the leaderboard, 1 is the best
+        mine = self.score(self.best[name])
+        return 1 + sum(self.score(best) < mine for best in self.best.values())
+
+    def submit(self, data):
+        # a new submission from a request body, returns (status, answer)
+        try:
+            data = json.loads(data)
+            if not isinstance(data, dict):
+                raise ValueError('send {"name": ..., "program": [...]}')
+            name = str(data.get("name") or "anonymous").strip()[:nameLength]
+            checkEntries(data.get("program"))
+        except (ValueError, RecursionError) as error:
+            return 400, {"error": str(error)}
+        if self.queue.full():
+            return 503, {"error": "Too many programs waiting, try again soon"}
+        submission = Submission(len(self.submissions) + 1, name, data["program"])
+        self.submissions[submission.number] = submission
+        self.queue.put_nowait(submission)
+        position = self.queue.qsize()
+        self.publish(
+            {
+                "type": "queued",
+                "id": submission.number,
+                "name": name,
+                "position": position,
+            },
+            submission.number,
+        )
+        return 202, {"id": submission.number, "position": position}
+
+    # HTTP
+    async def handle(self, reader, writer):
+        try:
+            method, target, headers = await readHead(reader)
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+            if (
+                url.path == "/live"
+                and headers.get("upgrade", "").lower() == "websocket"
+            ):
+                watch = query.get("id", [None])[0]
+                await self.live(reader, writer, headers, int(watch) if watch else None)
+                return
+            length = int(headers.get("content-length", 0))
+            if length > maxBody:
+                await respond(writer, 413, {"error": "Program too large"})
+                return
+            body = await reader.readexactly(length) if length else b""
+            await self.route(writer, method, url.path, body)
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, writer, method, path, body):
+        if method == "POST" and path == "/submit":
+            await respond(writer, *self.submit(body))
+        elif method == "GET" and path == "/leaderboard":
+            await respond(writer, 200, self.leaderboard())
+        elif method == "GET" and path.startswith("/submissions/"):
+            submission = self.submissions.get(intOrNone(path.rsplit("/", 1)[1]))
+            if submission:
+                await respond(writer, 200, submission.status())
+            else:
+                await respond(writer, 404, {"error": "No such submission"})
+        elif method == "GET" and path in ("/", "/index.html"):
+            await respond(writer, 200, leaderboardPage, "text/html; charset=utf-8")
+        else:
+            await respond(writer, 404, {"error": "Not found"})
+
+    # WebSocket
+    async def live(self, reader, writer, headers, watch):
+        # sends the state of everything (or of one submission) and then every change, until the client closes
+        key = headers.get("sec-websocket-key", "")
+        accept = hashlib.sha1((key + websocketGuid).encode()).digest()
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: "
+            + base64.b64encode(accept)
+            + b"\r\n\r\n"
+        )
+        if watch is None:
+            writer.write(
+                frame({"type": "leaderboard", "leaderboard": self.leaderboard()})
+            )
+            for submission in list(self.submissions.values())[-50:]:
+                writer.write(frame(submission.status()))
+        elif watch in self.submissions:
+            writer.write(frame(self.submissions[watch].status()))
+        else:
+            writer.write(frame({"type": "error", "error": "No such submission"}))
+        self.watchers[writer] = watch
+        try:
+            await writer.drain()
+            while True:
+                opcode, payload = await readFrame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(frame(payload, 0x8))
+                    await writer.drain()
+                    return
+                if opcode == 0x9:  # ping
+                    writer.write(frame(payload, 0xA))
+        finally:
+            self.watchers.pop(writer, None)
+
+    def publish(self, event, number=None):
+        # sends an event to everyone watching everything and to whoever watches its submission
+        data = None
+        for writer, watch in list(self.watchers.items()):
+            if watch is not None and watch != number:
+                continue
+            if writer.is_closing():
+                self.watchers.pop(writer, None)
+                continue
+            if writer.transport.get_write_buffer_size() > maxBody:
+                continue  # a watcher that doesn't read misses updates instead of filling memory
+            data = data or frame(event)
+            writer.write(data)
+
+
+def intOrNone(text):
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+async def readHead(reader):
+    # (method, target, lowercase headers) of an HTTP request
+    first = (await reader.readline()).decode("latin-1").split()
+    if len(first) != 3:
+        raise ValueError("bad request line")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+        if len(headers) > 100:
+            raise ValueError("too many headers")
+    return first[0], first[1], headers
+
+
+async def respond(writer, status, answer, contentType="application/json"):
+    body = answer if isinstance(answer, str) else json.dumps(answer)
+    body = body.encode()
+    writer.write(
+        f"HTTP/1.1 {status} {statusTexts[status]}\r\nContent-Type: {contentType}\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+
+def frame(payload, opcode=0x1, mask=False):
+    # one WebSocket frame, events are sent as JSON text, clients have to mask theirs
+    if isinstance(payload, (dict, list)):
+        payload = json.dumps(payload)
+    if isinstance(payload, str):
+        payload = payload.encode()
+    length = len(payload)
+    maskBit = 0x80 if mask else 0
+    if length < 126:
+        head = struct.pack("!BB", 0x80 | opcode, maskBit | length)
+    elif length < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, maskBit | 126, length)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, maskBit | 127, length)
+    if mask:
+        key = os.urandom(4)
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+        head += key
+    return head + payload
+
+
+async def readFrame(reader):
+    # (opcode, payload) of the next WebSocket frame
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > maxBody:
+        raise ValueError("frame too large")
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if key:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return first & 0x0F, payload
+
+
+# ---------
+# CLIENT
+async def request(url, method, path, data=None):
+    # (status, answer) of a plain HTTP request
+    address = urlsplit(url)
+    reader, writer = await asyncio.open_connection(address.hostname, address.port or 80)
+    body = json.dumps(data).encode() if data is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {address.netloc}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = None
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    answer = await (reader.readexactly(length) if length is not None else reader.read())
+    writer.close()
+    return status, json.loads(answer)
+
+
+async def watch(url, number):
+    # yields the events of one submission until it is done or failed
+    address = urlsplit(url)
+    reader, writer = await asyncio.open_connection(address.hostname, address.port or 80)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        f"GET /live?id={number} HTTP/1.1\r\nHost: {address.netloc}\r\n"
+        f"Upgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+        f"Sec-WebSocket-Version: 13\r\n\r\n".encode()
+    )
+    await writer.drain()
+    try:
+        if b" 101 " not in await reader.readline():
+            raise ConnectionError("The grader didn't open a live connection")
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        while True:
+            opcode, payload = await readFrame(reader)
+            if opcode == 0x8:
+                raise ConnectionError("The grader closed the connection")
+            if opcode != 0x1:
+                continue
+            event = json.loads(payload)
+            yield event
+            if event.get("state") in ("done", "failed") or event["type"] == "error":
+                writer.write(frame(b"", 0x8, mask=True))
+                return
+    finally:
+        writer.close()
+
+
+async def submitProgram(url, name, entries, onEvent=None, timeout=120):
+    # sends a program and waits for its result, onEvent(event) is called for every event on the way
+    # returns the finished status, raises ConnectionError if the grader refused it or failed
+    status, answer = await asyncio.wait_for(
+        request(url, "POST", "/submit", {"name": name, "program": entries}), timeout
+    )
+    if status != 202:
+        raise ConnectionError(answer.get("error", f"The grader answered {status}"))
+
+    async def follow():
+        async for event in watch(url, answer["id"]):
+            if onEvent:
+                onEvent(event)
+            if event["type"] == "error" or event.get("state") == "failed":
+                raise ConnectionError(event.get("error") or "Grading failed")
+            if event.get("state") == "done":
+                return event
+
+    return await asyncio.wait_for(follow(), timeout)
+
+
+def defaultName():
+    return os.environ.get("FRCBLOCKS_NAME") or socket.gethostname()
+
+
+async def standInClass(url, clients, seed=2869):
+    # clients students sending a random program each at the same time, returns their final statuses
+    rng = random.Random(seed)
+    programs = [randomEntries(rng) for _ in range(clients)]
+    return await asyncio.gather(
+        *[
+            submitProgram(url, f"student{i + 1}", program)
+            for i, program in enumerate(programs)
+        ]
+    )
+
+
+leaderboardPage = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>FRCBlocks Leaderboard</title>
+<style>
+body { font-family: sans-serif; background: #a0a5c8; margin: 2em; }
+table { border-collapse: collapse; background: white; min-width: 40em; margin-bottom: 2em; }
+th, td { padding: 0.4em 1em; text-align: left; border-bottom: 1px solid #ccc; }
+progress { width: 10em; }
+</style></head>
+<body>
+<h1>Leaderboard</h1>
+<table><thead><tr><th>#</th><th>Name</th><th>Notes</th><th>Seconds</th><th>Bumps</th></tr></thead>
+<tbody id="board"></tbody></table>
+<h2>Submissions</h2>
+<table><thead><tr><th>Id</th><th>Name</th><th>State</th><th>Progress</th></tr></thead>
+<tbody id="runs"></tbody></table>
+<script>
+const runs = new Map();
+function cell(row, text) { row.insertCell().textContent = text; }
+function showBoard(board) {
+  const body = document.getElementById("board");
+  body.replaceChildren();
+  board.forEach((entry, i) => {
+    const row = body.insertRow();
+    [i + 1, entry.name, entry.notes, entry.seconds, entry.bumps].forEach(t => cell(row, t));
+  });
+}
+function showRun(event) {
+  let row = runs.get(event.id);
+  if (!row) {
+    row = document.getElementById("runs").insertRow(0);
+    for (let i = 0; i < 4; i++) row.insertCell();
+    row.cells[3].appendChild(document.createElement("progress"));
+    runs.set(event.id, row);
+  }
+  row.cells[0].textContent = event.id;
+  if (event.name) row.cells[1].textContent = event.name;
+  if (event.state) row.cells[2].textContent = event.result
+    ? `${event.result.notes} notes in ${event.result.seconds}s` : event.state;
+  if (event.type === "queued") row.cells[2].textContent = "queued";
+  const bar = row.cells[3].firstChild;
+  bar.max = event.ticks || bar.max || 1;
+  if (event.tick !== undefined) bar.value = event.tick;
+}
+function connect() {
+  const socket = new WebSocket(`ws://${location.host}/live`);
+  socket.onmessage = message => {
+    const event = JSON.parse(message.data);
+    if (event.type === "leaderboard") showBoard(event.leaderboard);
+    else if (event.id !== undefined) showRun(event);
+  };
+  socket.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+</script>
+</body></html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Grade block programs sent over the network"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the grading server")
+    serve.add_argument("field", nargs="?", default="simSetup.txt")
+    serve.add_argument(
+        "--robot", type=int, default=1, help="which robot, 1 is the first"
+    )
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=port)
+    serve.add_argument("--workers", type=int, default=workers)
+    serve.add_argument("--batch", type=int, default=batchSize)
+    submit = commands.add_parser("submit", help="send a program (a JSON file)")
+    submit.add_argument("program")
+    submit.add_argument("--name", default=None)
+    submit.add_argument("--url", default=defaultUrl)
+    load = commands.add_parser("load", help="send random programs all at once")
+    load.add_argument("--clients", type=int, default=50)
+    load.add_argument("--url", default=defaultUrl)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            import vectorSim  # noqa: F401
+        except ImportError:
+            parser.error("Grading needs numpy (pip install numpy)")
+        from fieldSetup import readField
+        from simField import SimField, kindCodes
+
+        field = SimField.fromEntities(readField(args.field, kindCodes))
+        robots = field.robots()
+        if not 1 <= args.robot <= len(robots):
+            parser.error(f"{args.field} has {len(robots)} robot(s)")
+        server = GradingServer(field, robots[args.robot - 1], args.workers, args.batch)
+        print(
+            f"Grading on {args.field}, leaderboard at http://{socket.gethostname()}:{args.port}/"
+        )
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.command == "submit":
+        with open(args.program) as file:
+            entries = json.load(file)
+
+        def show(event):
+            if event["type"] == "progress":
+                print(f"\r{event['tick'] * tickSeconds:.1f}s", end="", flush=True)
+
+        status = asyncio.run(
+            submitProgram(args.url, args.name or defaultName(), entries, show)
+        )
+        result = status["result"]
+        print(
+            f"\r{result['notes']} notes in {result['seconds']}s, {result['bumps']} bumps, "
+            f"#{result['rank']} on the leaderboard"
+        )
+        return 0
+
+    began = time.perf_counter()
+    statuses = asyncio.run(standInClass(args.url, args.clients))
+    seconds = time.perf_counter() - began
+    notes = sum(status["result"]["notes"] for status in statuses)
+    print(
+        f"{len(statuses)} programs graded in {seconds:.2f}s "
+        f"({len(statuses) / seconds:.1f} a second), {notes} notes shot"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""
+Undo History:
+
+    Undo and redo for the block programs. Every step is a snapshot of the programs: for each block, the block
+    itself, the block it hangs from, its position from that block (from the code area without one) and its item.
+    Snapshots are stored in chunks of records, and a chunk that didn't change since the previous step is shared with
+    it instead of copied, so a step only costs memory for the chunks the change touched. Chunks end after the blocks
+    whose hash picks them (about one in chunkSize), not every chunkSize records, and positions are kept from the
+    block above, so a block put in the middle of a program only changes the chunk it lands in, not every chunk after
+    it. Deleted blocks stay alive in the records, so undoing a delete brings back the same block.
+
+    The history is capped at `limit` bytes (estimated), the oldest steps are dropped first.
+"""
+
+import sys
+from collections import deque
+
+chunkSize = 32  # records per chunk on average
+maxChunk = 4 * chunkSize  # a chunk ends here even if no block picked the end
+
+
+def chunkBytes(chunk):
+    # estimated memory of one chunk of (block, parent, x, y, item) records, not counting the blocks themselves
+    total = sys.getsizeof(chunk)
+    for record in chunk:
+        total += (
+            sys.getsizeof(record) + sys.getsizeof(record[2]) + sys.getsizeof(record[3])
+        )
+    return total
+
+
+def chunked(records):
+    # splits records into chunks that end after the same blocks whatever comes before them
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        # object hashes follow the memory layout, hashing it again in a tuple spreads them out
+        if hash((record[0],)) % chunkSize == 0 or len(chunk) == maxChunk:
+            yield tuple(chunk)
+            chunk = []
+    if chunk:
+        yield tuple(chunk)
+
+
+class Step:
+    # One snapshot: the selected robot and, per robot, its program as a tuple of chunks
+    __slots__ = ("selected", "programs", "cost")
+
+    def __init__(self, selected, programs):
+        self.selected = selected
+        self.programs = programs
+        self.cost = (
+            0  # bytes of the chunks this step doesn't share with the step before it
+        )
+
+    def chunks(self):
+        for program in self.programs:
+            yield from program
+
+    def records(self, program):
+        # the (block, parent, x, y, item) records of one program, in order
+        for chunk in self.programs[program]:
+            yield from chunk
+
+
+class History:
+    # Undo and redo stacks of steps, the top of the undo stack is the current state
+    def __init__(self, limit=4 * 1024 * 1024):
+        self.limit = limit
+        self.undoSteps = deque()
+        self.redoSteps = []
+        self.bytes = 0  # estimated memory of every step kept
+
+    def record(self, selected, programs):
+        # adds a step if the programs changed, programs is a list of lists of (block, parent, x, y, item) records
+        # returns True if a step was added
+        last = self.undoSteps[-1] if self.undoSteps else None
+        newPrograms = []
+        cost = 0
+        changed = last is None or len(last.programs) != len(programs)
+        for p, records in enumerate(programs):
+            old = last.programs[p] if last and p < len(last.programs) else ()
+            shared = {chunk: chunk for chunk in old}
+            chunks = []
+            for chunk in chunked(records):
+                if chunk in shared:
+                    chunk = shared[chunk]  # unchanged, share it
+                else:
+                    cost += chunkBytes(chunk)
+                chunks.append(chunk)
+            chunks = tuple(chunks)
+            if chunks != old:
+                changed = True
+            newPrograms.append(chunks)
+        if not changed:
+            # only switching robots isn't a step, but undo should come back to the robot that was selected
+            last.selected = selected
+            return False
+        step = Step(selected, tuple(newPrograms))
+        step.cost = cost
+        self.undoSteps.append(step)
+        self.bytes += cost
+        # a new change can't be redone past
+        for dropped in self.redoSteps:
+            self.bytes -= dropped.cost
+        self.redoSteps = []
+        self.evict()
+        return True
+
+    def evict(self):
+        # drop the oldest steps until the history fits in the limit, always keeping the current state
+        while self.bytes > self.limit and len(self.undoSteps) > 1:
+            self.bytes -= self.undoSteps.popleft().cost
+            # the new oldest step now owns the chunks it shared with the dropped one
+            oldest = self.undoSteps[0]
+            full = sum(chunkBytes(chunk) for chunk in oldest.chunks())
+            self.bytes += full - oldest.cost
+            oldest.cost = full
+
+    def canUndo(self):
+        return len(self.undoSteps) > 1
+
+    def canRedo(self):
+        return bool(self.redoSteps)
+
+    def undo(self):
+        # returns the step to go back to, or None
+        if not self.canUndo():
+            return None
+        self.redoSteps.append(self.undoSteps.pop())
+        return self.undoSteps[-1]
+
+    def redo(self):
+        # returns the step to go forward to, or None
+        if not self.canRedo():
+            return None
+        step = self.redoSteps.pop()
+        self.undoSteps.append(step)
+        return step
@@ -0,0 +1,117 @@
+"""
+I/O Worker:
+
+    Runs file reads and writes on a background thread so the window never freezes waiting on the disk (slow on
+    network home folders). Jobs run one at a time in the order they were submitted, so two writes to the same
+    file can't get mixed up.
+
+    A job is a plain function. When it finishes, its onDone (with the job's return value) or onError (with the
+    exception) is queued, and the main loop calls them on the next frame with drain(), so the callbacks can add
+    warnings and success messages like any other code on the UI thread.
+
+    Jobs that take long without touching files don't wait in the same line: compute() runs CPU heavy jobs (the
+    solver) one at a time on a second thread, and detach() runs a job that waits on the network (grading) on a
+    daemon thread of its own, which closing the window doesn't wait for. Both report back through drain() too.
+
+    A FileWatcher checks a file's modified time on its own thread and parses the file there when it changes,
+    handing the result to the worker's queue the same way.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class IOWorker:
+    # One background thread for the jobs, one queue of finished jobs for the UI thread
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io")
+        self.computer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compute")
+        self.finished = queue.SimpleQueue()
+
+    def submit(self, job, onDone=None, onError=None):
+        # runs job() in the background, onDone(result) or onError(error) is called later by drain()
+        self.executor.submit(self.run, job, onDone, onError)
+
+    def compute(self, job, onDone=None, onError=None):
+        # like submit, for CPU heavy jobs, so file jobs don't wait behind them
+        self.computer.submit(self.run, job, onDone, onError)
+
+    def detach(self, job, onDone=None, onError=None):
+        # like submit, on a daemon thread of its own, for jobs that may wait a long time
+        threading.Thread(
+            target=self.run, args=(job, onDone, onError), daemon=True
+        ).start()
+
+    def run(self, job, onDone, onError):
+        # background thread, never touches the UI
+        try:
+            result = job()
+        except Exception as error:
+            self.post(onError, error)
+        else:
+            self.post(onDone, result)
+
+    def post(self, callback, value):
+        # any thread: have callback(value) called on the UI thread by the next drain()
+        self.finished.put((callback, value))
+
+    def drain(self):
+        # UI thread, once per frame: call the callbacks of every job that finished since the last frame
+        while True:
+            try:
+                callback, value = self.finished.get_nowait()
+            except queue.Empty:
+                return
+            if callback:
+                callback(value)
+
+    def wait(self):
+        # blocks until every submitted and computing job is done and drained, for tools and shutting down
+        self.executor.submit(lambda: None).result()
+        self.computer.submit(lambda: None).result()
+        self.drain()
+
+    def shutdown(self):
+        # lets the jobs that were already submitted finish (so no file is left half written)
+        # computing jobs that haven't started are dropped, detached ones are left behind
+        self.computer.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=True)
+
+
+class FileWatcher:
+    # Polls a file's modified time, parses it when it changes and posts the result to an IOWorker
+    def __init__(self, filename, parse, worker, onChange, onError=None, interval=0.5):
+        self.filename = filename
+        self.parse = parse  # parse(filename), runs on the watcher's thread
+        self.worker = worker
+        self.onChange = onChange  # called on the UI thread with what parse returned
+        self.onError = onError  # called on the UI thread with the exception
+        self.interval = interval  # seconds between checks
+        self.stopped = threading.Event()
+        self.mtime = self.modified()  # the file as it is now is already loaded
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def modified(self):
+        try:
+            return os.stat(self.filename).st_mtime_ns
+        except OSError:
+            return None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            mtime = self.modified()
+            if mtime == self.mtime or mtime is None:
+                continue  # unchanged, or being replaced by an editor
+            self.mtime = mtime
+            try:
+                result = self.parse(self.filename)
+            except Exception as error:
+                self.worker.post(self.onError, error)
+            else:
+                self.worker.post(self.onChange, result)
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,337 @@
+"""
+Java Helpers:
+
+    Programs repeat the same blocks many times (loops, copied blocks, the same blocks on both sides of a parallel
+    group), and writing every copy into the one expression the java icon makes gives a very long expression that is
+    slow to compile and deploy. Every run of blocks that shows up more than once is written once as a helper method
+    instead, and called wherever it was:
+
+        private Command moveForwardIntakeStartShoot() {
+          return new SequentialCommandGroup(new MoveForward(), new IntakeStart(), new Shoot());
+        }
+
+    The program is read from its entries (programs.py), so loops stay loops. Every part of it is hash-consed (the
+    same block, loop, parallel group or run of blocks, with the same parts inside it, gets the same number), and the
+    runs that repeat are found with Sequitur, which builds a grammar in which no pair of parts appears twice, in time
+    linear in the number of blocks. Rules shorter than minCommands commands are written inline, longer ones become
+    helpers, which can call other helpers. The body of a loop is a helper called once per time round when it is long
+    enough, so nested loops are never written out in full. Only runs of blocks are factored, the sides of a parallel
+    group stay as they are.
+"""
+
+from itertools import islice
+
+minCommands = 3  # shortest run of commands worth a helper
+sequential = "SequentialCommandGroup"
+parallel = "ParallelCommandGroup"
+
+
+class Symbol:
+    # One command or rule in a rule of the grammar, rules are circular lists with a guard
+    __slots__ = ("value", "prev", "next", "rule")
+
+    def __init__(self, value, rule=None):
+        self.value = value  # command number, or a Rule
+        self.prev = self.next = None
+        self.rule = rule  # the rule a guard belongs to, None for every other symbol
+
+
+class Rule:
+    # A run of symbols that shows up at least twice
+    def __init__(self):
+        self.guard = Symbol(None, self)
+        self.guard.prev = self.guard.next = self.guard
+        self.count = 0  # places the rule is used
+
+    def symbols(self):
+        symbol = self.guard.next
+        while symbol is not self.guard:
+            yield symbol
+            symbol = symbol.next
+
+
+class Grammar:
+    # Sequitur: no pair of symbols twice, every rule used at least twice
+    def __init__(self):
+        self.top = Rule()
+        self.digrams = {}  # (value, value) -> the first symbol of where that pair is
+
+    def append(self, value):
+        self.insertAfter(self.top.guard.prev, Symbol(value))
+        last = self.top.guard.prev
+        if last.prev is not self.top.guard:
+            self.check(last.prev)
+
+    def insertAfter(self, symbol, new):
+        self.join(new, symbol.next)
+        self.join(symbol, new)
+        if isinstance(new.value, Rule):
+            new.value.count += 1
+
+    def join(self, left, right):
+        if left.next is not None:
+            self.forget(left)
+        left.next = right
+        right.prev = left
+
+    def forget(self, symbol):
+        # removes the pair starting at symbol from the index
+        if symbol.rule or symbol.next.rule:
+            return
+        key = (symbol.value, symbol.next.value)
+        if self.digrams.get(key) is symbol:
+            del self.digrams[key]
+
+    def remove(self, symbol):
+        self.join(symbol.prev, symbol.next)
+        self.forget(symbol)
+        if isinstance(symbol.value, Rule):
+            symbol.value.count -= 1
+
+    def check(self, symbol):
+        # looks up the pair starting at symbol, True if it was replaced by a rule
+        if symbol.rule or symbol.next.rule:
+            return False
+        key = (symbol.value, symbol.next.value)
+        match = self.digrams.get(key)
+        if (
+            match is None
+            or match.next is None
+            or (match.value, match.next.value) != key
+        ):
+            self.digrams[key] = symbol
+            return False
+        if match is symbol or match.next is symbol or symbol.next is match:
+            return False  # overlapping, like the middle of three of the same command
+        self.matched(symbol, match)
+        return True
+
+    def matched(self, symbol, match):
+        if match.prev.rule and match.next.next.rule:
+            # the pair is a whole rule already
+            rule = match.prev.rule
+            self.substitute(symbol, rule)
+        else:
+            rule = Rule()
+            self.insertAfter(rule.guard, Symbol(symbol.value))
+            self.insertAfter(rule.guard.next, Symbol(symbol.next.value))
+            self.substitute(match, rule)
+            self.substitute(symbol, rule)
+            self.digrams[(rule.guard.next.value, rule.guard.prev.value)] = (
+                rule.guard.next
+            )
+        for end in (rule.guard.next, rule.guard.prev):
+            if isinstance(end.value, Rule) and end.value.count == 1:
+                self.expand(end)
+
+    def substitute(self, symbol, rule):
+        # replaces the pair starting at symbol with the rule
+        prev = symbol.prev
+        self.remove(symbol.next)
+        self.remove(symbol)
+        self.insertAfter(prev, Symbol(rule))
+        if not self.check(prev):
+            self.check(prev.next)
+
+    def expand(self, symbol):
+        # puts a rule that is only used once back in place
+        rule = symbol.value
+        left, right = symbol.prev, symbol.next
+        first, last = rule.guard.next, rule.guard.prev
+        self.forget(symbol)
+        self.join(left, first)
+        self.join(last, right)
+        if not last.rule and not right.rule:
+            self.digrams[(last.value, right.value)] = last
+        rule.count = 0
+
+
+class Parts:
+    # The parts of a program, hash-consed
+    def __init__(self):
+        self.numbers = {}  # part -> number
+        # number -> ("Command", name), ("Loop", count, body), (parallel, sides) or (sequential, parts)
+        self.parts = []
+        self.sizes = []  # number -> commands it writes, itself included
+
+    def number(self, part, size):
+        if part not in self.numbers:
+            self.numbers[part] = len(self.parts)
+            self.parts.append(part)
+            self.sizes.append(size)
+        return self.numbers[part]
+
+    def run(self, entries):
+        # the number of a run of entries, the same as the blocks' command() writes them
+        numbers = []
+        for entry in entries:
+            name = entry[0]
+            if name == "Loop":
+                body = self.run(entry[2])
+                if self.parts[body][1]:
+                    size = entry[1] * self.sizes[body]
+                    numbers.append(self.number(("Loop", entry[1], body), size))
+            elif name == "ParallelGroup":
+                sides = tuple(self.run(side) for side in entry[1:])
+                if len(sides) > 1 or sides and self.parts[sides[0]][1]:
+                    size = 1 + sum(1 + self.sizes[side] for side in sides)
+                    numbers.append(self.number((parallel, sides), size))
+            else:
+                # the java of a block doesn't depend on its item
+                numbers.append(self.number(("Command", name), 1))
+        numbers = tuple(numbers)
+        return self.number((sequential, numbers), sum(self.sizes[n] for n in numbers))
+
+    def runs(self, top):
+        # every different run in the program, top first
+        found = [top]
+        seen = {top}
+        pending = [top]
+        while pending:
+            kind, *inside = self.parts[pending.pop()]
+            if kind == "Command":
+                continue
+            inside = [inside[1]] if kind == "Loop" else inside[0]
+            for number in inside:
+                if number not in seen:
+                    seen.add(number)
+                    pending.append(number)
+                    if self.parts[number][0] == sequential:
+                        found.append(number)
+        return found
+
+
+class Writer:
+    # Writes the program back out using the grammar's rules
+    def __init__(self, parts, grammar, runs):
+        self.parts = parts
+        self.sizes = {}  # Rule -> commands in it
+        self.names = {}  # Rule or run number -> helper name, for the ones long enough
+        self.taken = set()
+        self.helpers = []
+        self.written = {}  # part number -> its java, every part is written once
+        symbols = {}  # separator -> the symbols of the run before it
+        current = []
+        for symbol in grammar.top.symbols():
+            if isinstance(symbol.value, int) and symbol.value < 0:
+                symbols[-1 - symbol.value] = current
+                current = []
+            else:
+                current.append(symbol.value)
+        self.order = {run: symbols[number] for run, number in runs.items()}
+
+    def size(self, value):
+        if not isinstance(value, Rule):
+            return self.parts.sizes[value]
+        if value not in self.sizes:
+            self.sizes[value] = sum(self.size(s.value) for s in value.symbols())
+        return self.sizes[value]
+
+    def write(self, top):
+        # (the commands, the helper methods)
+        commands = f"new {sequential}({self.run(top)});"
+        return commands, "\n\n".join(self.helpers)
+
+    def run(self, number):
+        # a run's parts, helpers called in place of repeated runs
+        if number not in self.written:
+            self.written[number] = ", ".join(
+                self.symbol(value) for value in self.order[number]
+            )
+        return self.written[number]
+
+    def symbol(self, value):
+        if not isinstance(value, Rule):
+            return self.part(value)
+        if self.size(value) < minCommands:
+            return ", ".join(self.symbol(s.value) for s in value.symbols())
+        if value not in self.names:
+            self.names[value] = self.helper(value, list(value.symbols()))
+        return f"{self.names[value]}()"
+
+    def part(self, number):
+        if number in self.written:
+            return self.written[number]
+        kind, *inside = self.parts.parts[number]
+        if kind == "Command":
+            java = f"new {inside[0]}()"
+        elif kind == parallel:
+            sides = ", ".join(f"new {sequential}({self.run(s)})" for s in inside[0])
+            java = f"new {parallel}({sides})"
+        else:
+            count, body = inside
+            java = ", ".join([self.body(body, count)] * count)
+        self.written[number] = java
+        return java
+
+    def body(self, number, count):
+        # a loop body, called as a helper when it is written more than once and long enough
+        if count < 2 or self.parts.sizes[number] < minCommands:
+            return self.run(number)
+        symbols = self.order[number]
+        if len(symbols) == 1 and isinstance(symbols[0], Rule):
+            return self.symbol(symbols[0])  # the whole body is a rule already
+        if number not in self.names:
+            self.names[number] = self.helper(number, [Symbol(v) for v in symbols])
+        return f"{self.names[number]}()"
+
+    def helper(self, key, symbols):
+        # writes the method for a rule or loop body, returns its name
+        words = []
+        for name in islice(self.leaves(symbols), 50):
+            if not words or words[-1] != name:
+                words.append(name)
+            if len(words) == 3:
+                break
+        name = "".join(words)
+        name = name[0].lower() + name[1:]
+        base, n = name, 1
+        while name in self.taken:
+            n += 1
+            name = f"{base}{n}"
+        self.taken.add(name)
+        body = ", ".join(self.symbol(s.value) for s in symbols)
+        self.helpers.append(
+            f"  private Command {name}() {{\n"
+            f"    return new {sequential}({body});\n"
+            f"  }}"
+        )
+        return name
+
+    def leaves(self, symbols):
+        # the names of the commands of some symbols in order, rules and loops inside them written out
+        for symbol in symbols:
+            yield from self.partLeaves(symbol.value)
+
+    def partLeaves(self, value):
+        if isinstance(value, Rule):
+            yield from self.leaves(value.symbols())
+            return
+        kind, *inside = self.parts.parts[value]
+        if kind == "Loop":
+            count, body = inside
+            for _ in range(count):
+                for number in self.parts.parts[body][1]:
+                    yield from self.partLeaves(number)
+        elif kind == parallel:
+            yield parallel
+        else:
+            yield inside[0]
+
+
+def factorProgram(entries):
+    # (commands, helper methods) for the java of a program's entries (programs.entriesOf of the Start block)
+    # written like the blocks' command() when nothing repeats
+    if not entries:
+        return "", ""
+    parts = Parts()
+    top = parts.run(entries)
+    # every different run goes into the grammar once, split by separators that never repeat
+    grammar = Grammar()
+    runs = {}  # run number -> its separator number
+    for run in parts.runs(top):
+        runs[run] = len(runs)
+        for number in parts.parts[run][1]:
+            grammar.append(number)
+        grammar.append(-1 - runs[run])
+    return Writer(parts, grammar, runs).write(top)
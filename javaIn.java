@@ -33,4 +33,6 @@ public class RobotContainer {
   public Command getAutonomousCommand() {
     return // ADDCOMMANDSHERE!!!
   }
+
+  // ADDHELPERSHERE!!!
 }
\ No newline at end of file
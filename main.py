@@ -14,6 +14,9 @@ Project Description:
 How To Use:
 
     Create a challenging setup for the students. An example is located in simSetup.txt.
+    Changes to simSetup.txt show up on the field without restarting (after Reset if the sim has run).
+    Besides one Name,x,y line per item, larger fields can be drawn as a character grid (@grid) or as run length
+    encoded rows (@rle); see fieldSetup.py for the format. Every bad line is reported with its line number.
     Once you run the program, it will prompt you for this setup (leave blank for example)
     After that a resizable window will appear which can be interacted with.
     On the left there are the blocks that can be used.
@@ -23,25 +26,68 @@ How To Use:
     The checkmark icon validates the code and ensures that there aren't any open loops or extra close loop blocks
     The play icon runs the simulation
     The reset icon resets the simulation to the inital state
+    The robot icon switches the code area between robots when the field has more than one. Each robot runs its own
+    program and robots block each other; the selected robot is outlined on the field.
+    Next to the icons is how long the program takes (auto is 15 seconds) and where the robot ends up, and dots on
+    the field show the cells it will drive through; the text turns red when the checkmark would find a problem.
+    The checkmark also warns about Shoot blocks without a note, parallel groups that move or turn from both sides
+    and driving into obstacles, worked out without running the sim.
+    F5 replaces the selected robot's program with one the solver found that shoots every note (Ctrl+Z undoes it).
+    F7 sends the program to the grading server at an event (python grader.py serve on the mentor's laptop, set
+    FRCBLOCKS_GRADER to its address and FRCBLOCKS_NAME to the team's name), the result comes back as a message.
+    Every run is recorded into the replays folder, the last 20 are kept. F6 plays the last run again (left and right
+    arrows skip a second), python replay.py prints what is in a recording, python export.py saves recordings as PNG
+    frames (or GIFs with --gif, needs Pillow).
     The java icon generates java code and saves it into the javaIn.java file at the comment given. This can be changed to 
     any file, but you must maintain the comment where you want the code to go.
+    Blocks that repeat are written once as helper methods at the // ADDHELPERSHERE!!! comment in the class.
+    Shift+click the java icon to write the program as trajectories instead (FollowTrajectory), the robot drives
+    moves in a row without stopping between blocks; the robot needs FollowTrajectory and TrajectoryEvent commands.
+    Files are read and written in the background, the message shows up once the file is written.
+    Messages go away after a few seconds or when clicked, a message that comes up again counts up instead.
     
     To intake a note, the robot must have intake on (green dot) and move into the note from any direction.
     When shooting a note, it will travel in the direction of the arrow.
 
     Parallel Groups should not move or turn in multiple directions at the same point; may cause issues in sim, 
     will cause issues on a real robot
+    Running the sim shows a warning when two sides of a group need the same part of the robot (drive, intake, shooter)
     
     There are three different scrollable areas; Scroll wheel will scroll whichever you are hovering mouse over.
+    Ctrl+scroll (or Ctrl+plus and Ctrl+minus) zooms the code area out to see long programs, Ctrl+0 goes back.
+    The minimap on the right of the code area shows the whole program and the blocks running in the sim, click a
+    block on it to go to that part of the program.
+    Ctrl+C copies the block under the mouse and every block after it, Ctrl+V pastes them at the mouse and Ctrl+D
+    pastes them again right below.
     Dragging any area that doesn't have a block will move the area.
+    F3 shows the frame profiler overlay (p50/p95/max per phase), F4 saves it to profile.csv and profile.json.
+    Ctrl+Z undoes the last change to the blocks, Ctrl+Y (or Ctrl+Shift+Z) redoes it.
     
 Code Description:
 
     See flowcharts in Flowcharts.pdf
     
     Most visible classes inherit from a visual class and a functional class
-    Functional classes (eventually) inherit from the Object class which inherits pygame's surface
-    Code blocks have a runSim function which dictate what happens when they are used in simulation
+    Functional classes (eventually) inherit from the Object class, which only holds a position
+    Blocks that look the same are drawn from one shared surface (blockSurface)
+    Code blocks turn into commands (simCommands) that the command scheduler (scheduler.py) runs, like WPILib's
+    CommandScheduler on the robot; runSimBase dictates what a block does each tick of the simulation
+    The sim field (simField.py) keeps every robot, note and obstacle in arrays, one row per item (row 0 is the robot)
+    SimView draws the field with one shared sprite per kind of item
+    history.py keeps the undo steps, unchanged parts of a step are shared with the step before it
+    ioWorker.py reads and writes files on a background thread, the results come back as messages on the next frame
+    A FileWatcher reloads simSetup.txt when it changes, only the items that differ are added, moved or removed
+    analysis.py works out what a program does without running it, redoing only the blocks above an edit
+    solver.py searches for the shortest program that shoots every note, also from the command line (python solver.py)
+    replay.py records runs as the changes of each tick (keyframes every few seconds) and reads them through a memory map
+    export.py draws recorded runs offscreen and saves the frames, spread over a pool of processes
+    toasts.py draws each warning and success message once, repeats are counted and old ones expire
+    minimap.py keeps a small picture of the program and only redraws the places of blocks that changed
+    objectPool.py keeps thrown away blocks so the side bar hands them out again instead of making new ones
+    trajectory.py turns the blocks of a program into continuous velocity and acceleration limited trajectories
+    javaHelpers.py finds the runs of blocks that repeat, loop bodies included, and writes each once as a helper method
+    grader.py is the grading server: it runs the programs students send in the vectorized sim and keeps a leaderboard
+    programs.py writes the blocks of a program as plain lists (entries) for the grader and the vectorized sim
     Generator blocks create a copy of the real code block each time they are clicked
     
 Author: 
@@ -53,28 +99,116 @@ Version:
     1.1 (2/15/2025)
 """
 
+import time
+
+importStart = (
+    time.perf_counter()
+)  # startup is measured from here to the first frame on screen
+
 import math
+import os
 import sys, pygame
-import time
-from anytree import NodeMixin, RenderTree
+from anytree import NodeMixin
+from analysis import Analyzer, autoSeconds, tickSeconds
+from fieldSetup import FieldSetupError, readField
+from profiler import FrameProfiler
+from history import History
+from javaHelpers import factorProgram
+from ioWorker import FileWatcher, IOWorker
+from solver import fieldProblem, solve
+from programs import entriesOf
+from replay import Recorder, ReplayReader
+from scheduler import (
+    Command,
+    CommandScheduler,
+    ParallelCommandGroup,
+    SequentialCommandGroup,
+)
+from minimap import Minimap
+from objectPool import ObjectPool
+from toasts import WARNING, Toasts
+from trajectory import trajectoryCommand
+from simField import INTAKE, NOTE, OBSTACLE, ROBOT, SimField, kindCodes
 
-pygame.init()
 size = width, height = 1500, 900
-font = pygame.font.Font("freesansbold.ttf", 32)
+font = None  # loaded by init(), pygame's font module has to be started first
+startupBudget = 1.0  # seconds from import to the first frame, reported on startup
+imageCache = {}
+
+
+def loadImage(filename):
+    # loads an image file the first time it is asked for, after that every object shares the same surface
+    img = imageCache.get(filename)
+    if img is None:
+        img = imageCache[filename] = pygame.image.load(filename)
+    return img
+
+
+blockSurfaces = (
+    {}
+)  # (color, lines of text, size) -> surface shared by every block that looks like that
+
+
+def blockSurface(look):
+    # the background and text of a block, composed the first time that look is drawn
+    surf = blockSurfaces.get(look)
+    if surf is None:
+        color, lines, size = look
+        surf = blockSurfaces[look] = pygame.Surface(size)
+        surf.fill(color)
+        for i, line in enumerate(lines):
+            # lines are 40 pixels apart, centered on the block
+            text = font.render(line, True, black)
+            textRect = text.get_rect()
+            textRect.center = (
+                size[0] // 2,
+                size[1] // 2 + (i * 2 - len(lines) + 1) * 20,
+            )
+            surf.blit(text, textRect)
+    return surf
+
+
+drawScale = 1.0  # zoom of what is being drawn, set by Scrollable.draw while a block on the code canvas draws
+mipChains = {}  # surface -> [the surface, half size, quarter size, ...]
+scaledSurfaces = {}  # (surface, size) -> the surface scaled to size
+
+
+def mipChain(surface):
+    # halves of a surface down to a few pixels, made the first time the surface is zoomed out
+    chain = mipChains.get(surface)
+    if chain is None:
+        chain = mipChains[surface] = [surface]
+        while min(chain[-1].get_size()) >= 8:
+            w, h = chain[-1].get_size()
+            chain.append(pygame.transform.smoothscale(chain[-1], (w // 2, h // 2)))
+    return chain
+
+
+def scaled(surface):
+    # a surface at the zoom it is being drawn at, scaled once per zoom level from the nearest larger half
+    if drawScale == 1:
+        return surface
+    w, h = surface.get_size()
+    size = (max(round(w * drawScale), 1), max(round(h * drawScale), 1))
+    key = (surface, size)
+    img = scaledSurfaces.get(key)
+    if img is None:
+        source = surface
+        for mip in mipChain(surface):
+            if mip.get_width() < size[0]:
+                break
+            source = mip
+        img = scaledSurfaces[key] = pygame.transform.smoothscale(source, size)
+    return img
 
 
 # ---------
 # GENERICS
-class Object(
-    pygame.Surface
-):  # Generic Object, It has a size, position, and a collide function
+class Object:  # Generic Object, It has a size, position, and a collide function
+    # Objects only hold their position, drawing is done from shared surfaces (see blockSurface)
     def __init__(self, size=(100, 100), pose=(500, 500)):
         self.item = 1
-        pygame.Surface.__init__(self, size)
-        self.fill(white)
-        self.rect = self.get_rect()
-        self.rect.x = pose[0]
-        self.rect.y = pose[1]
+        self.rect = pygame.Rect(pose, size)
 
     def collide(self, event):
         return self.rect.collidepoint(event.pos)
@@ -82,6 +216,8 @@ class Object(
 
 class TreeNode(NodeMixin):  # TreeNode, Can have a parent and children.
     # extends NodeMixin which helps with printing and general tree nodes
+    subsystem = None  # part of the robot the block uses in the sim, see BlockCommand
+
     def __init__(self, size, pose):
         super().__init__(size, pose)
         self.parent = None
@@ -89,7 +225,6 @@ class TreeNode(NodeMixin):  # TreeNode, Can have a parent and children.
         self.numChild = 1
         self.children = []
         self.isParallel = False
-        self.hasRun = False
 
     def checkIfParallel(self):
         # figures out if a object is within a parallel group
@@ -157,102 +292,99 @@ class TreeNode(NodeMixin):  # TreeNode, Can have a parent and children.
                     return f"new {str(self)}()"
                 return f"new {str(self)}(), {self.children[0].command()}"
 
-    def runSim(self, time_start):
-        # runs the correct actions during simulation
-        if self.hasRun:  # if it has run,
-            if (
-                len(self.children) == 0
-            ):  # if no children, return None to signal simulation is complete
-                return None
-            return self.children[0].runSim(
-                time_start
-            )  # otherwise run it's child's simulation and return it's result
-        elif (
-            time.time() > time_start + simDelay
-        ):  # if not run and the current time is past the start time+the delay
-            if (
-                self.iters >= self.time
-            ):  # if the iterations is more than the max number of iterations
-                if (
-                    self.iters >= simDuration
-                ):  # if the iterations are more than the min duration of any block
-                    self.iters = 0  # reset iterations
-                    self.hasRun = True  # it has run
-                    for (
-                        i
-                    ) in simItems:  # make sure all sim items are on integer grid lines
-                        i.snapToGrid()
-                    return (
-                        time.time()
-                    )  # return the current time which will be the start time for the next block
-            else:  # if it hasn't finished the simulation,
-                self.runSimBase()  # run this function (overrided by children classes)
-            self.iters += 1
-        return time_start  # return the start time to be passed back to this
+    def simCommands(self, robot):
+        # Returns the sim commands for this object and the ones after it, built the same way as command()
+        commands = [BlockCommand(self, robot)]
+        if len(self.children) == 1 and str(self.children[0]) not in (
+            "EndParallelGroup",
+            "EndLoop",
+        ):
+            commands += self.children[0].simCommands(robot)
+        return commands
+
+    def simStep(self):
+        # one tick of this block in the simulation
+        if self.iters < self.time:  # if it hasn't finished the simulation,
+            self.runSimBase()  # run this function (overrided by children classes)
+        self.iters += 1
+
+    def simFinished(self):
+        # done once it has run for its time and for at least the min duration of any block
+        return self.iters >= self.time and self.iters >= simDuration
+
+    def simEnd(self):
+        # make sure the robot and the notes are on integer grid lines, other robots may be mid move
+        simField.snapToGrid(simRobot)
 
     def runSimBase(self):
         # Does the action of the simulation, is implemented in child classes
         pass
 
-    def resetSim(self, isLoopReset):
-        # resets the hasRun properties of the blocks
-        # if it is a loop reset, do not reset past the end loop block (implemented in end loop object)
-        self.hasRun = False
-        for i in self.children:
-            i.resetSim(isLoopReset)
-
 
-class TwoLineText(Object):
-    # an visual object with two lines of text
+class Text(Object):
+    # a visual object drawn as a colored block with centered lines of text
     def __init__(self, size, pose):
         super().__init__(size, pose)
         self.initDraw()
 
-    def initDraw(self):
-        # should be overriden by the visual object
-        self.textL1 = font.render("", True, black)
-        self.textL2 = font.render("", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+    def setText(self, color, *lines):
+        # blocks that look the same (same color, text and size) are drawn from the same surface
+        self.look = (color, lines, self.rect.size)
 
     def draw(self, surf):
-        # create the background
-        surf.blit(self, self.rect)
-        # center the text on the object
-        self.textRectL1.center = (
-            (self.rect.width // 2) + self.rect.x,
-            (self.rect.height // 2) + self.rect.y - 20,
-        )
-        self.textRectL2.center = (
-            (self.rect.width // 2) + self.rect.x,
-            (self.rect.height // 2) + self.rect.y + 20,
+        surf.blit(scaled(blockSurface(self.look)), self.rect)
+
+
+class BlockCommand(Command):
+    # Runs one block in the simulation for one robot, scheduled by the command scheduler
+    def __init__(self, block, robot):
+        robots = simField.robots()
+        number = robots.index(robot) + 1 if robot in robots else 1
+        # blocks that use the same part of the same robot can't run at the same time
+        super().__init__(
+            [f"{block.subsystem} of robot {number}"] if block.subsystem else []
         )
-        # add the text on top
-        surf.blit(self.textL1, self.textRectL1)
-        surf.blit(self.textL2, self.textRectL2)
+        self.block = block
+        self.robot = robot  # row of the robot on the sim field
 
+    def __str__(self):
+        return str(self.block)
 
-class OneLineText(Object):
-    # a visual object with one line of text
-    def __init__(self, size, pose):
-        super().__init__(size, pose)
-        self.initDraw()
+    def initialize(self):
+        self.start = time.time()
+        self.block.iters = 0
+
+    def execute(self):
+        global simRobot
+        if (
+            time.time() > self.start + simDelay
+        ):  # every block waits simDelay before it starts
+            simRobot = self.robot
+            self.block.simStep()
+
+    def isFinished(self):
+        global simRobot
+        simRobot = self.robot
+        return self.block.simFinished()
+
+    def end(self, interrupted):
+        global simRobot
+        simRobot = self.robot
+        self.block.simEnd()
 
+
+class TwoLineText(Text):
+    # an visual object with two lines of text
     def initDraw(self):
-        # should be overwritten by the visual object
-        self.textL1 = font.render("", True, black)
-        self.textRectL1 = self.textL1.get_rect()
+        # should be overriden by the visual object
+        self.setText(white, "", "")
 
-    def draw(self, surf):
-        # create the background
-        surf.blit(self, self.rect)
-        # center the text
-        self.textRectL1.center = (
-            (self.rect.width // 2) + self.rect.x,
-            (self.rect.height // 2) + self.rect.y,
-        )
-        # add the text on top
-        surf.blit(self.textL1, self.textRectL1)
+
+class OneLineText(Text):
+    # a visual object with one line of text
+    def initDraw(self):
+        # should be overwritten by the visual object
+        self.setText(white, "")
 
 
 class ImageBase(Object):
@@ -263,13 +395,12 @@ class ImageBase(Object):
 
     def initDraw(self):
         # should be overrwritten by the visual with correct image file
-        self.img = pygame.image.load("BaseImage")
+        self.img = loadImage("BaseImage")
         self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, self.rect.size)
 
     def draw(self, surf: pygame.Surface):
         # draw image
-        surf.blit(self.img, self.rect)
+        surf.blit(scaled(self.img), self.rect)
 
 
 class Draggable(TreeNode, Object):
@@ -286,10 +417,21 @@ class Draggable(TreeNode, Object):
         self.distance = 1
         # (distance/time) * simBlockSize MUST be an INT 1/10 *50 = 5
 
+    def clone(self, copies):
+        # a new block of the same kind with this one's place and item, without any links to other blocks
+        # copies maps every block copied so far to its copy, links between copied blocks are linked in copyBlocks
+        new = type(self)(self.rect.size, (0, 0))
+        new.rect = self.rect.copy()
+        if new.item != self.item:
+            new.item = self.item
+            new.initDraw()
+        copies[self] = new
+        return new
+
     def drag(self, event):
-        # drags the object with the movement of the mouse
-        xvel = event.rel[0]
-        yvel = event.rel[1]
+        # drags the object with the movement of the mouse, a pixel on screen is more than one zoomed out
+        xvel = round(event.rel[0] / zoom)
+        yvel = round(event.rel[1] / zoom)
         self.rect.x += xvel
         self.rect.y += yvel
         # don't drag above the top navigation
@@ -340,23 +482,25 @@ class Draggable(TreeNode, Object):
 
 
 class Scrollable(Object):
-    # Can be scrolled on the main section
+    # Can be scrolled and zoomed on the main section
     def __init__(self, size, pose):
         super().__init__(size, pose)
-        # on init account for scroll
-        self.rect.y = pose[1] - scrollY
+        # on init account for scroll and zoom
+        self.rect.topleft = canvasPoint(pose)
 
     def draw(self, surf):
-        # when drawing account for scroll
-        self.rect.y += scrollY
+        # when drawing account for scroll and zoom
+        global drawScale
+        rect = self.rect
+        self.rect = canvasRect(rect)
+        drawScale = zoom
         super().draw(surf)
-        self.rect.y -= scrollY
+        drawScale = 1.0
+        self.rect = rect
 
     def collide(self, event):
-        # when checking collisions, account for scroll
-        x = event.pos[0]
-        y = event.pos[1] - scrollY
-        return self.rect.collidepoint((x, y))
+        # when checking collisions, account for scroll and zoom
+        return self.rect.collidepoint(canvasPoint(event.pos))
 
 
 class NavScrollable(Object):
@@ -375,39 +519,54 @@ class NavScrollable(Object):
         return self.rect.collidepoint((x, y))
 
 
-class SimScrollable(Object):
-    # Can be scrolled in the Simulation Field (See Scrollable)
-    def __init__(self, size, pose):
-        super().__init__(size, pose)
-
-    def draw(self, surf):
-        self.rect.y += simScrollY + topNav["height"]
-        self.rect.x += simScrollX + (width - sideSim["width"])
-        super().draw(surf)
-        self.rect.y -= simScrollY + topNav["height"]
-        self.rect.x -= simScrollX + (width - sideSim["width"])
-
-
 class ObjectFactory(Object):
     # Generic Generator block. Will create a type of object at it's position on click
     def __init__(self, size, pose):
         super().__init__(size, pose)
         self.size = size  # save size and pose
         self.pose = pose
+        self.kind = None  # class of the objects it makes, known after the first
+        self.startItem = 1  # item of a new object
 
     def getObj(self, size, pose):
         # returns the correct object, (Implemented in child classes)
         pass
 
+    def make(self, pose):
+        item = self.getObj(self.size, pose)
+        self.kind = type(item)
+        self.startItem = item.item
+        return item
+
+    def prewarm(self, count):
+        # makes objects ahead of time into the pool, so generate doesn't have to
+        for _ in range(count - blockPool.size(self.kind)):
+            blockPool.release(self.make(self.pose))
+
     def generate(self):  # generates the object on click
-        global currDrag
+        global currDrag, spawned
         pose = (
             self.pose[0],
             self.pose[1] + navScrollY,
         )  # account for the navigation scroll in the pose of the new object
-        item = self.getObj(self.size, pose)  # get the object
+        # get the object, a thrown away one if there is one
+        item = blockPool.take(self.kind, pose, self.startItem) or self.make(pose)
         dragItems.append(item)  # add it to the drag items, so it will be drawn
         currDrag = item  # make it being dragged currently
+        spawned = item
+
+
+def resetBlock(block, pose, item):
+    # puts a block from the pool back the way a new one starts, at pose
+    block.parent = None
+    block.children = []
+    block.otherChild = None
+    block.isParallel = True
+    block.iters = 0
+    block.item = item
+    block.rect.topleft = canvasPoint(pose)
+    block.initDraw()
+    programAnalyzer.invalidate(block)
 
 
 class Clickable(Object):
@@ -420,108 +579,6 @@ class Clickable(Object):
         pass
 
 
-class Mobile(ImageBase):
-    # Generic Sim Item that can be moved
-    def __init__(self, size, pose):
-        super().__init__(size, pose)
-        self.direction = 3  # 0-right,1-down,2-left,3-up
-        self.intakeOn = False
-        self.intaked = None
-
-    def moveDirection(self, vForward, vStrafe, vtheta, direction=None):
-        # Move this obejct in a direction
-        if (
-            not direction
-        ):  # if no direction given, use the current direction it is facing
-            direction = round(self.direction)
-        vx, vy = 0, 0  # convert to global vx and vy based on direction
-        match (direction % 4):
-            case 0:  # right
-                vx, vy = vForward, vStrafe
-            case 2:  # left
-                vx, vy = vForward * -1, vStrafe * -1
-            case 1:  # down
-                vx, vy = -1 * vStrafe, vForward
-            case 3:  # up
-                vx, vy = vStrafe, vForward * -1
-        self.move(vx, vy, vtheta)  # move in that direction
-
-    def move(self, vX, vY, vtheta):
-        # move in a global frame
-        self.rect.x += vX * simBlockSize
-        self.rect.y += vY * simBlockSize
-        self.direction += vtheta
-        self.direction = (
-            4 + self.direction
-            if self.direction < 0
-            else self.direction - 4 if self.direction > 4 else self.direction
-        )
-        if self.intaked:  # if the robot has a note intaked
-            print("movingIntaked")
-            self.intaked.rect.center = self.rect.center  # keep the note with the robot
-        self.checkCollisions(vX, vY)  # check if object is colliding with anything
-
-    def draw(self, surf: pygame.Surface):
-        # draw the images, rotated in the direction of the object
-        img = pygame.transform.rotate(self.img, (self.direction * -90) - 90)
-        rect = img.get_rect()
-        rect.center = self.rect.center
-        surf.blit(img, rect)
-
-    def snapToGrid(self):
-        # snap to grid of the simulation
-        self.rect.x = round(self.rect.x / simBlockSize) * simBlockSize
-        self.rect.y = round(self.rect.y / simBlockSize) * simBlockSize
-
-    def checkCollisions(self, vx, vy):
-        # Checks if this object is colliding with any other objects and moves if so.
-        for i in simItems:
-            # if it is checking against itself, or the robot (which is shooting a note) don't do anything
-            # this will cause infinite recursion because it can't make them not collide
-            if i == self or isinstance(i, RobotIcon) and i.isShooting:
-                continue
-            # if this object's rectangle is colliding with another
-            if self.rect.colliderect(i.rect):
-                # if the checked object is able to be moved
-                if issubclass(type(i), Mobile):
-                    # if the object is a note, and the intake is on, and the current object is the robot, and there is nothing in the intake
-                    if (
-                        isinstance(self, RobotIcon)
-                        and self.intakeOn
-                        and str(i) == "NoteIcon"
-                        and not self.intaked
-                    ):
-                        if i.rect.collidepoint(
-                            self.rect.center
-                        ):  # once the note touches the center of the robot,
-                            self.intaked = (
-                                i  # save that object as the currently intaked
-                            )
-                            simItems.remove(i)  # stop drawing the note
-                    else:  # otherwise move the mobile object
-                        i.move(vx, vy, 0)
-                else:  # if the object is not able to be moved
-                    self.move(-1 * vx, -1 * vy, 0)  # move self backwards
-                    if len(warnings) == 0:  # add a warning for moving into obstacles
-                        warnings.append(Warning("Attempted to move into an obstacle"))
-
-
-class Immobile(ImageBase):
-    # Generic Simulation Item that Can't Move
-    def __init__(self, size, pose):
-        super().__init__(size, pose)
-
-    def draw(self, surf: pygame.Surface):
-        # center the image on the object's center and draw it
-        rect = self.img.get_rect()
-        rect.center = self.rect.center
-        surf.blit(self.img, rect)
-
-    def snapToGrid(self):
-        self.rect.x = round(self.rect.x / simBlockSize) * simBlockSize
-        self.rect.y = round(self.rect.y / simBlockSize) * simBlockSize
-
-
 class UpButton(Scrollable, ImageBase, Draggable):
     # Up Button for the Changable Class, Has a parent of the changable it is on
     def __init__(self, pose, parent):
@@ -529,9 +586,8 @@ class UpButton(Scrollable, ImageBase, Draggable):
         self.master = parent
 
     def initDraw(self):
-        self.img = pygame.image.load("up.svg")  # draw the image of the up arrow
+        self.img = loadImage("up.svg")  # draw the image of the up arrow
         self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, self.rect.size)
 
     def collide(self, event):  # when clicked, change the parent by 1
         val = super().collide(event)
@@ -547,9 +603,8 @@ class DownButton(Scrollable, ImageBase, Draggable):
         self.master = parent
 
     def initDraw(self):
-        self.img = pygame.image.load("down.svg")  # draw the image of the down arrow
+        self.img = loadImage("down.svg")  # draw the image of the down arrow
         self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, self.rect.size)
 
     def collide(self, event):  # when clicked, change parent by -1
         val = super().collide(event)
@@ -583,7 +638,10 @@ class Changable(Object):
             if self.item > self.max
             else self.min if self.item < self.min else self.item
         )
+        global programEdited
         self.initDraw()  # redo the drawing
+        programAnalyzer.invalidate(self)
+        programEdited = True
 
     def draw(self, surf):
         super().draw(surf)  # draw this object then add the buttons on top
@@ -615,11 +673,9 @@ class ForwardVisual(TwoLineText):
         super().__init__(size, pose)
 
     def initDraw(self):
-        self.fill((52, 185, 247))  # Color of the Block
-        self.textL1 = font.render(f"Move {self.item}x", True, black)  # Text
-        self.textL2 = font.render("Forward", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText(
+            (52, 185, 247), f"Move {self.item}x", "Forward"
+        )  # Color and text of the block
 
 
 class BackwardVisual(TwoLineText):
@@ -629,39 +685,29 @@ class BackwardVisual(TwoLineText):
         super().__init__(size, pose)
 
     def initDraw(self):
-        self.fill((52, 185, 247))  # Color
-        self.textL1 = font.render(f"Move {self.item}x", True, black)  # Text
-        self.textL2 = font.render("Backward", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText(
+            (52, 185, 247), f"Move {self.item}x", "Backward"
+        )  # Color and text of the block
 
 
 class StartVisual(OneLineText):
     # The visual component of the Start Block
     def initDraw(self):
-        self.fill((45, 135, 50))  # Color
-        self.textL1 = font.render("Start", True, black)  # Text
-        self.textRectL1 = self.textL1.get_rect()
+        self.setText((45, 135, 50), "Start")  # Color and text of the block
 
 
 class ParallelGroupVisual(TwoLineText):
     # The visual component of the Parallel Group Block
     def initDraw(self):
-        self.fill((120, 201, 215))  # Color
-        self.textL1 = font.render("Parallel", True, black)  # Text
-        self.textL2 = font.render("Group", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText(
+            (120, 201, 215), "Parallel", "Group"
+        )  # Color and text of the block
 
 
 class EndParallelGroupVisual(TwoLineText):
     # The visual component of the End Parallel Group Block
     def initDraw(self):
-        self.fill((120, 201, 215))
-        self.textL1 = font.render("End", True, black)
-        self.textL2 = font.render("Parallel", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((120, 201, 215), "End", "Parallel")
 
 
 class TurnLeftVisual(TwoLineText):
@@ -671,11 +717,7 @@ class TurnLeftVisual(TwoLineText):
         super().__init__(size, pose)
 
     def initDraw(self):
-        self.fill((209, 135, 44))
-        self.textL1 = font.render(f"Turn {self.item}x", True, black)
-        self.textL2 = font.render("Left", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((209, 135, 44), f"Turn {self.item}x", "Left")
 
 
 class TurnRightVisual(TwoLineText):
@@ -685,11 +727,7 @@ class TurnRightVisual(TwoLineText):
         super().__init__(size, pose)
 
     def initDraw(self):
-        self.fill((209, 135, 44))
-        self.textL1 = font.render(f"Turn {self.item}x", True, black)
-        self.textL2 = font.render("Right", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((209, 135, 44), f"Turn {self.item}x", "Right")
 
 
 class LeftVisual(TwoLineText):
@@ -699,11 +737,7 @@ class LeftVisual(TwoLineText):
         super().__init__(size, pose)
 
     def initDraw(self):
-        self.fill((52, 185, 247))
-        self.textL1 = font.render(f"Move {self.item}x", True, black)
-        self.textL2 = font.render("Left", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((52, 185, 247), f"Move {self.item}x", "Left")
 
 
 class RightVisual(TwoLineText):
@@ -713,39 +747,25 @@ class RightVisual(TwoLineText):
         super().__init__(size, pose)
 
     def initDraw(self):
-        self.fill((52, 185, 247))
-        self.textL1 = font.render(f"Move {self.item}x", True, black)
-        self.textL2 = font.render("Right", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((52, 185, 247), f"Move {self.item}x", "Right")
 
 
 class IntakeStartVisual(TwoLineText):
     # The visual component of the Intake Start Block
     def initDraw(self):
-        self.fill((152, 116, 242))
-        self.textL1 = font.render("Intake", True, black)
-        self.textL2 = font.render("Start", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((152, 116, 242), "Intake", "Start")
 
 
 class IntakeStopVisual(TwoLineText):
     # The visual component of the Intake Stop Block
     def initDraw(self):
-        self.fill((152, 116, 242))
-        self.textL1 = font.render("Intake", True, black)
-        self.textL2 = font.render("Stop", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((152, 116, 242), "Intake", "Stop")
 
 
 class ShootVisual(OneLineText):
     # The visual component of the Shoot Block
     def initDraw(self):
-        self.fill((245, 132, 215))
-        self.textL1 = font.render("Shoot", True, black)
-        self.textRectL1 = self.textL1.get_rect()
+        self.setText((245, 132, 215), "Shoot")
 
 
 class LoopVisual(TwoLineText):
@@ -755,48 +775,44 @@ class LoopVisual(TwoLineText):
         super().__init__(size, pose)
 
     def initDraw(self):
-        self.fill((120, 201, 215))
-        self.textL1 = font.render("Loop", True, black)
-        self.textL2 = font.render(f"{self.item}x", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((120, 201, 215), "Loop", f"{self.item}x")
 
 
 class EndLoopVisual(TwoLineText):
     # The visual component of the End Loop Block. Extends Two Line Text
     def initDraw(self):
-        self.fill((120, 201, 215))
-        self.textL1 = font.render("End", True, black)
-        self.textL2 = font.render("Loop", True, black)
-        self.textRectL1 = self.textL1.get_rect()
-        self.textRectL2 = self.textL2.get_rect()
+        self.setText((120, 201, 215), "End", "Loop")
 
 
 # ---------
 # OBJECTS - Extend Changable (sometimes), Scrollable, Relative Visual, Draggable
 class ForwardObject(Changable, Scrollable, ForwardVisual, Draggable):
     # Move Forward Object
+    subsystem = "drive"
+
     def __str__(self):
         return "MoveForward"
 
     def runSimBase(self):
         self.distance = self.item  # move the chosen distance
         self.time = 50 * self.item  # take 50 iterations per block moved
-        simItems[0].moveDirection(
-            self.distance / self.time, 0, 0
-        )  # move the correct distance/time
+        simField.moveDirection(
+            simRobot, self.distance / self.time, 0, 0
+        )  # move the robot running this program the correct distance/time
 
 
 class BackwardObject(Changable, Scrollable, BackwardVisual, Draggable):
     # Move Backward Object (See ForwardObject)
+    subsystem = "drive"
+
     def __str__(self):
         return "MoveBackward"
 
     def runSimBase(self):
         self.distance = self.item
         self.time = 50 * self.item
-        simItems[0].moveDirection(
-            -1 * (self.distance / self.time), 0, 0
+        simField.moveDirection(
+            simRobot, -1 * (self.distance / self.time), 0, 0
         )  # move backward
 
 
@@ -844,21 +860,12 @@ class StartObject(TreeNode, Scrollable, StartVisual):
             case 0:
                 return ""
 
-    def runSim(self, time_start):
-        # do nothing in sim (See TreeNode for typical implementation)
-        if self.hasRun:
-            if len(self.children) == 0:
-                return None
-            return self.children[0].runSim(time_start)
-        elif time.time() > time_start:  # if time is past the start time it has finished
-            self.hasRun = True
-            return time.time()
-        return time_start
-
-    def resetSim(self, isLoopReset):
-        self.hasRun = False
-        for i in self.children:  # reset all blocks
-            i.resetSim(isLoopReset)
+    def simCommands(self, robot):
+        # the whole program in one sequential group, like the java code
+        commands = []
+        if len(self.children) == 1:
+            commands = self.children[0].simCommands(robot)
+        return [SequentialCommandGroup(*commands)]
 
 
 class ParallelObject(Scrollable, ParallelGroupVisual, Draggable):
@@ -938,29 +945,17 @@ class ParallelObject(Scrollable, ParallelGroupVisual, Draggable):
             s += f"{self.otherChild.command()}"
         return s
 
-    def runSim(self, time_start):
-        # Run the simulation
-        match len(self.children):
-            case 0:  # if there are no children
-                pass
-            case 1:  # if there is 1 child
-                output = self.children[0].runSim(time_start)  # run the sim on that
-                if output:  # if not None
-                    return output  # return that
-            case 2:
-                output1 = self.children[0].runSim(time_start)
-                output2 = self.children[1].runSim(time_start)
-                if output1 and output2:  # if both are not None
-                    return (
-                        output1 if output1 > output2 else output2
-                    )  # return the bigger one
-                if output1:
-                    return output1
-                if output2:
-                    return output2
-        if self.otherChild:
-            return self.otherChild.runSim(time_start)
-        return None
+    def simCommands(self, robot):
+        # every side of the group is a sequential group, all sides run at once
+        sides = [
+            SequentialCommandGroup(*i.simCommands(robot))
+            for i in self.children
+            if str(i) != "EndParallelGroup"
+        ]
+        commands = [ParallelCommandGroup(*sides)] if sides else []
+        if self.otherChild:  # then the blocks after the end parallel group
+            commands += self.otherChild.simCommands(robot)
+        return commands
 
 
 class EndParallelObject(Scrollable, EndParallelGroupVisual, Draggable):
@@ -973,7 +968,6 @@ class EndParallelObject(Scrollable, EndParallelGroupVisual, Draggable):
         return "EndParallelGroup"
 
     def findParents(self):
-        print("end")
         self.isParallel = False
         parents = []
         amountAbove = math.inf
@@ -1002,75 +996,87 @@ class EndParallelObject(Scrollable, EndParallelGroupVisual, Draggable):
     def command(self):
         return ""
 
-    def runSim(self, time_start):
-        return None
+    def simCommands(self, robot):
+        return []  # ends the side of the group it is on
 
 
 class LeftObject(Changable, Scrollable, LeftVisual, Draggable):
     # Move Left Object (See ForwardObject)
+    subsystem = "drive"
+
     def __str__(self):
         return "MoveLeft"
 
     def runSimBase(self):
         self.distance = self.item
         self.time = 50 * self.item
-        simItems[0].moveDirection(0, -1 * (self.distance / self.time), 0)
+        simField.moveDirection(simRobot, 0, -1 * (self.distance / self.time), 0)
 
 
 class RightObject(Changable, Scrollable, RightVisual, Draggable):
     # Move Right Object (See ForwardObject)
+    subsystem = "drive"
+
     def __str__(self):
         return "MoveRight"
 
     def runSimBase(self):
         self.distance = self.item
         self.time = 50 * self.item
-        simItems[0].moveDirection(0, (self.distance / self.time), 0)
+        simField.moveDirection(simRobot, 0, (self.distance / self.time), 0)
 
 
 class TurnLeftObject(Changable, Scrollable, TurnLeftVisual, Draggable):
     # Turn Left Object (See ForwardObject)
+    subsystem = "drive"
+
     def __str__(self):
         return "TurnLeft"
 
     def runSimBase(self):
         self.distance = self.item
         self.time = 45 * self.item
-        simItems[0].moveDirection(0, 0, -1 * (self.distance / self.time))
+        simField.moveDirection(simRobot, 0, 0, -1 * (self.distance / self.time))
 
 
 class TurnRightObject(Changable, Scrollable, TurnRightVisual, Draggable):
     # Turn Right Object (See ForwardObject)
+    subsystem = "drive"
+
     def __str__(self):
         return "TurnRight"
 
     def runSimBase(self):
         self.distance = self.item
         self.time = 45 * self.item
-        simItems[0].moveDirection(0, 0, (self.distance / self.time))
+        simField.moveDirection(simRobot, 0, 0, (self.distance / self.time))
 
 
 class IntakeStartObject(Scrollable, IntakeStartVisual, Draggable):
     # Intake Start Object
+    subsystem = "intake"
+
     def __str__(self):
         return "IntakeStart"
 
     def runSimBase(self):
-        simItems[0].intakeOn = True  # turn on intake
-        simItems[0].initDraw()  # reload Robot Icon Image
+        simField.setIntake(simRobot, True)  # turn on intake
 
 
 class IntakeStopObject(Scrollable, IntakeStopVisual, Draggable):
     # Intake Stop Object
+    subsystem = "intake"
+
     def __str__(self):
         return "IntakeStop"
 
     def runSimBase(self):
-        simItems[0].intakeOn = False
-        simItems[0].initDraw()  # reload Robot Icon Image
+        simField.setIntake(simRobot, False)
 
 
 class ShootObject(Scrollable, ShootVisual, Draggable):
+    subsystem = "shooter"
+
     def __init__(self, size, pose):
         super().__init__(size, pose)
         self.distance = 4
@@ -1082,39 +1088,39 @@ class ShootObject(Scrollable, ShootVisual, Draggable):
     def __str__(self):
         return "Shoot"
 
-    def runSim(self, time_start):
+    def simStep(self):
         # Run Simulation See TreeNode for complete comments
-        if self.hasRun:
-            if len(self.children) == 0:
-                return None
-            return self.children[0].runSim(time_start)
-        elif time.time() > time_start + simDelay:
-            if (
-                self.iters >= self.time or not simItems[0].intaked
-            ):  # don't do anything if nothing is intaked
-                if self.iters >= simDuration:
-                    self.iters = 0
-                    super().runSim(time.time())
-                    self.hasRun = True
-                    simItems[0].intaked = None  # no longer has anything intaked
-                    simItems[0].isShooting = False  # no longer shooting
-                    return time.time()
-            else:
-                simItems[0].isShooting = True  # it is shooting
-                simItems[0].intaked.moveDirection(
-                    (self.distance) / self.time, 0, 0, round(simItems[0].direction)
-                )  # move the note in the direction of the robot
-                if self.iters == 0:
-                    simItems.append(simItems[0].intaked)  # add to sim items only once
-            self.iters += 1
-        return time_start
+        if (
+            self.iters < self.time and simField.held[simRobot] >= 0
+        ):  # don't do anything if nothing is intaked
+            simField.setShooting(simRobot, True)  # it is shooting
+            note = simField.held[simRobot]
+            simField.moveDirection(
+                note,
+                (self.distance) / self.time,
+                0,
+                0,
+                round(simField.direction[simRobot]),
+            )  # move the note in the direction of the robot
+            if self.iters == 0:
+                simField.show(note)  # put it back on the field only once
+        self.iters += 1
+
+    def simFinished(self):
+        return (
+            self.iters >= self.time or simField.held[simRobot] < 0
+        ) and self.iters >= simDuration
+
+    def simEnd(self):
+        simField.held[simRobot] = -1  # no longer has anything intaked
+        simField.setShooting(simRobot, False)  # no longer shooting
+        super().simEnd()
 
 
 class LoopObject(Changable, Scrollable, LoopVisual, Draggable):
     def __init__(self, size, pose):
         super().__init__(size, pose)
         self.numChild = 1
-        self.currLoop = 1  # current loop
         self.initDraw()
 
     def __str__(self):
@@ -1132,26 +1138,15 @@ class LoopObject(Changable, Scrollable, LoopVisual, Draggable):
             s += f"{self.otherChild.command()}"
         return s
 
-    def resetSim(self, isLoopReset):
-        self.currLoop = 1
-        for i in self.children:
-            i.resetSim(isLoopReset)
-
-    def runSim(self, time_start):
-        match len(self.children):
-            case 0:
-                pass
-            case 1:
-                output = self.children[0].runSim(time_start)
-                if output:  # if not None
-                    return output
-                if self.currLoop < self.item:
-                    self.children[0].resetSim(True)
-                    self.currLoop += 1
-                    return time.time()
+    def simCommands(self, robot):
+        # a new copy of the body for every time round the loop
+        commands = []
+        if len(self.children) == 1:
+            for _ in range(self.item):
+                commands += self.children[0].simCommands(robot)
         if self.otherChild:
-            return self.otherChild.runSim(time_start)
-        return None
+            commands += self.otherChild.simCommands(robot)
+        return commands
 
 
 class EndLoopObject(Scrollable, EndLoopVisual, Draggable):
@@ -1165,22 +1160,8 @@ class EndLoopObject(Scrollable, EndLoopVisual, Draggable):
     def command(self):
         return ""
 
-    def resetSim(self, isLoopReset):
-        if not isLoopReset:
-            for i in self.children:
-                i.resetSim(False)
-
-    def runSim(self, time_start):
-        if self.hasRun:
-            if len(self.children) == 0:
-                return None
-            return self.children[0].runSim(time_start)
-        elif time.time() > time_start:
-            super().runSim(time.time())
-            self.hasRun = True
-            return time.time()
-        else:
-            return time_start
+    def simCommands(self, robot):
+        return []  # ends the loop body
 
 
 # ---------
@@ -1298,29 +1279,24 @@ class GenerateCode(ImageBase, Clickable):
         super().__init__((50, 50), (25 + 75 * num, 25))
 
     def onClick(self):
-        s = ""
-        try:
-            with open("javaIn.java", "r") as file:
-                s += file.read()
-                file.close()
-        except:
-            warnings.append(Warning("javaIn.java File Not Found"))
-            return
-        index = s.find("// ADDCOMMANDSHERE!!!")
-        if index < 0:
-            warnings.append(Warning("Comment not found in javaIn.java file"))
-            return
-        s = s[:index] + generateCommands() + s[index + 20 :]
-        with open("javaOut.java", "w") as file:
-            file.write(s)
-            file.close()
-        if len(warnings) == 0:
-            successes.append(Success("Successfully wrote to the Java File"))
+        # the commands come from the blocks, so they're generated here; the files are read and written in the background
+        # with shift the program is written as trajectories (trajectory.py)
+        if pygame.key.get_mods() & pygame.KMOD_SHIFT:
+            commands = generateTrajectory()
+            if commands is None:
+                toasts.warn("Trajectories need a robot on the field")
+                return
+            done = trajectoryWritten
+            helpers = ""
+        else:
+            # repeated runs of blocks are written once as helper methods (javaHelpers.py)
+            commands, helpers = factorProgram(entriesOf(dragItems[0]))
+            done = javaWritten
+        ioWorker.submit(lambda: writeJava(commands, helpers), done, javaFailed)
 
     def initDraw(self):
-        self.img = pygame.image.load("java.png")
+        self.img = loadImage("java.png")
         self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
 
 
 class RunSim(ImageBase, Clickable):
@@ -1328,18 +1304,23 @@ class RunSim(ImageBase, Clickable):
         super().__init__((50, 50), (25 + 75 * num, 25))
 
     def onClick(self):
-        global currSim, simStartTime
-        if not currSim and not dragItems[0].hasRun:
+        global currSim
+        if not currSim and not simDone:
             currSim = True
-            simStartTime = time.time()
-            self.img = pygame.image.load("playDark.svg")
+            if replayReader:
+                stopReplay()  # the new run is drawn instead
+            # every robot's program runs at once, each one in its own sequential group
+            robots = simField.robots()
+            for i, program in enumerate(robotPrograms()):
+                if i < len(robots):
+                    simScheduler.schedule(program[0].simCommands(robots[i])[0])
+            startRecording()
+            self.img = loadImage("playDark.svg")
             self.imgRect = self.img.get_rect()
-            pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
 
     def initDraw(self):
-        self.img = pygame.image.load("play.svg")
+        self.img = loadImage("play.svg")
         self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
 
 
 class Reset(ImageBase, Clickable):
@@ -1347,19 +1328,43 @@ class Reset(ImageBase, Clickable):
         super().__init__((50, 50), (25 + 75 * num, 25))
 
     def onClick(self):
-        global currSim, simItems, warnings
+        global currSim, simDone
         currSim = False
-        simItems = generateSim(classes)
-        warnings = []
+        simDone = False
+        simScheduler.cancelAll()
+        finishRecording()  # a run stopped part way is still kept
+        simField.restore(fieldSnapshot)
+        toasts.clear(WARNING)
+        applyPendingField()  # a simSetup.txt change that came in while the sim ran
         for i in clickItems:
             if type(i) == RunSim:
                 i.initDraw()
-        dragItems[0].resetSim(False)
 
     def initDraw(self):
-        self.img = pygame.image.load("reset.png")
+        self.img = loadImage("reset.png")
         self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
+
+
+class SelectRobot(ImageBase, Clickable):
+    # Switches the code area between the programs of the robots on the field
+    def __init__(self, num):
+        super().__init__((50, 50), (25 + 75 * num, 25))
+
+    def onClick(self):
+        if not currSim:
+            selectRobot(robotIndex + 1)
+
+    def initDraw(self):
+        self.img = loadImage("robotIconOn.svg")
+
+    def draw(self, surf):
+        super().draw(surf)
+        # number of the robot being edited
+        if len(programs) > 1:
+            surf.blit(
+                blockSurface(((255, 255, 255), (str(robotIndex + 1),), (25, 25))),
+                (self.rect.right - 15, self.rect.bottom - 15),
+            )
 
 
 class Validate(ImageBase, Clickable):
@@ -1367,205 +1372,282 @@ class Validate(ImageBase, Clickable):
         super().__init__((50, 50), (25 + 75 * num, 25))
 
     def initDraw(self):
-        self.img = pygame.image.load("validate.png")
+        self.img = loadImage("validate.png")
         self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
 
     def onClick(self):
-        global warnings, successes
-        warnings = []
-        successes = []
+        toasts.clear()
         openParallels = 0
         openLoops = 0
         for i in dragItems:
             if str(i) == "ParallelGroup":
                 if openParallels == 1:
-                    warnings.append(Warning("Missing EndParallelGroup"))
+                    toasts.warn("Missing EndParallelGroup")
                 else:
                     openParallels += 1
             if str(i) == "EndParallelGroup":
                 if openParallels == 0:
-                    warnings.append(Warning("Extra EndParallelGroup found"))
+                    toasts.warn("Extra EndParallelGroup found")
                 else:
                     openParallels -= 1
             if str(i) == "Loop":
                 if openLoops == 1:
-                    warnings.append(Warning("Missing EndLoop"))
+                    toasts.warn("Missing EndLoop")
                 else:
                     openLoops += 1
             if str(i) == "EndLoop":
                 if openLoops == 0:
-                    warnings.append(Warning("Extra EndLoop found"))
+                    toasts.warn("Extra EndLoop found")
                 else:
                     openLoops -= 1
         if openParallels == 1:
-            warnings.append(Warning("Missing EndParallelGroup"))
+            toasts.warn("Missing EndParallelGroup")
         if openLoops == 1:
-            warnings.append(Warning("Missing EndLoop"))
-        if len(warnings) == 0:
-            successes.append(Success("Successfully Verified!"))
+            toasts.warn("Missing EndLoop")
+        # then what the program will do
+        analysis = analyseProgram()
+        if analysis:
+            for problem in analysis.problems():
+                toasts.warn(problem)
+        if not toasts.has(WARNING):
+            toasts.succeed("Successfully Verified!")
 
 
 # ---------
 # SIM ICONS
-class RobotIcon(SimScrollable, Mobile):
-    def __init__(self, pose):
-        x = pose[0] * simBlockSize
-        y = pose[1] * simBlockSize
-        self.intakeOn = False
-        self.imgIntakeOff = pygame.image.load("robotIconOff.svg")
-        self.imgIntakeOn = pygame.image.load("robotIconOn.svg")
-        super().__init__((simBlockSize, simBlockSize), (x, y))
-        self.intaked = None
-        self.isShooting = False
-
-    def initDraw(self):
-        if self.intakeOn:
-            self.img = self.imgIntakeOn
-        else:
-            self.img = self.imgIntakeOff
-        self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
+class SimView:
+    # Draws the sim field. Every item of a kind shares one sprite, rotated sprites are cached per angle
+    def __init__(self):
+        self.sprites = {}  # (kind, intake on) -> image
+        self.rotated = {}  # (kind, intake on, angle) -> rotated image
+
+    def sprite(self, kind, intakeOn):
+        key = (kind, intakeOn)
+        img = self.sprites.get(key)
+        if img is None:
+            if kind == ROBOT:
+                img = loadImage("robotIconOn.svg" if intakeOn else "robotIconOff.svg")
+            elif kind == NOTE:
+                img = loadImage("noteIcon.svg")
+            else:
+                img = loadImage("obstacleIcon.svg")
+            self.sprites[key] = img
+        return img
+
+    def rotatedSprite(self, kind, intakeOn, direction):
+        # robots and notes are drawn rotated in the direction they face
+        angle = (direction * -90) - 90
+        key = (kind, intakeOn, angle)
+        img = self.rotated.get(key)
+        if img is None:
+            img = pygame.transform.rotate(self.sprite(kind, intakeOn), angle)
+            if direction == round(
+                direction
+            ):  # only keep the four directions, not every step of a turn
+                self.rotated[key] = img
+        return img
+
+    def draw(self, surf, field, offsetX, offsetY, viewWidth, viewHeight):
+        # draw the items in view, offset is where the field's origin is on the surface
+        half = field.cellSize // 2
+        kinds, xs, ys, flags, direction = (
+            field.kind,
+            field.x,
+            field.y,
+            field.flags,
+            field.direction,
+        )
+        for row in field.rowsIn(
+            -offsetX, -offsetY, viewWidth - offsetX, viewHeight - offsetY
+        ):
+            kind = kinds[row]
+            if kind == OBSTACLE:
+                img = self.sprite(kind, False)
+            else:
+                img = self.rotatedSprite(
+                    kind, bool(flags[row] & INTAKE), direction[row]
+                )
+            # center the image on the item's cell
+            surf.blit(
+                img,
+                (
+                    xs[row] + offsetX + half - img.get_width() // 2,
+                    ys[row] + offsetY + half - img.get_height() // 2,
+                ),
+            )
 
-    def __str__(self):
-        return "RobotIcon"
 
+# ---------
+# MISC OBJECTS
+# ------------
+# GENERAL PURPOSE FUNCTIONS
+def printTree():
+    from anytree import RenderTree  # only needed for debugging
 
-class NoteIcon(SimScrollable, Mobile):
-    def __init__(self, pose):
-        x = pose[0] * simBlockSize
-        y = pose[1] * simBlockSize
-        super().__init__((simBlockSize, simBlockSize), (x, y))
+    for pre, fill, node in RenderTree(dragItems[0]):
+        print("%s%s" % (pre, str(node)))
 
-    def __str__(self):
-        return "NoteIcon"
 
-    def initDraw(self):
-        self.img = pygame.image.load("noteIcon.svg")
-        self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
+def generateCommands():
+    return dragItems[0].command()
 
 
-class ObstacleIcon(SimScrollable, Immobile):
-    def __init__(self, pose):
-        x = pose[0] * simBlockSize
-        y = pose[1] * simBlockSize
-        super().__init__((simBlockSize, simBlockSize), (x, y))
+helperComment = "// ADDHELPERSHERE!!!"  # where writeJava puts the helper methods
 
-    def __str__(self):
-        return "ObstacleIcon"
 
-    def initDraw(self):
-        self.img = pygame.image.load("obstacleIcon.svg")
-        self.imgRect = self.img.get_rect()
-        pygame.transform.scale(self.img, (simBlockSize, simBlockSize))
+class JavaTemplateError(Exception):
+    # javaIn.java doesn't have the comment the commands go at
+    pass
 
 
-# ---------
-# MISC OBJECTS
-class Warning(Object):
-    def __init__(self, content):
-        if len(warnings) == 0:
-            pose = (400, 200)
-        else:
-            pose = (400, warnings[-1].rect.bottom + 20)
-        self.initDraw(content)
-        super().__init__((500, len(self.textRects) * 30 + 20), pose)
-
-    def initDraw(self, content):
-        lis = content.split(" ")
-        lines = [[]]
-        currLine = 0
-        currCount = 0
-        for word in lis:
-            currCount += len(word) + 1
-            if currCount > 25:
-                lines.append([])
-                currCount = 0
-                currLine += 1
-            lines[currLine].append(word)
-        self.textLs = []
-        self.textRects = []
-        for line in lines:
-            line = " ".join(line)
-            self.textLs.append(font.render(line, True, black))
-            self.textRects.append(self.textLs[-1].get_rect())
+def writeJava(commands, helpers=""):
+    # background job: put the commands into javaIn.java at the comment and save it as javaOut.java
+    # the helper methods the commands call go at the helper comment
+    with open("javaIn.java", "r") as file:
+        s = file.read()
+    index = s.find("// ADDCOMMANDSHERE!!!")
+    if index < 0:
+        raise JavaTemplateError("Comment not found in javaIn.java file")
+    s = s[:index] + commands + s[index + 20 :]
+    index = s.find(helperComment)
+    if index >= 0:
+        s = s[:index] + helpers.lstrip() + s[index + len(helperComment) :]
+    elif helpers:
+        raise JavaTemplateError("Helper comment not found in javaIn.java file")
+    with open("javaOut.java", "w") as file:
+        file.write(s)
 
-    def draw(self, surf):
-        self.fill((200, 45, 50))
-        self.set_alpha(200)
-        surf.blit(self, self.rect)
-        for i in range(len(self.textRects)):
-            offset = i * 30
-            self.textRects[i].center = (self.rect.centerx, self.rect.top + offset + 25)
-            surf.blit(self.textLs[i], self.textRects[i])
-
-
-class Success(Object):
-    def __init__(self, content):
-        if len(warnings) == 0:
-            pose = (400, 200)
-        else:
-            pose = (400, warnings[-1].rect.bottom + 20)
-        self.initDraw(content)
-        super().__init__((500, len(self.textRects) * 30 + 20), pose)
-
-    def initDraw(self, content):
-        lis = content.split(" ")
-        lines = [[]]
-        currLine = 0
-        currCount = 0
-        for word in lis:
-            currCount += len(word) + 1
-            if currCount > 25:
-                lines.append([])
-                currCount = 0
-                currLine += 1
-            lines[currLine].append(word)
-        self.textLs = []
-        self.textRects = []
-        for line in lines:
-            line = " ".join(line)
-            self.textLs.append(font.render(line, True, black))
-            self.textRects.append(self.textLs[-1].get_rect())
 
-    def draw(self, surf):
-        self.fill((45, 200, 50))
-        self.set_alpha(200)
-        surf.blit(self, self.rect)
-        for i in range(len(self.textRects)):
-            offset = i * 30
-            self.textRects[i].center = (self.rect.centerx, self.rect.top + offset + 25)
-            surf.blit(self.textLs[i], self.textRects[i])
+def javaWritten(result):
+    if not toasts.has(WARNING):
+        toasts.succeed("Successfully wrote to the Java File")
 
 
-# ------------
-# GENERAL PURPOSE FUNCTIONS
-def printTree():
-    for pre, fill, node in RenderTree(dragItems[0]):
-        print("%s%s" % (pre, str(node)))
+def trajectoryWritten(result):
+    if not toasts.has(WARNING):
+        seconds, blockSeconds = trajectorySeconds
+        toasts.succeed(
+            f"Wrote the trajectory to the Java File, {seconds:.1f}s "
+            f"instead of {blockSeconds:.1f}s"
+        )
 
 
-def generateCommands():
-    return dragItems[0].command()
+def javaFailed(error):
+    if isinstance(error, JavaTemplateError):
+        toasts.warn(str(error))
+    elif isinstance(error, FileNotFoundError) and error.filename == "javaIn.java":
+        toasts.warn("javaIn.java File Not Found")
+    else:
+        reason = getattr(error, "strerror", None) or error
+        toasts.warn(f"Couldn't write the Java File: {reason}")
 
 
 blockSize = 20  # Set the size of the grid block
 
 
-def drawGrid():
-    for x in range(sideNav["width"], width - sideSim["width"], blockSize):
-        for y in range(
-            topNav["height"] - blockSize * 3, height + blockSize * 3, blockSize
-        ):
-            rect = pygame.Rect(x, y + (scrollY % (blockSize * 2)), blockSize, blockSize)
-            pygame.draw.rect(screen, white, rect, 1)
+def canvasCenter():
+    # x that stays in place when zooming the code canvas
+    return (width - sideNav["width"] - sideSim["width"]) // 2 + sideNav["width"]
+
+
+def canvasRect(rect):
+    # where a block's rect is on the screen, blocks keep their unzoomed and unscrolled position in rect
+    cx, top = canvasCenter(), topNav["height"]
+    return pygame.Rect(
+        round(cx + (rect.x - cx) * zoom),
+        round(top + (rect.y + scrollY - top) * zoom),
+        round(rect.width * zoom),
+        round(rect.height * zoom),
+    )
+
+
+def canvasPoint(pos):
+    # the position on the code canvas under a point on the screen (the reverse of canvasRect)
+    cx, top = canvasCenter(), topNav["height"]
+    return (
+        round(cx + (pos[0] - cx) / zoom),
+        round(top + (pos[1] - top) / zoom - scrollY),
+    )
+
+
+def scrollCanvasTo(y):
+    # scrolls the code canvas so the canvas y is in the middle of the screen
+    global scrollY
+    middle = (height - topNav["height"]) // 2
+    scrollY = min(topNav["height"] + middle / zoom - y, 0)
+
+
+def drawMinimap(surf, frame):
+    # the minimap of the selected robot's program along the right of the code canvas
+    left = sideNav["width"]
+    minimap.sync(dragItems, left, topNav["height"], width - sideSim["width"] - left)
+    running = []
+    if currSim:
+        robots = simField.robots()
+        for command in simScheduler.scheduled:
+            for leaf in command.leaves():
+                if robotIndex < len(robots) and leaf.robot == robots[robotIndex]:
+                    running.append(leaf.block)
+    elif frame:
+        for robot, index in frame.active:
+            if robot == robotIndex and index < len(dragItems):
+                running.append(dragItems[index])
+    mapWidth = minimap.surface.get_width()
+    minimap.draw(
+        surf,
+        pygame.Rect(
+            width - sideSim["width"] - mapWidth - 5,
+            topNav["height"] + 5,
+            mapWidth,
+            height - topNav["height"] - 10,
+        ),
+        canvasPoint((0, topNav["height"]))[1],
+        round((height - topNav["height"]) / zoom),
+        running,
+    )
+
+
+def zoomCanvas(steps, pos):
+    # zooms the code canvas steps levels in (negative is out), keeping the row under pos in place
+    global zoom, scrollY
+    level = zoomLevels.index(zoom)
+    level = max(0, min(level - steps, len(zoomLevels) - 1))
+    y = canvasPoint(pos)[1]
+    zoom = zoomLevels[level]
+    scrollY = min(topNav["height"] + (pos[1] - topNav["height"]) / zoom - y, 0)
+
+
+def drawGrid(surf):
+    if zoom == 1:
+        for x in range(sideNav["width"], width - sideSim["width"], blockSize):
+            for y in range(
+                topNav["height"] - blockSize * 3, height + blockSize * 3, blockSize
+            ):
+                rect = pygame.Rect(
+                    x, y + (scrollY % (blockSize * 2)), blockSize, blockSize
+                )
+                pygame.draw.rect(surf, white, rect, 1)
+        return
+    # zoomed out the cells get small, so lines are drawn instead of a rect per cell
+    step = blockSize * zoom
+    while step < 10:  # every other line when they would be too close
+        step *= 2
+    left, top = canvasRect(pygame.Rect(sideNav["width"], 0, 0, 0)).topleft
+    right = width - sideSim["width"]
+    x = left - (left - sideNav["width"]) // step * step
+    while x < right:
+        pygame.draw.line(surf, white, (round(x), topNav["height"]), (round(x), height))
+        x += step
+    y = top - (top - topNav["height"]) // step * step
+    while y < height:
+        pygame.draw.line(surf, white, (sideNav["width"], round(y)), (right, round(y)))
+        y += step
 
 
 simBlockSize = 50
 
 
-def drawGrid2():
+def drawGrid2(surf):
     for x in range(
         width - sideSim["width"] - simBlockSize * 3,
         width + simBlockSize * 3,
@@ -1580,40 +1662,648 @@ def drawGrid2():
                 simBlockSize,
                 simBlockSize,
             )
-            pygame.draw.rect(screen, white, rect, 1)
+            pygame.draw.rect(surf, white, rect, 1)
 
 
-def generateSim(classes: list):
-    simItems = []
-    filename = "simSetup.txt"
+def generateSim(filename="simSetup.txt"):
+    # reads the field setup and creates the sim field, the robot is always first (row 0)
     try:
-        with open(filename, "r") as file:
-            for line in file.readlines():
-                if len(line) == 0:
-                    continue
-                lis = line.split(",")
-                if len(lis) < 3:
-                    print(
-                        f"Error with importing {filename}, ensure that all lines have 3 items seperated by commas"
-                    )
-                    exit()
-                pose = (int(lis[1]), int(lis[2]))
-                obj = None
-                for i in classes:
-                    if lis[0] == i.__name__:
-                        obj = i(pose)
-                        simItems.append(obj)
-                        break
-                if not obj:
-                    print(
-                        f"Error with importing {filename}, ensure that all lines have a correct Name."
-                    )
-                    exit()
-            file.close()
-        return simItems
-    except:
-        print(f"simSetup.txt is missing")
+        entities = readField(filename, kindCodes)
+    except FileNotFoundError:
+        print(f"{filename} is missing")
+        exit()
+    except FieldSetupError as error:
+        print(f"Error with importing {filename}:\n{error}")
+        exit()
+    robots = [i for i in entities if i[0] == "RobotIcon"]
+    if not robots:
+        print(f"Error with importing {filename}, there must be a RobotIcon")
         exit()
+    field = SimField.fromEntities(
+        robots + [i for i in entities if i[0] != "RobotIcon"], simBlockSize
+    )
+    field.onBlocked = blockedWarning
+    return field
+
+
+def fieldChanged(entities):
+    # the watcher read a changed simSetup.txt, it's applied right away unless the sim is running or has run
+    global pendingField
+    if not any(i[0] == "RobotIcon" for i in entities):
+        toasts.warn("simSetup.txt needs a RobotIcon, kept the old field")
+        return
+    pendingField = entities
+    applyPendingField()
+
+
+def fieldFailed(error):
+    # keep the old field until the file is fixed
+    print(f"Error with importing simSetup.txt:\n{error}")
+    if isinstance(error, FieldSetupError):
+        toasts.warn(f"Error in simSetup.txt line {error.errors[0][0]}")
+    else:
+        toasts.warn("Couldn't read simSetup.txt")
+
+
+def applyPendingField():
+    # changes only the items of the field that differ from the new simSetup.txt, and makes it the Reset state
+    global pendingField, fieldSnapshot
+    if pendingField is None or currSim or simDone:
+        return
+    simField.applyEntities(pendingField)
+    pendingField = None
+    fieldSnapshot = simField.snapshot()
+    analysisField()
+    # new robots get an empty program, programs of removed robots are kept in case they come back
+    robotPrograms()
+    while len(programs) < len(simField.robots()):
+        programs.append([StartObject()])
+
+
+def blockedWarning(row):
+    if not toasts.has(WARNING):  # add a warning for moving into obstacles
+        toasts.warn("Attempted to move into an obstacle or another robot")
+
+
+def rebuildTree():
+    # find the parents of all the items on the board, snap them to the grid and reorder the list by y value
+    global dragItems
+    with frameProfiler.phase("tree"):
+        # links before the rebuild, the analysis of blocks whose links changed is redone
+        before = {i: (i.parent, i.otherChild) for i in dragItems}
+        for i in dragItems:
+            i.children = ()
+        for i in dragItems:
+            i.findParents()
+        # snap all items to the grid
+        for i in dragItems:
+            i.snapToGrid()
+        # reorder list by y value
+        newDict = {}
+        keys = []
+        for i in dragItems:
+            newDict[i.rect.top] = i
+            keys.append(i.rect.top)
+        keys.sort()
+        newList = []
+        for key in keys:
+            newList.append(newDict[key])
+        dragItems = newList
+        kept = set(newList)
+        for i, links in before.items():
+            if i not in kept or (i.parent, i.otherChild) != links:
+                programAnalyzer.invalidate(i)
+                if links[0] is not None:
+                    programAnalyzer.invalidate(links[0])
+        minimap.moved()
+
+
+def copyBlocks(blocks):
+    # copies of blocks with the links between them (parents, otherChild) pointing at the copies
+    copies = {}
+    for block in blocks:
+        block.clone(copies)
+    for block, new in copies.items():
+        new.otherChild = copies.get(block.otherChild)
+        if hasattr(block, "parents"):
+            new.parents = [copies[i] for i in block.parents if i in copies]
+        if block.parent in copies:
+            new.parent = copies[block.parent]
+    return [copies[block] for block in blocks]
+
+
+def blockAt(pos):
+    # the block in the code area under a point on the screen, None if there is none
+    # (not collide, that would click the up and down buttons)
+    point = canvasPoint(pos)
+    for i in dragItems:
+        if i.rect.collidepoint(point):
+            return i
+    return None
+
+
+def subtree(block):
+    # a block and every block after it up to the end of the group it is in, in order from the top (the Start
+    # block itself is never copied); a Loop or ParallelGroup takes its End block with it
+    blocks = []
+    groupBlocks(block, blocks)
+    blocks = list(dict.fromkeys(blocks))
+    blocks.sort(key=lambda i: i.rect.y)
+    return blocks
+
+
+def groupBlocks(block, blocks):
+    # adds a block and the blocks after it up to the end of its group to blocks, the same way command() walks them
+    # returns the End block it stopped at, None at the end of the program
+    while block is not None and str(block) not in ("EndParallelGroup", "EndLoop"):
+        name = str(block)
+        if name != "Start":
+            blocks.append(block)
+        if name in ("Loop", "ParallelGroup"):
+            for child in block.children:
+                end = groupBlocks(child, blocks)
+                if end is not None:
+                    blocks.append(end)
+            block = block.otherChild
+        else:
+            block = block.children[0] if block.children else None
+    return block
+
+
+def copySubtree(pos):
+    # Ctrl+C: the block under pos and the blocks after it go into the clipboard, as copies so later edits don't
+    # change what gets pasted
+    global clipboard
+    block = blockAt(pos)
+    blocks = subtree(block) if block else []
+    if not blocks:
+        return
+    clipboard = copyBlocks(blocks)
+    toasts.succeed(f"Copied {len(clipboard)} blocks (Ctrl+V to paste)")
+
+
+def pasteBlocks(pos, blocks):
+    # copies of blocks, the first one at pos, the blocks below moved down to make room
+    global dragItems
+    if not blocks:
+        return
+    blocks = copyBlocks(blocks)
+    x, y = canvasPoint(pos)
+    y = max(y, dragItems[0].rect.y + 1)  # nothing goes above the Start block
+    first = blocks[0].rect
+    dx, dy = x - first.centerx, y - first.y
+    span = max(i.rect.bottom for i in blocks) - first.y + blockSize
+    for i in dragItems:
+        if i.rect.y >= y and str(i) != "Start":
+            i.rect.y += span
+    for i in blocks:
+        i.rect.move_ip(dx, dy)
+    # in order from the top, so every block snaps below a parent that has already snapped and one pass links them
+    dragItems = sorted(dragItems + blocks, key=lambda i: i.rect.y)
+    rebuildTree()
+    recordHistory()
+
+
+def duplicateSubtree(pos):
+    # Ctrl+D: the block under pos and the blocks after it, pasted again right below them
+    block = blockAt(pos)
+    blocks = subtree(block) if block else []
+    if not blocks:
+        return
+    bottom = max(i.rect.bottom for i in blocks)
+    below = pygame.Rect(blocks[0].rect.centerx, bottom + 1, 0, 0)
+    pasteBlocks(canvasRect(below).topleft, blocks)
+
+
+def analyseProgram():
+    # static analysis of the program in the code area, from where its robot starts; None without a robot
+    robots = simField.robots()
+    if robotIndex >= len(robots):
+        return None
+    row = robots[robotIndex]
+    kind, x, y, direction = fieldSnapshot[:4]
+    cs = simField.cellSize
+    return programAnalyzer.analyse(
+        dragItems[0], x[row] // cs, y[row] // cs, direction[row]
+    )
+
+
+def generateTrajectory():
+    # the program in the code area as trajectories from where its robot starts; None without a robot
+    global trajectorySeconds
+    robots = simField.robots()
+    if robotIndex >= len(robots):
+        return None
+    row = robots[robotIndex]
+    kind, x, y, direction = fieldSnapshot[:4]
+    cs = simField.cellSize
+    commands, seconds = trajectoryCommand(
+        dragItems[0], programAnalyzer, x[row] // cs, y[row] // cs, direction[row]
+    )
+    trajectorySeconds = (seconds, analyseProgram().seconds)
+    return commands
+
+
+def analysisField():
+    # the analysis runs on the starting field
+    programAnalyzer.setField(simField.cellSize, *fieldSnapshot[:3])
+
+
+def analysisSurface(analysis):
+    # the summary in the top nav, only rendered again when it changes
+    global analysisText
+    directions = ("right", "down", "left", "up")
+    x, y, direction = analysis.pose
+    lines = (
+        f"{analysis.seconds:.1f}s of {autoSeconds}s",
+        f"ends at {x},{y} facing {directions[direction]}",
+    )
+    color = (250, 120, 120) if analysis.problems() else white
+    if analysisText[0] != (lines, color):
+        surf = pygame.Surface((500, 80), pygame.SRCALPHA)
+        for i, line in enumerate(lines):
+            surf.blit(font.render(line, True, color), (0, i * 40))
+        analysisText = ((lines, color), surf)
+    return analysisText[1]
+
+
+def solveProgram():
+    # searches in the background for a program that shoots every note, for the selected robot
+    robots = simField.robots()
+    if robotIndex >= len(robots):
+        return
+    kind, x, y, direction = fieldSnapshot[:4]
+    problem = fieldProblem(kind, x, y, direction, simField.cellSize, robots[robotIndex])
+    ioWorker.compute(
+        lambda: solve(*problem, seconds=3),
+        loadSolution,
+        lambda error: toasts.warn(f"The solver failed: {error}"),
+    )
+
+
+def submitProgram():
+    # sends the program in the code area to the grading server (grader.py), the result comes back as a message
+    # grading can wait minutes for the server, so it runs on a thread of its own, not the file I/O one
+    import asyncio
+    import grader
+
+    url = os.environ.get("FRCBLOCKS_GRADER", grader.defaultUrl)
+    name = grader.defaultName()
+    entries = entriesOf(dragItems[0])
+    toasts.succeed(f"Sending the program to {url}")
+    ioWorker.detach(
+        lambda: asyncio.run(grader.submitProgram(url, name, entries)),
+        programGraded,
+        lambda error: toasts.warn(f"Couldn't grade the program: {error}"),
+    )
+
+
+def programGraded(status):
+    result = status["result"]
+    toasts.succeed(
+        f"Graded: {result['notes']} note(s) in {result['seconds']}s, "
+        f"#{result['rank']} on the leaderboard"
+    )
+
+
+def loadSolution(solution):
+    # replaces the program in the code area with the solver's, Ctrl+Z brings the old one back
+    global dragItems
+    if not solution.solved:
+        toasts.warn("No program found that shoots every note")
+        return
+    classes = {
+        "MoveForward": ForwardObject,
+        "MoveBackward": BackwardObject,
+        "MoveLeft": LeftObject,
+        "MoveRight": RightObject,
+        "TurnLeft": TurnLeftObject,
+        "TurnRight": TurnRightObject,
+        "IntakeStart": IntakeStartObject,
+        "IntakeStop": IntakeStopObject,
+        "Shoot": ShootObject,
+    }
+    start = dragItems[0]
+    blocks = [start]
+    y = start.rect.bottom + blockSize
+
+    def add(block, item=None):
+        nonlocal y
+        block.rect.centerx = start.rect.centerx
+        block.rect.y = y
+        if item:
+            block.item = item
+            block.initDraw()
+        blocks.append(block)
+        y += block.rect.height + blockSize
+
+    def addAll(entries):
+        for entry in entries:
+            if entry[0] == "Loop":
+                add(LoopObject((220, 100), (0, 0)), entry[1])
+                addAll(entry[2])
+                add(EndLoopObject((260, 100), (0, 0)))
+            else:
+                add(classes[entry[0]]((180, 100), (0, 0)), entry[1])
+
+    addAll(solution.blocks)
+    dragItems = blocks
+    rebuildTree()
+    rebuildTree()  # second pass links blocks that only lined up after snapping
+    recordHistory()
+    toasts.succeed(f"Solved with {solution.blockCount()} blocks (Ctrl+Z to undo)")
+
+
+def stepSim():
+    # advance the simulation by one frame, every scheduled command runs once
+    global currSim, simDone
+    with frameProfiler.phase("sim"):
+        simScheduler.run()
+        if recorder:
+            recorder.record(simField, runningBlocks())
+        # once every program is done, not sim anymore
+        if not simScheduler.scheduled:
+            currSim = False
+            simDone = True
+            finishRecording()
+
+
+# ---------
+# REPLAYS
+def startRecording():
+    # records the run that just started into replays/, the file is written in the background
+    global recorder, recordingFile, blockIndex
+    if not recordRuns:
+        return
+    recordingFile = replayName()
+    ioWorker.submit(lambda filename=recordingFile: createFile(filename))
+    ioWorker.submit(lambda: pruneReplays(replayLimit))
+    recorder = Recorder(
+        simField,
+        lambda chunk, filename=recordingFile: ioWorker.submit(
+            lambda: appendFile(filename, chunk)
+        ),
+    )
+    # where every block is in its robot's program, stored with the running blocks
+    blockIndex = {}
+    for program in robotPrograms():
+        for i, block in enumerate(program):
+            blockIndex[block] = i
+
+
+def replayName():
+    # a new file in replays/ named after the time, runs started in the same second get -2, -3, ...
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    filename = os.path.join("replays", stamp + ".replay")
+    n = 1
+    while filename == recordingFile or os.path.exists(filename):
+        n += 1
+        filename = os.path.join("replays", f"{stamp}-{n}.replay")
+    return filename
+
+
+def pruneReplays(keep):
+    # background job: deletes all but the newest keep recordings
+    files = [os.path.join("replays", f) for f in os.listdir("replays")]
+    files = [f for f in files if f.endswith(".replay")]
+    files.sort(key=os.path.getmtime)
+    for filename in files[: max(len(files) - keep, 0)]:
+        os.remove(filename)
+
+
+def createFile(filename):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    open(filename, "wb").close()
+
+
+def appendFile(filename, chunk):
+    with open(filename, "ab") as file:
+        file.write(chunk)
+
+
+def runningBlocks():
+    # (robot number, block index) of every block running right now
+    robots = simField.robots()
+    running = []
+    for command in simScheduler.scheduled:
+        for leaf in command.leaves():
+            if leaf.robot in robots:
+                running.append((robots.index(leaf.robot), blockIndex[leaf.block]))
+    return running
+
+
+def finishRecording():
+    # ends the recording, F6 plays it once the file is written
+    global recorder
+    if not recorder:
+        return
+    recorder.finish()
+    recorder = None
+    ioWorker.submit(lambda filename=recordingFile: filename, setLastReplay)
+
+
+def setLastReplay(filename):
+    global lastReplay
+    lastReplay = filename
+
+
+def startReplay(filename):
+    # shows a recording on the field instead of the sim, a frame at a time
+    global replayReader, replayTick, replayField, replayFrame
+    try:
+        replayReader = ReplayReader(filename)
+    except (OSError, ValueError) as error:
+        toasts.warn(f"Couldn't open the replay: {error}")
+        return
+    replayTick = 0
+    replayField = SimField(replayReader.cellSize)
+    replayFrame = None
+
+
+def stopReplay():
+    global replayReader, replayFrame
+    replayReader.close()
+    replayReader = None
+    replayFrame = None
+
+
+def stepReplay():
+    # moves the replay to the field at replayTick, playing on one tick per update
+    global replayTick, replayFrame
+    replayFrame = replayReader.frame(replayTick)
+    replayField.restore(replayFrame.snapshot())
+    if replayTick < replayReader.ticks - 1:
+        replayTick += 1
+
+
+def replaySurface(frame):
+    # what the replay is showing in the top nav
+    global analysisText
+    lines = [
+        f"Replay {frame.tick * tickSeconds:.1f}s of {replayReader.ticks * tickSeconds:.1f}s"
+    ]
+    names = []
+    for robot, index in frame.active:
+        if (
+            robot == robotIndex
+            and robot < len(programs)
+            and index < len(programs[robot])
+        ):
+            names.append(str(programs[robot][index]))
+    lines.append(", ".join(names) or "-")
+    if analysisText[0] != (lines, white):
+        surf = pygame.Surface((500, 80), pygame.SRCALPHA)
+        for i, line in enumerate(lines):
+            surf.blit(font.render(line, True, white), (0, i * 40))
+        analysisText = ((lines, white), surf)
+    return analysisText[1]
+
+
+def conflictWarning(message):
+    # blocks that need the same part of a robot at the same time, repeats are counted on the message
+    toasts.warn(message)
+
+
+def robotPrograms():
+    # the block program of every robot, the selected robot's program is the one being edited
+    programs[robotIndex] = dragItems
+    return programs
+
+
+def selectRobot(index):
+    # switch the code area to another robot's program
+    global robotIndex, dragItems
+    robotPrograms()
+    robotIndex = index % len(programs)
+    dragItems = programs[robotIndex]
+    rebuildTree()
+
+
+def blockRecord(block):
+    # (block, parent, x, y, item) for the undo history, the position from the parent so moving it along keeps it
+    parent = block.parent
+    if parent is None:
+        return (block, None, block.rect.x, block.rect.y, block.item)
+    x, y = block.rect.x - parent.rect.x, block.rect.y - parent.rect.y
+    return (block, parent, x, y, block.item)
+
+
+def modelState():
+    # every robot's program as records, for the undo history
+    return [[blockRecord(i) for i in program] for program in robotPrograms()]
+
+
+def recordHistory():
+    # add a step to the undo history if the blocks changed
+    global programEdited
+    programEdited = False
+    history.record(robotIndex, modelState())
+
+
+def blockRemoved(block):
+    # a block is about to leave the code area, rebuildTree no longer sees it so the block it hung from is redone here
+    if block.parent is not None:
+        programAnalyzer.invalidate(block.parent)
+
+
+def restoreState(step):
+    # put every block back where it was in an undo history step
+    global programs, dragItems, robotIndex
+    kept = {block for p in range(len(step.programs)) for block, *_ in step.records(p)}
+    for program in robotPrograms():
+        for block in program:
+            if block not in kept:
+                blockRemoved(block)
+    programs = []
+    for p in range(len(step.programs)):
+        program = []
+        # records are in order from the top, so a parent is always back in place before its children
+        for block, parent, x, y, item in step.records(p):
+            if parent is not None:
+                x += parent.rect.x
+                y += parent.rect.y
+            block.rect.x = x
+            block.rect.y = y
+            if block.item != item:
+                block.item = item
+                block.initDraw()
+                programAnalyzer.invalidate(block)
+            program.append(block)
+        # rebuild each program's tree, not only the one in the code area
+        dragItems = program
+        rebuildTree()
+        programs.append(dragItems)
+    robotIndex = step.selected
+    dragItems = programs[robotIndex]
+
+
+def drawFrame(surf):
+    # draws every area of the window onto the surface
+    with frameProfiler.phase("drawSim"):
+        surf.fill(bg)
+        # SideSim
+        pygame.draw.rect(
+            surf,
+            sideSim["bg"],
+            pygame.Rect(
+                width - sideSim["width"],
+                topNav["height"],
+                sideSim["width"],
+                height - topNav["height"],
+            ),
+        )
+        drawGrid2(surf)
+        # a replay is drawn in place of the sim
+        frame = replayFrame if replayReader else None
+        shown = replayField if frame else simField
+        simView.draw(
+            surf,
+            shown,
+            simScrollX + (width - sideSim["width"]),
+            simScrollY + topNav["height"],
+            width,
+            height,
+        )
+        robots = simField.robots()
+        analysis = None if currSim or simDone or frame else analyseProgram()
+        if analysis:
+            # dots on the cells the program will drive through
+            cs = simField.cellSize
+            left = simScrollX + width - sideSim["width"] + cs // 2
+            top = simScrollY + topNav["height"] + cs // 2
+            for cx, cy in analysis.cells:
+                pygame.draw.circle(
+                    surf, (70, 70, 160), (cx * cs + left, cy * cs + top), 4
+                )
+        if len(robots) > 1 and robotIndex < len(robots):
+            # outline the robot whose program is being edited
+            row = robots[robotIndex]
+            pygame.draw.rect(
+                surf,
+                (250, 200, 30),
+                pygame.Rect(
+                    shown.x[row] + simScrollX + width - sideSim["width"],
+                    shown.y[row] + simScrollY + topNav["height"],
+                    simField.cellSize,
+                    simField.cellSize,
+                ),
+                3,
+            )
+    with frameProfiler.phase("drawCode"):
+        # MainArea
+        pygame.draw.rect(surf, bg, pygame.Rect(0, 0, width - sideSim["width"], height))
+        drawGrid(surf)
+    with frameProfiler.phase("drawNav"):
+        # SideNav
+        pygame.draw.rect(
+            surf,
+            sideNav["bg"],
+            pygame.Rect(
+                0, topNav["height"], sideNav["width"], height - topNav["height"]
+            ),
+        )
+        for i in grabItems:
+            i.draw(surf)
+    with frameProfiler.phase("drawCode"):
+        # main board items
+        for i in dragItems:
+            i.draw(surf)
+        drawMinimap(surf, frame)
+    with frameProfiler.phase("drawNav"):
+        # draw top navigation
+        pygame.draw.rect(surf, topNav["bg"], pygame.Rect(0, 0, width, topNav["height"]))
+        for i in clickItems:
+            i.draw(surf)
+        # how long the program takes and where it ends
+        if frame:
+            surf.blit(replaySurface(frame), (25 + 75 * len(clickItems), 12))
+        elif analysis:
+            surf.blit(analysisSurface(analysis), (25 + 75 * len(clickItems), 12))
+        # draw warnings and successes, one blit each
+        toasts.expire()
+        toasts.draw(surf)
+    with frameProfiler.phase("hud"):
+        frameProfiler.drawHud(surf, (width - 310, topNav["height"] + 10))
 
 
 # ----------
@@ -1626,6 +2316,10 @@ bg = 185, 192, 230
 # but pos y would move the origin down, and the content down
 scrollY = 0
 navScrollY = 0
+# Zoom of the code canvas, blocks are drawn from surfaces scaled once per level (see scaled)
+zoomLevels = (1.0, 0.75, 0.5, 0.375, 0.25)
+zoom = 1.0
+minimap = Minimap()
 simScrollY = 0
 simScrollX = 0
 # NavBarTop
@@ -1648,249 +2342,396 @@ iteration = 1
 start = time.time_ns()
 # Dragging
 currDrag = None
+spawned = None  # block taken from the side bar in this drag
+dragFrom = None  # where the dragged block was when the drag started
+# blocks were added, deleted, moved or changed since the last undo step
+programEdited = False
+clipboard = []  # copies of the blocks Ctrl+C copied, copied again for every paste
+# thrown away blocks, handed out again by the side bar (ObjectFactory.generate)
+blockPool = ObjectPool(resetBlock)
+poolSize = 3  # blocks of each type made at startup
 backgroundDrag = False
 navDrag = False
 simDrag = False
-# Items
-grabItems = [
-    ForwardFactory(1),
-    BackwardFactory(2),
-    LeftFactory(3),
-    RightFactory(4),
-    TurnLeftFactory(5),
-    TurnRightFactory(6),
-    IntakeStartFactory(7),
-    IntakeStopFactory(8),
-    ShootFactory(9),
-    LoopFactory(10),
-    EndLoopFactory(11),
-    ParallelFactory(12),
-    EndParallelFactory(13),
-]
-dragItems = [StartObject()]
-clickItems = [GenerateCode(0), Validate(1), RunSim(2), Reset(3)]
-warnings = []
-successes = []
+# Items (created by init)
+grabItems = []
+dragItems = []
+clickItems = []
+simField = SimField()
+toasts = None  # warning and success messages, created by init() once the font is loaded
 # Simulation
 currSim = False
 simDelay = 0.1
 simDuration = 50
 currSimItems = []
 timeSinceLastClick = 0
-simStartTime = None
+simScheduler = CommandScheduler()
+simScheduler.onConflict = conflictWarning
+simDone = False  # the programs have run, Reset before running again
+simRobot = 0  # row of the robot whose block is running
+# Robots
+programs = []  # one program (list of blocks, Start first) per robot on the field
+robotIndex = 0  # robot whose program is in the code area
 # MaxScrolling
 maxScroll = 0
-for i in grabItems:
-    b = i.rect.bottom
-    if b > maxScroll:
-        maxScroll = b
-maxScroll += 20
-classes = [RobotIcon, NoteIcon, ObstacleIcon]  # sim classes
-simItems = generateSim(classes)
-# Start the window
-screen = pygame.display.set_mode(size, pygame.RESIZABLE, pygame.SRCALPHA)
-while True:
-    # ---------
-    # LOGIC
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        if (
-            event.type == pygame.MOUSEBUTTONDOWN
-            and event.button == 1
-            and timeSinceLastClick > 20
-        ):
-            timeSinceLastClick = 0  # reset click timer
-            for i in clickItems:  # if you click a nav item, run their onClick Function
-                if i.collide(event):
-                    i.onClick()
-                    break
-            for i in grabItems:  # if you click a factory, generate a new drag item
-                if i.collide(event) and not currSim and event.pos[1] > topNav["height"]:
-                    i.generate()
-                    break
-            for i in dragItems:  # if you click a draggable item, start dragging it
-                if i.collide(event) and not currSim and event.pos[1] > topNav["height"]:
-                    currDrag = i
-                    break
-            for i in warnings:  # if you click a warning, get rid of it
-                if i.collide(event):
-                    warnings.remove(i)
-                    del i
-            for i in successes:  # if you click a success message, get rid of it
-                if i.collide(event):
-                    successes.remove(i)
-                    del i
-            # if you don't click anything you can drag and you are within one of the three draggable areas, start dragging it
-            if (
-                not currDrag
-                and event.pos[0] > sideNav["width"]
-                and event.pos[0] < width - sideSim["width"]
-                and event.pos[1] > topNav["height"]
-            ):
-                backgroundDrag = True
-            elif (
-                not currDrag
-                and event.pos[0] < sideNav["width"]
-                and event.pos[1] > topNav["height"]
-            ):
-                navDrag = True
-            elif (
-                not currDrag
-                and event.pos[0] > (width - sideSim["width"])
-                and event.pos[1] > topNav["height"]
-            ):
-                simDrag = True
-        if event.type == pygame.MOUSEMOTION:
-            # update mouse position
-            mouse = event.pos
-            if currDrag:  # if dragging an item, move it
-                currDrag.drag(event)
-            if backgroundDrag:  # if dragging a zone, move it
-                scrollY += event.rel[1]
-            if navDrag:
-                navScrollY += event.rel[1]
-            if simDrag:
-                simScrollX += event.rel[0]
-                simScrollY += event.rel[1]
-        if event.type == pygame.MOUSEBUTTONUP:
-            if currDrag:
-                # remove it if its past the edge on either side
-                if currDrag.rect.centerx < sideNav["width"] or currDrag.rect.centerx > (
-                    width - sideSim["width"]
+simView = None
+fieldSnapshot = None  # starting state of the field, used by Reset
+programAnalyzer = (
+    Analyzer()
+)  # static analysis of the programs, redone along edited paths only
+analysisText = (None, None)  # the summary in the top nav and its surface
+trajectorySeconds = (0.0, 0.0)  # last trajectory export and block program run times
+pendingField = None  # simSetup.txt entities waiting for the sim to be reset
+fieldWatcher = None  # reloads simSetup.txt when it changes
+# Replays
+recordRuns = True  # record every run into replays/
+replayLimit = 20  # recordings kept in replays/, the oldest are deleted
+recorder = None  # records the run in progress
+recordingFile = None
+blockIndex = {}  # block -> index in its program, for the recording
+lastReplay = None  # file of the last finished recording, played with F6
+replayReader = None  # the recording being played
+replayTick = 0
+replayField = None  # the field at replayTick, drawn instead of the sim
+replayFrame = None  # the replay frame in replayField
+history = None  # undo and redo steps of the blocks
+ioWorker = IOWorker()  # reads and writes files off the UI thread
+# Profiling
+frameProfiler = FrameProfiler()
+screen = None
+
+
+def init():
+    # starts the parts of pygame that are used and creates the blocks, icons and sim field
+    # doesn't open a window, so tools and benchmarks can use everything headlessly
+    global font, grabItems, dragItems, clickItems, simField, simView, maxScroll
+    global fieldSnapshot, programs, robotIndex, history, toasts
+    pygame.display.init()  # only display and font, the other modules (audio, joysticks) are slow to start
+    pygame.font.init()
+    font = pygame.font.Font("freesansbold.ttf", 32)
+    toasts = Toasts(font)
+    grabItems = [
+        ForwardFactory(1),
+        BackwardFactory(2),
+        LeftFactory(3),
+        RightFactory(4),
+        TurnLeftFactory(5),
+        TurnRightFactory(6),
+        IntakeStartFactory(7),
+        IntakeStopFactory(8),
+        ShootFactory(9),
+        LoopFactory(10),
+        EndLoopFactory(11),
+        ParallelFactory(12),
+        EndParallelFactory(13),
+    ]
+    clickItems = [GenerateCode(0), Validate(1), RunSim(2), Reset(3), SelectRobot(4)]
+    maxScroll = 0
+    for i in grabItems:
+        b = i.rect.bottom
+        if b > maxScroll:
+            maxScroll = b
+    maxScroll += 20
+    for i in grabItems:
+        i.prewarm(poolSize)
+    simField = generateSim()
+    simView = SimView()
+    fieldSnapshot = simField.snapshot()
+    analysisField()
+    # every robot on the field gets its own program
+    programs = [[StartObject()] for _ in range(max(len(simField.robots()), 1))]
+    robotIndex = 0
+    dragItems = programs[0]
+    history = History()
+    recordHistory()
+
+
+def main():
+    global screen, size, width, height, mouse, scrollY, navScrollY, simScrollX, simScrollY
+    global currDrag, backgroundDrag, navDrag, simDrag, timeSinceLastClick, iteration, start
+    global fieldWatcher, replayTick, spawned, dragFrom, programEdited
+    init()
+    fieldWatcher = FileWatcher(
+        "simSetup.txt",
+        lambda filename: readField(filename, kindCodes),
+        ioWorker,
+        fieldChanged,
+        fieldFailed,
+    )
+    # Start the window
+    screen = pygame.display.set_mode(size, pygame.RESIZABLE, pygame.SRCALPHA)
+    start = time.time_ns()
+    while True:
+        frameProfiler.startFrame()
+        # ---------
+        # LOGIC
+        with frameProfiler.phase("events"):
+            # messages from file reads and writes that finished in the background
+            ioWorker.drain()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    ioWorker.shutdown()  # finish writing files before closing
+                    pygame.quit()
+                    sys.exit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_F3:  # toggle the profiler overlay
+                        frameProfiler.toggleHud()
+                    elif event.key == pygame.K_F4:  # dump the profiler stats
+                        ioWorker.submit(
+                            lambda: (frameProfiler.dumpCsv(), frameProfiler.dumpJson()),
+                            lambda result: toasts.succeed(
+                                "Wrote profile.csv and profile.json"
+                            ),
+                            lambda error: toasts.warn(
+                                f"Couldn't write the profile: {error}"
+                            ),
+                        )
+                    elif event.key == pygame.K_F6 and not currSim:
+                        # play the last run again, or stop playing it
+                        if replayReader:
+                            stopReplay()
+                        elif lastReplay:
+                            startReplay(lastReplay)
+                    elif event.key in (pygame.K_LEFT, pygame.K_RIGHT) and replayReader:
+                        # scrub the replay by a second
+                        step = 50 if event.key == pygame.K_RIGHT else -50
+                        replayTick = max(
+                            0, min(replayTick + step, replayReader.ticks - 1)
+                        )
+                    elif (
+                        event.mod & pygame.KMOD_CTRL
+                        and event.key in (pygame.K_c, pygame.K_v, pygame.K_d)
+                        and not currSim
+                        and not currDrag
+                        and sideNav["width"] < mouse[0] < width - sideSim["width"]
+                    ):
+                        # Ctrl+C copies the block under the mouse and everything after it, Ctrl+V pastes it at
+                        # the mouse and Ctrl+D does both
+                        if event.key == pygame.K_c:
+                            copySubtree(mouse)
+                        elif event.key == pygame.K_v:
+                            pasteBlocks(mouse, clipboard)
+                        else:
+                            duplicateSubtree(mouse)
+                    elif event.key == pygame.K_F5 and not currSim and not currDrag:
+                        # put a program that shoots every note in the code area
+                        solveProgram()
+                    elif event.key == pygame.K_F7 and not currDrag:
+                        # send the program to the grading server
+                        submitProgram()
+                    elif (
+                        event.mod & pygame.KMOD_CTRL
+                        and event.key in (pygame.K_z, pygame.K_y)
+                        and not currSim
+                        and not currDrag
+                    ):
+                        # Ctrl+Z undo, Ctrl+Y or Ctrl+Shift+Z redo
+                        if event.key == pygame.K_y or event.mod & pygame.KMOD_SHIFT:
+                            step = history.redo()
+                        else:
+                            step = history.undo()
+                        if step:
+                            restoreState(step)
+                    elif event.mod & pygame.KMOD_CTRL and event.key in (
+                        pygame.K_EQUALS,
+                        pygame.K_PLUS,
+                        pygame.K_KP_PLUS,
+                        pygame.K_MINUS,
+                        pygame.K_KP_MINUS,
+                        pygame.K_0,
+                    ):
+                        # Ctrl+plus and Ctrl+minus zoom the code, Ctrl+0 goes back to full size
+                        if event.key == pygame.K_0:
+                            steps = zoomLevels.index(zoom)
+                        elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                            steps = -1
+                        else:
+                            steps = 1
+                        zoomCanvas(steps, (canvasCenter(), topNav["height"]))
+                if (
+                    event.type == pygame.MOUSEBUTTONDOWN
+                    and event.button == 1
+                    and timeSinceLastClick > 20
                 ):
-                    dragItems.remove(currDrag)
-                    del currDrag
-                # find the parents of all the items on the board
-                for i in dragItems:
-                    i.children = ()
-                for i in dragItems:
-                    i.findParents()
-                # snap all items to the grid
+                    timeSinceLastClick = 0  # reset click timer
+                    # if you click a nav item, run their onClick Function
+                    for i in clickItems:
+                        if i.collide(event):
+                            i.onClick()
+                            break
+                    # if you click a factory, generate a new drag item
+                    for i in grabItems:
+                        if (
+                            i.collide(event)
+                            and not currSim
+                            and event.pos[1] > topNav["height"]
+                        ):
+                            i.generate()
+                            break
+                    # if you click the minimap, go to that part of the program
+                    onMinimap = minimap.collide(event)
+                    if onMinimap:
+                        scrollCanvasTo(minimap.clickedY(event.pos))
+                    # if you click a draggable item, start dragging it
+                    for i in dragItems:
+                        if (
+                            not onMinimap
+                            and i.collide(event)
+                            and not currSim
+                            and event.pos[1] > topNav["height"]
+                        ):
+                            currDrag = i
+                            break
+                    if currDrag:
+                        dragFrom = currDrag.rect.topleft
+                    toasts.click(event.pos)  # if you click a message, get rid of it
+                    # if you don't click anything you can drag and you are within one of the three draggable areas, start dragging it
+                    if (
+                        not currDrag
+                        and not onMinimap
+                        and event.pos[0] > sideNav["width"]
+                        and event.pos[0] < width - sideSim["width"]
+                        and event.pos[1] > topNav["height"]
+                    ):
+                        backgroundDrag = True
+                    elif (
+                        not currDrag
+                        and event.pos[0] < sideNav["width"]
+                        and event.pos[1] > topNav["height"]
+                    ):
+                        navDrag = True
+                    elif (
+                        not currDrag
+                        and event.pos[0] > (width - sideSim["width"])
+                        and event.pos[1] > topNav["height"]
+                    ):
+                        simDrag = True
+                if event.type == pygame.MOUSEMOTION:
+                    # update mouse position
+                    mouse = event.pos
+                    if currDrag:  # if dragging an item, move it
+                        currDrag.drag(event)
+                    if backgroundDrag:  # if dragging a zone, move it
+                        scrollY += event.rel[1] / zoom
+                    if navDrag:
+                        navScrollY += event.rel[1]
+                    if simDrag:
+                        simScrollX += event.rel[0]
+                        simScrollY += event.rel[1]
+                if event.type == pygame.MOUSEBUTTONUP:
+                    if currDrag:
+                        # remove it if its past the edge on either side
+                        centerx = canvasRect(currDrag.rect).centerx
+                        if centerx < sideNav["width"] or centerx > (
+                            width - sideSim["width"]
+                        ):
+                            blockRemoved(currDrag)
+                            dragItems.remove(currDrag)
+                            if currDrag is spawned:
+                                # never in the undo history, so it can be used again
+                                blockPool.release(currDrag)
+                            else:
+                                programEdited = True
+                            del currDrag
+                            rebuildTree()
+                        else:
+                            rebuildTree()
+                            # a block dropped back where it was changes nothing
+                            if currDrag is spawned or currDrag.rect.topleft != dragFrom:
+                                programEdited = True
+                    # drops, deletes, new blocks and item changes all end with the mouse going up
+                    if programEdited and not currSim:
+                        recordHistory()
+                    # Nothing is being dragged
+                    currDrag = None
+                    spawned = None
+                    backgroundDrag = False
+                    navDrag = False
+                    simDrag = False
+                if event.type == pygame.MOUSEWHEEL:
+                    # scroll the correct area based on mouse location
+                    if mouse[0] < sideNav["width"]:
+                        navScrollY += (abs(event.precise_y) ** (1 / 4.0)) * 10 * event.y
+                    elif mouse[0] < width - sideSim["width"]:
+                        if pygame.key.get_mods() & pygame.KMOD_CTRL:
+                            # Ctrl+scroll zooms the code
+                            zoomCanvas(event.y, mouse)
+                        else:
+                            scrollY += (
+                                (abs(event.precise_y) ** (1 / 4.0))
+                                * 10
+                                * event.y
+                                / zoom
+                            )
+                    else:
+                        simScrollX -= (abs(event.precise_x) ** (1 / 4.0)) * 10 * event.x
+                        simScrollY += (abs(event.precise_y) ** (1 / 4.0)) * 10 * event.y
+                if event.type == pygame.WINDOWRESIZED:
+                    # when resizing windows make sure to update the size of all zones porportionally
+                    size = width, height = screen.get_size()
+                    sideSim["width"] = sideSim["maxWidth"]
+                    sideSim["width"] = (
+                        (width - sideNav["width"] - 420)
+                        if sideSim["width"] > (width - sideNav["width"] - 420)
+                        else sideSim["width"]
+                    )
+                    sideSim["width"] -= blockSize - (
+                        width - sideSim["width"] - sideNav["width"]
+                    ) % (
+                        blockSize * 2
+                    )  # do not allow partial grids in block area
+                    # find all children and snap to grid
+                    rebuildTree()
+        if not currDrag:
+            # snap to grid if not doing anything else
+            with frameProfiler.phase("snap"):
                 for i in dragItems:
                     i.snapToGrid()
-                # reorder list by y value
-                newDict = {}
-                keys = []
-                for i in dragItems:
-                    newDict[i.rect.top] = i
-                    keys.append(i.rect.top)
-                keys.sort()
-                newList = []
-                for key in keys:
-                    newList.append(newDict[key])
-                dragItems = newList
-            # Nothing is being dragged
-            currDrag = None
-            backgroundDrag = False
-            navDrag = False
-            simDrag = False
-        if event.type == pygame.MOUSEWHEEL:
-            # scroll the correct area based on mouse location
-            if mouse[0] < sideNav["width"]:
-                navScrollY += (abs(event.precise_y) ** (1 / 4.0)) * 10 * event.y
-            elif mouse[0] < width - sideSim["width"]:
-                scrollY += (abs(event.precise_y) ** (1 / 4.0)) * 10 * event.y
-            else:
-                simScrollX -= (abs(event.precise_x) ** (1 / 4.0)) * 10 * event.x
-                simScrollY += (abs(event.precise_y) ** (1 / 4.0)) * 10 * event.y
-        if event.type == pygame.WINDOWRESIZED:
-            # when resizing windows make sure to update the size of all zones porportionally
-            size = width, height = screen.get_size()
-            sideSim["width"] = sideSim["maxWidth"]
-            sideSim["width"] = (
-                (width - sideNav["width"] - 420)
-                if sideSim["width"] > (width - sideNav["width"] - 420)
-                else sideSim["width"]
+        scrollY = scrollY if scrollY < 0 else 0  # dont scroll above the start object
+        navScrollY = (
+            navScrollY if navScrollY < 0 else 0
+        )  # dont scroll above the first item in the nav bar
+        navScrollY = (
+            navScrollY
+            if navScrollY > -1 * (maxScroll - height)
+            else -1 * (maxScroll - height)
+        )  # dont scroll below the last item in the nav bar
+        if currSim:
+            stepSim()
+        if replayReader:
+            stepReplay()
+        # ---------
+        # DRAW
+        drawFrame(screen)
+        # ----------------
+        # Keep display code above
+        # show new content
+        with frameProfiler.phase("flip"):
+            pygame.display.flip()
+        frameProfiler.endFrame()
+        if iteration == 1:  # the first frame is on screen
+            reportStartup()
+        # incremement iterators
+        timeSinceLastClick += 1
+        iteration += 1
+        if iteration % 1000 == 0:  # keep track of loop timing
+            end = time.time_ns()
+            print(
+                "1000 iterations took: "
+                + str(round((end - start) / 1_000_000 / 1_000, 3))
+                + " ms each"
             )
-            sideSim["width"] -= blockSize - (
-                width - sideSim["width"] - sideNav["width"]
-            ) % (
-                blockSize * 2
-            )  # do not allow partial grids in block area
-            # find all children and snap to grid
-            for i in dragItems:
-                i.children = ()
-            for i in dragItems:
-                i.findParents()
-            for i in dragItems:
-                i.snapToGrid()
-    if not currDrag:
-        # snap to grid if not doing anything else
-        for i in dragItems:
-            i.snapToGrid()
-    scrollY = scrollY if scrollY < 0 else 0  # dont scroll above the start object
-    navScrollY = (
-        navScrollY if navScrollY < 0 else 0
-    )  # dont scroll above the first item in the nav bar
-    navScrollY = (
-        navScrollY
-        if navScrollY > -1 * (maxScroll - height)
-        else -1 * (maxScroll - height)
-    )  # dont scroll below the last item in the nav bar
-    if currSim:
-        # if the simStartTime exists (not None)
-        if simStartTime:
-            # run the recursive sim. It returns the start time of the next command if it is not complete and None once fully completed
-            simStartTime = dragItems[0].runSim(simStartTime)
-        else:
-            # once done, not sim anymore
-            currSim = False
-    # ---------
-    # DRAW
-    screen.fill(bg)
-    # SideSim
-    pygame.draw.rect(
-        screen,
-        sideSim["bg"],
-        pygame.Rect(
-            width - sideSim["width"],
-            topNav["height"],
-            sideSim["width"],
-            height - topNav["height"],
-        ),
-    )
-    drawGrid2()
-    for i in simItems:
-        i.draw(screen)
-    # MainArea
-    pygame.draw.rect(screen, bg, pygame.Rect(0, 0, width - sideSim["width"], height))
-    drawGrid()
-    # SideNav
-    pygame.draw.rect(
-        screen,
-        sideNav["bg"],
-        pygame.Rect(0, topNav["height"], sideNav["width"], height - topNav["height"]),
-    )
-    for i in grabItems:
-        i.draw(screen)
-    # main board items
-    for i in dragItems:
-        i.draw(screen)
-    # draw top navigation
-    pygame.draw.rect(screen, topNav["bg"], pygame.Rect(0, 0, width, topNav["height"]))
-    for i in clickItems:
-        i.draw(screen)
-    # draw warnings
-    for i in warnings:
-        i.draw(screen)
-    # draw successes
-    for i in successes:
-        i.draw(screen)
-    # ----------------
-    # Keep display code above
-    # show new content
-    pygame.display.flip()
-    # incremement iterators
-    timeSinceLastClick += 1
-    iteration += 1
-    if iteration % 1000 == 0:  # keep track of loop timing
-        end = time.time_ns()
-        print(
-            "1000 iterations took: "
-            + str(round((end - start) / 1_000_000 / 1_000, 3))
-            + " ms each"
-        )
-        start = time.time_ns()
-pygame.quit()
+            start = time.time_ns()
+    pygame.quit()
+
+
+def reportStartup():
+    # prints how long it took from importing to the first frame, and warns if it's over the budget
+    frameProfiler.startupMs = (time.perf_counter() - importStart) * 1000
+    print(f"Startup took {round(frameProfiler.startupMs)} ms")
+    if frameProfiler.startupMs > startupBudget * 1000:
+        print(f"Startup is over the budget of {round(startupBudget * 1000)} ms")
+
+
+if __name__ == "__main__":
+    main()
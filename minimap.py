@@ -0,0 +1,133 @@
+"""
+Minimap:
+
+    A small picture of the whole code area next to it, so a long program can be found without scrolling through it.
+    Every block is a rectangle in its color, the part of the program on screen is outlined and the blocks running
+    in the sim are outlined in red. Clicking a block on the minimap scrolls the code area there, the rest of the
+    minimap lets clicks through to the blocks under it.
+
+    The picture is kept on its own surface at 1/scale of the size of the code area. Only after blocks moved (moved
+    is called when the tree is rebuilt) are they compared with where they were drawn last, and only the places of
+    blocks that were added, moved, recolored or removed are drawn again, so frames where nothing changes cost nothing.
+"""
+
+import pygame
+
+scale = 10  # pixels of the code area per pixel of the minimap
+background = (160, 165, 200)
+viewColor = (255, 255, 255)
+runningColor = (220, 30, 30)
+
+
+class Minimap:
+    # The picture of the code area and the block places it was drawn from
+    def __init__(self):
+        self.surface = None
+        self.drawn = {}  # block -> (rect on the minimap, color)
+        self.left = 0  # where the code area starts, minimap x 0
+        self.top = 0
+        self.bottom = 0  # lowest block on the minimap
+        self.offset = 0  # minimap y at the top of the part shown, for long programs
+        self.shown = pygame.Rect(0, 0, 0, 0)  # where it was drawn on the screen
+        self.stale = True  # blocks moved since the last sync
+
+    def place(self, block):
+        # a block's rect and color on the minimap
+        rect = block.rect
+        look = getattr(block, "look", None)
+        color = look[0] if look else (120, 120, 120)
+        return (
+            pygame.Rect(
+                (rect.x - self.left) // scale,
+                (rect.y - self.top) // scale,
+                max(rect.width // scale, 1),
+                max(rect.height // scale, 1),
+            ),
+            color,
+        )
+
+    def moved(self):
+        # blocks were added, moved or removed, the next sync looks at them again
+        self.stale = True
+
+    def sync(self, blocks, left, top, width):
+        # draws the changes since the blocks last moved, left, top and width are the code area's
+        resized = self.surface is None or self.surface.get_width() != width // scale
+        if not self.stale and not resized:
+            return
+        self.stale = False
+        if resized:
+            # new or resized: draw everything
+            self.left, self.top = left, top
+            self.surface = pygame.Surface((width // scale, 100))
+            self.surface.fill(background)
+            self.drawn = {}
+        places = {block: self.place(block) for block in blocks}
+        dirty = []
+        for block, place in places.items():
+            old = self.drawn.get(block)
+            if old != place:
+                dirty.append(place[0])
+                if old:
+                    dirty.append(old[0])
+        if len(places) != len(self.drawn) or dirty:
+            for block, old in self.drawn.items():
+                if block not in places:
+                    dirty.append(old[0])
+        if not dirty:
+            return
+        self.drawn = places
+        self.bottom = max([rect.bottom for rect, color in places.values()] + [0])
+        if self.bottom > self.surface.get_height():
+            # taller program, keep what is drawn and add room below
+            grown = pygame.Surface((self.surface.get_width(), self.bottom * 2))
+            grown.fill(background)
+            grown.blit(self.surface, (0, 0))
+            self.surface = grown
+        rects = [rect for rect, color in places.values()]
+        colors = [color for rect, color in places.values()]
+        for area in dirty:
+            self.surface.fill(background, area)
+            for i in area.collidelistall(rects):
+                self.surface.fill(colors[i], rects[i].clip(area))
+
+    def draw(self, surf, rect, viewTop, viewHeight, running=()):
+        # draws the minimap into rect on the screen (no taller than the program), viewTop and viewHeight are the
+        # part of the code area on screen, running are the blocks to outline
+        view = pygame.Rect(
+            0,
+            (viewTop - self.top) // scale,
+            self.surface.get_width(),
+            max(viewHeight // scale, 1),
+        )
+        bottom = max(self.bottom, view.bottom)
+        rect = pygame.Rect(rect.topleft, (rect.width, min(rect.height, bottom + 1)))
+        self.shown = rect
+        # keep the part on screen in the middle of the minimap when the program is longer than it
+        self.offset = max(0, min(view.centery - rect.height // 2, bottom - rect.height))
+        area = pygame.Rect(0, self.offset, rect.width, rect.height)
+        surf.fill(background, rect)
+        surf.blit(self.surface, rect.topleft, area.clip(self.surface.get_rect()))
+        pygame.draw.rect(surf, viewColor, view.move(rect.x, rect.y - self.offset), 1)
+        for block in running:
+            place = self.drawn.get(block)
+            if place:
+                pygame.draw.rect(
+                    surf,
+                    runningColor,
+                    place[0].move(rect.x, rect.y - self.offset).inflate(2, 2),
+                    1,
+                )
+
+    def collide(self, event):
+        # only clicks on a block of the minimap, a block in the code area under the rest of it can still be picked up
+        if not self.shown.collidepoint(event.pos):
+            return False
+        x = event.pos[0] - self.shown.x
+        y = event.pos[1] - self.shown.y + self.offset
+        rects = [rect for rect, color in self.drawn.values()]
+        return pygame.Rect(x - 1, y - 1, 3, 3).collidelist(rects) >= 0
+
+    def clickedY(self, pos):
+        # the code area y under a point on the minimap
+        return (pos[1] - self.shown.y + self.offset) * scale + self.top
@@ -0,0 +1,36 @@
+"""
+Object Pool:
+
+    Keeps objects that were thrown away, per type, and hands them out again instead of making new ones. The blocks
+    in the side bar use it: a block dragged off the code area goes back into the pool, and the next block of that
+    type taken from the side bar is the same object, put back the way a new block starts by reset. A few blocks of
+    every type are made at startup (ObjectFactory.prewarm in main.py), so taking one normally doesn't make anything.
+"""
+
+
+class ObjectPool:
+    # Free objects of each type
+    def __init__(self, reset):
+        # reset(obj, *args) puts a free object back the way a new one starts
+        self.reset = reset
+        self.free = {}  # type -> list of free objects
+        self.reused = 0  # objects handed out again
+        self.missed = 0  # times the pool of a type was empty
+
+    def take(self, kind, *args):
+        # a free object of a type, reset with args, or None if there is none
+        free = self.free.get(kind)
+        if not free:
+            self.missed += 1
+            return None
+        obj = free.pop()
+        self.reset(obj, *args)
+        self.reused += 1
+        return obj
+
+    def release(self, obj):
+        # obj isn't used anymore and can be handed out again
+        self.free.setdefault(type(obj), []).append(obj)
+
+    def size(self, kind):
+        return len(self.free.get(kind, ()))
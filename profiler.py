@@ -0,0 +1,192 @@
+"""
+Frame Profiler:
+
+    Times each phase of the main loop (event handling, tree rebuilds, sim, drawing, display flip) into
+    fixed size ring buffers so the slow phase on a given machine can be found instead of guessed.
+    Only the last `capacity` frames are kept, so the profiler can stay on for a whole session.
+
+    F3 toggles the on screen HUD, F4 writes profile.csv and profile.json next to main.py.
+"""
+
+import csv
+import json
+import time
+from array import array
+
+
+class PhaseTimer:
+    # Ring buffer of the most recent samples (in ms) of one phase
+    __slots__ = ("name", "samples", "index", "count", "total")
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.samples = array("d", bytes(8 * capacity))  # preallocated, never grows
+        self.index = 0  # next slot to write
+        self.count = 0  # number of samples ever written
+        self.total = 0.0  # running sum of every sample, used for the mean
+
+    def add(self, ms):
+        self.samples[self.index] = ms
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+        self.total += ms
+
+    def filled(self):
+        # the samples that are actually in use (the buffer starts out empty)
+        return self.samples[: min(self.count, len(self.samples))]
+
+    def stats(self):
+        # p50/p95/max over the ring buffer, mean over every sample seen
+        values = sorted(self.filled())
+        if not values:
+            return {
+                "phase": self.name,
+                "count": 0,
+                "p50": 0.0,
+                "p95": 0.0,
+                "max": 0.0,
+                "mean": 0.0,
+            }
+        return {
+            "phase": self.name,
+            "count": self.count,
+            "p50": values[(len(values) - 1) // 2],
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max": values[-1],
+            "mean": self.total / self.count,
+        }
+
+
+class Phase:
+    # Reusable context manager for one phase, so timing a phase doesn't allocate every frame
+    __slots__ = ("profiler", "timer")
+
+    def __init__(self, profiler, timer):
+        self.profiler = profiler
+        self.timer = timer
+
+    def __enter__(self):
+        self.profiler.enter(self.timer)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.exit()
+        return False
+
+
+class FrameProfiler:
+    # Collects per phase timings for every frame of the main loop
+    # Phases can be nested, time spent in an inner phase is not counted towards the outer one
+    def __init__(self, capacity=600, budget=1000 / 60):
+        self.capacity = capacity  # frames kept per phase
+        self.budget = (
+            budget  # frame budget in ms, phases over this are flagged on the HUD
+        )
+        self.phases = {}  # name -> Phase, in the order they were first used
+        self.frameTimer = PhaseTimer("frame", capacity)
+        self.pending = {}  # timer -> ms accumulated in the current frame
+        self.stack = []  # [timer, start] of the phases currently running
+        self.frameStart = None
+        self.showHud = False
+        self.hudFont = None
+        self.hudSurf = None
+        self.hudAge = 0  # frames since the HUD text was last rendered
+        self.startupMs = None  # time from import to the first frame, set by main
+
+    def phase(self, name):
+        # returns the context manager timing the given phase
+        p = self.phases.get(name)
+        if not p:
+            p = Phase(self, PhaseTimer(name, self.capacity))
+            self.phases[name] = p
+        return p
+
+    def enter(self, timer):
+        now = time.perf_counter()
+        if self.stack:  # pause the outer phase
+            outer = self.stack[-1]
+            self.pending[outer[0]] = (
+                self.pending.get(outer[0], 0.0) + (now - outer[1]) * 1000
+            )
+        self.stack.append([timer, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        timer, begin = self.stack.pop()
+        self.pending[timer] = self.pending.get(timer, 0.0) + (now - begin) * 1000
+        if self.stack:  # resume the outer phase
+            self.stack[-1][1] = now
+
+    def startFrame(self):
+        self.frameStart = time.perf_counter()
+
+    def endFrame(self):
+        # push this frame's samples, phases that didn't run this frame get no sample
+        if self.frameStart is None:
+            return
+        self.frameTimer.add((time.perf_counter() - self.frameStart) * 1000)
+        for timer, ms in self.pending.items():
+            timer.add(ms)
+        self.pending.clear()
+        self.hudAge += 1
+
+    def report(self):
+        # stats of every phase followed by the whole frame
+        return [p.timer.stats() for p in self.phases.values()] + [
+            self.frameTimer.stats()
+        ]
+
+    def dumpCsv(self, filename="profile.csv"):
+        rows = self.report()
+        with open(filename, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def dumpJson(self, filename="profile.json"):
+        with open(filename, "w") as file:
+            json.dump(
+                {
+                    "budgetMs": self.budget,
+                    "startupMs": self.startupMs,
+                    "phases": self.report(),
+                },
+                file,
+                indent=2,
+            )
+
+    def toggleHud(self):
+        self.showHud = not self.showHud
+        self.hudAge = self.capacity  # force a redraw the next time it's shown
+
+    def drawHud(self, surf, pose=(10, 10)):
+        # draw the overlay, the text is only re-rendered twice a second so the HUD doesn't skew the numbers
+        if not self.showHud:
+            return
+        if self.hudSurf is None or self.hudAge >= 30:
+            self.hudSurf = self.renderHud()
+            self.hudAge = 0
+        surf.blit(self.hudSurf, pose)
+
+    def renderHud(self):
+        import pygame
+
+        if not self.hudFont:
+            self.hudFont = pygame.font.Font("freesansbold.ttf", 14)
+        rows = self.report()
+        lines = [("phase         p50    p95    max  ms", (255, 255, 255))]
+        if self.startupMs is not None:
+            lines.insert(0, (f"startup {self.startupMs:.0f} ms", (255, 255, 255)))
+        for row in rows:
+            color = (255, 90, 90) if row["p95"] > self.budget else (255, 255, 255)
+            lines.append(
+                (
+                    f"{row['phase']:<10}{row['p50']:>7.2f}{row['p95']:>7.2f}{row['max']:>7.2f}",
+                    color,
+                )
+            )
+        surf = pygame.Surface((300, len(lines) * 18 + 10), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 170))
+        for i, (text, color) in enumerate(lines):
+            surf.blit(self.hudFont.render(text, True, color), (8, 5 + i * 18))
+        return surf
@@ -0,0 +1,29 @@
+"""
+Programs:
+
+    A program as plain lists, without the blocks: what the editor sends to the grading server (grader.py) and what
+    the vectorized sim compiles (vectorSim.py), so both read a program the same way. Loops and parallel groups hold
+    lists of entries:
+
+    [["MoveForward", 2], ["Loop", 3, [["TurnLeft", 1], ["Shoot", 1]]], ["ParallelGroup", [...], [...]]]
+"""
+
+
+def entriesOf(block):
+    # the entries of a block and the blocks after it, up to the end of the group it is in (the Start block for a
+    # whole program)
+    entries = []
+    while block is not None and str(block) not in ("EndParallelGroup", "EndLoop"):
+        name = str(block)
+        if name == "ParallelGroup":
+            entries.append(["ParallelGroup"] + [entriesOf(c) for c in block.children])
+            block = block.otherChild
+        elif name == "Loop":
+            body = entriesOf(block.children[0]) if block.children else []
+            entries.append(["Loop", block.item, body])
+            block = block.otherChild
+        else:
+            if name != "Start":
+                entries.append([name, block.item])
+            block = block.children[0] if block.children else None
+    return entries
@@ -0,0 +1,354 @@
+"""
+Replays:
+
+    Every sim run is recorded into a small binary file so an odd run can be watched again after Reset, or shared.
+
+    python replay.py replays/run.replay             print what is in a recording
+    python replay.py replays/run.replay 120         print the field at tick 120
+
+    The file starts with the whole field (a keyframe), then holds one record per tick with only the items whose
+    position, direction, flags or kind changed, each stored as the difference from the tick before. The blocks
+    that were running are stored whenever they change and in every keyframe. Another keyframe is written every
+    keyInterval ticks, and a table of the keyframes at the end of the file lets the reader jump to any tick by
+    decoding from the keyframe before it. The reader maps the file into memory, so a long recording is never loaded as a whole.
+
+    Layout (little endian, n is an unsigned LEB128 varint, z a zigzag varint):
+        header   b"FRCREPL1", cellSize u16, rows u32, keyInterval u16
+        tick     tag u8 (KEYFRAME or DELTA, | ACTIVE when the running blocks changed, always on a keyframe)
+                 keyframe: for every row kind u8, x z, y z, direction z, flags u8
+                 delta: changed rows n, then for each: row gap n, mask u8, the changed values
+                 active: count n, then robot n and block n for each running block
+        footer   keyframes n, (tick n, offset n) for each, ticks u32, footer offset u64, b"FRCREND1"
+
+    Directions are stored in 1/directionScale of a quarter turn.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+magic = b"FRCREPL1"
+endMagic = b"FRCREND1"
+KEYFRAME = 1
+DELTA = 2
+ACTIVE = 0x80  # tag bit, the running blocks changed on this tick
+# delta mask bits
+X, Y, DIRECTION, FLAGS, KIND = 1, 2, 4, 8, 16
+directionScale = 4096
+keyInterval = 250  # ticks between keyframes
+chunkSize = 256  # rows compared at once when looking for changes
+
+
+def putVarint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def putZigzag(out, value):
+    putVarint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def getVarint(data, pos):
+    # returns (value, position after it)
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def getZigzag(data, pos):
+    value, pos = getVarint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+def quarter(direction):
+    # a direction as a whole number of 1/directionScale quarter turns
+    return round(direction * directionScale)
+
+
+def changedRows(new, old):
+    # rows where two arrays differ, whole chunks are compared in C before looking at single rows
+    if new == old:
+        return []
+    rows = []
+    for start in range(0, len(new), chunkSize):
+        end = start + chunkSize
+        if new[start:end] != old[start:end]:
+            rows += [r for r in range(start, min(end, len(new))) if new[r] != old[r]]
+    return rows
+
+
+class Recorder:
+    # Records a sim run, write is called with finished pieces of the file so they can be written in the background
+    def __init__(self, field, write):
+        self.write = write
+        self.rows = len(field)
+        self.tick = 0
+        self.keyframes = []  # (tick, offset)
+        self.offset = 0  # bytes handed to write so far
+        self.out = bytearray(magic)
+        self.out += struct.pack("<HIH", field.cellSize, self.rows, keyInterval)
+        self.active = ()
+        self.keyframe(field, ())
+
+    def state(self, field):
+        # copies of the columns a tick is compared against
+        self.kind = field.kind[:]
+        self.x = field.x[:]
+        self.y = field.y[:]
+        self.rawDirection = field.direction[:]
+        self.direction = array("i", [quarter(d) for d in field.direction])
+        self.flags = field.flags[:]
+
+    def tag(self, tag, active):
+        if active != self.active:
+            self.out.append(tag | ACTIVE)
+        else:
+            self.out.append(tag)
+
+    def putActive(self, active):
+        if active != self.active:
+            putVarint(self.out, len(active))
+            for robot, block in active:
+                putVarint(self.out, robot)
+                putVarint(self.out, block)
+            self.active = active
+
+    def keyframe(self, field, active):
+        self.keyframes.append((self.tick, self.offset + len(self.out)))
+        # a keyframe is decoded on its own when the reader jumps to it, so it always has the running blocks
+        self.active = None
+        self.tag(KEYFRAME, active)
+        self.state(field)
+        out = self.out
+        for row in range(self.rows):
+            out.append(self.kind[row])
+            putZigzag(out, self.x[row])
+            putZigzag(out, self.y[row])
+            putZigzag(out, self.direction[row])
+            out.append(self.flags[row])
+        self.putActive(active)
+
+    def record(self, field, active=()):
+        # one tick of the run, active is a tuple of (robot, block index) for the blocks running on it
+        self.tick += 1
+        active = tuple(active)
+        if self.tick % keyInterval == 0:
+            self.keyframe(field, active)
+        else:
+            self.delta(field, active)
+        if len(self.out) > 1 << 16:
+            self.flush()
+
+    def delta(self, field, active):
+        rows = set(changedRows(field.x, self.x))
+        rows.update(changedRows(field.y, self.y))
+        rows.update(changedRows(field.direction, self.rawDirection))
+        rows.update(changedRows(field.flags, self.flags))
+        rows.update(changedRows(field.kind, self.kind))
+        self.tag(DELTA, active)
+        out = self.out
+        putVarint(out, len(rows))
+        previous = 0
+        for row in sorted(rows):
+            putVarint(out, row - previous)
+            previous = row
+            dx = field.x[row] - self.x[row]
+            dy = field.y[row] - self.y[row]
+            direction = quarter(field.direction[row])
+            dd = direction - self.direction[row]
+            flags, kind = field.flags[row], field.kind[row]
+            mask = (
+                (X if dx else 0)
+                | (Y if dy else 0)
+                | (DIRECTION if dd else 0)
+                | (FLAGS if flags != self.flags[row] else 0)
+                | (KIND if kind != self.kind[row] else 0)
+            )
+            out.append(mask)
+            if dx:
+                putZigzag(out, dx)
+            if dy:
+                putZigzag(out, dy)
+            if dd:
+                putZigzag(out, dd)
+            if mask & FLAGS:
+                out.append(flags)
+            if mask & KIND:
+                out.append(kind)
+            self.x[row] = field.x[row]
+            self.y[row] = field.y[row]
+            self.rawDirection[row] = field.direction[row]
+            self.direction[row] = direction
+            self.flags[row] = flags
+            self.kind[row] = kind
+        self.putActive(active)
+
+    def flush(self):
+        if self.out:
+            self.write(bytes(self.out))
+            self.offset += len(self.out)
+            self.out = bytearray()
+
+    def finish(self):
+        # writes the keyframe table, the recording can't be added to after this
+        footer = self.offset + len(self.out)
+        putVarint(self.out, len(self.keyframes))
+        for tick, offset in self.keyframes:
+            putVarint(self.out, tick)
+            putVarint(self.out, offset)
+        self.out += struct.pack("<IQ", self.tick + 1, footer) + endMagic
+        self.flush()
+
+
+class Frame:
+    # The field at one tick of a recording
+    def __init__(self, tick, kind, x, y, direction, flags, active):
+        self.tick = tick
+        self.kind = kind
+        self.x = x
+        self.y = y
+        self.direction = direction  # in quarter turns, like SimField.direction
+        self.flags = flags
+        self.active = active  # (robot, block index) of the blocks running
+
+    def snapshot(self):
+        # the frame in the form SimField.restore takes
+        held = array("i", [-1]) * len(self.kind)
+        return (
+            self.kind[:],
+            self.x[:],
+            self.y[:],
+            array("d", [d / directionScale for d in self.direction]),
+            self.flags[:],
+            held,
+        )
+
+
+class ReplayReader:
+    # Reads a recording through a memory map, decoding only from the keyframe before the tick asked for
+    def __init__(self, filename):
+        self.file = open(filename, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self.data
+        if data[:8] != magic or data[-8:] != endMagic:
+            self.close()
+            raise ValueError(f"{filename} is not a replay")
+        self.cellSize, self.rows, self.keyInterval = struct.unpack_from("<HIH", data, 8)
+        self.ticks, footer = struct.unpack_from("<IQ", data, len(data) - 20)
+        count, pos = getVarint(data, footer)
+        self.keyTicks = []
+        self.keyOffsets = []
+        for _ in range(count):
+            tick, pos = getVarint(data, pos)
+            offset, pos = getVarint(data, pos)
+            self.keyTicks.append(tick)
+            self.keyOffsets.append(offset)
+        self.cursor = None  # (frame, position of the next tick), for playing forward
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def frame(self, tick):
+        # the field at a tick, playing forward one tick at a time only decodes that tick
+        tick = max(0, min(tick, self.ticks - 1))
+        if self.cursor and self.cursor[0].tick <= tick:
+            frame, pos = self.cursor
+        else:
+            key = bisect_right(self.keyTicks, tick) - 1
+            frame, pos = self.decode(None, self.keyOffsets[key], self.keyTicks[key])
+        while frame.tick < tick:
+            frame, pos = self.decode(frame, pos, frame.tick + 1)
+        self.cursor = (frame, pos)
+        return frame
+
+    def decode(self, frame, pos, tick):
+        # reads the tick at pos on top of the frame before it, returns (frame, position after it)
+        data = self.data
+        tag = data[pos]
+        pos += 1
+        if tag & 0x7F == KEYFRAME:
+            kind, flags = array("B"), array("B")
+            x, y, direction = array("i"), array("i"), array("i")
+            for _ in range(self.rows):
+                kind.append(data[pos])
+                value, pos = getZigzag(data, pos + 1)
+                x.append(value)
+                value, pos = getZigzag(data, pos)
+                y.append(value)
+                value, pos = getZigzag(data, pos)
+                direction.append(value)
+                flags.append(data[pos])
+                pos += 1
+            active = frame.active if frame else ()
+        else:
+            kind, x, y = frame.kind[:], frame.x[:], frame.y[:]
+            direction, flags = frame.direction[:], frame.flags[:]
+            count, pos = getVarint(data, pos)
+            row = 0
+            for _ in range(count):
+                gap, pos = getVarint(data, pos)
+                row += gap
+                mask = data[pos]
+                pos += 1
+                if mask & X:
+                    value, pos = getZigzag(data, pos)
+                    x[row] += value
+                if mask & Y:
+                    value, pos = getZigzag(data, pos)
+                    y[row] += value
+                if mask & DIRECTION:
+                    value, pos = getZigzag(data, pos)
+                    direction[row] += value
+                if mask & FLAGS:
+                    flags[row] = data[pos]
+                    pos += 1
+                if mask & KIND:
+                    kind[row] = data[pos]
+                    pos += 1
+            active = frame.active
+        if tag & ACTIVE:
+            count, pos = getVarint(data, pos)
+            active = []
+            for _ in range(count):
+                robot, pos = getVarint(data, pos)
+                block, pos = getVarint(data, pos)
+                active.append((robot, block))
+            active = tuple(active)
+        return Frame(tick, kind, x, y, direction, flags, active), pos
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage: python replay.py file.replay [tick]")
+        return 1
+    reader = ReplayReader(sys.argv[1])
+    size = len(reader.data)
+    print(
+        f"{reader.ticks} ticks of {reader.rows} items, {size} bytes "
+        f"({size / max(reader.ticks, 1):.1f} per tick), {len(reader.keyTicks)} keyframes"
+    )
+    if len(sys.argv) > 2:
+        frame = reader.frame(int(sys.argv[2]))
+        cs = reader.cellSize
+        print(f"tick {frame.tick}, running blocks (robot, block): {list(frame.active)}")
+        for row in range(len(frame.kind)):
+            print(
+                f"  {row}: kind {frame.kind[row]} at {frame.x[row] / cs:g},{frame.y[row] / cs:g} "
+                f"facing {frame.direction[row] / directionScale:g} flags {frame.flags[row]}"
+            )
+    reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+"""
+Command Scheduler:
+
+    A small copy of WPILib's command based framework, so the simulation runs blocks the same way the generated
+    java code runs on the robot. A command has initialize, execute, isFinished and end; the scheduler calls
+    execute on every scheduled command once per tick and ends the ones that are finished.
+
+    Groups are commands made of commands:
+        SequentialCommandGroup  one after another
+        ParallelCommandGroup    all at once, finished when all of them are
+        ParallelRaceGroup       all at once, finished when the first one is
+        ParallelDeadlineGroup   all at once, finished when the first command (the deadline) is
+
+    Commands list the subsystems they need in requirements. Like on the robot, two commands of one parallel
+    group can't need the same subsystem, and scheduling a command interrupts running commands that need the
+    same subsystem. Instead of throwing, both are reported through onConflict so the editor can show a warning.
+"""
+
+
+class Command:
+    # Base command, subclasses override the parts of the lifecycle they need
+    def __init__(self, requirements=()):
+        self.requirements = set(requirements)  # names of the subsystems it uses
+
+    def __str__(self):
+        return type(self).__name__
+
+    def initialize(self):
+        # called once when the command starts
+        pass
+
+    def execute(self):
+        # called every tick while the command is running
+        pass
+
+    def isFinished(self):
+        return False
+
+    def end(self, interrupted):
+        # called once when the command finished or was interrupted
+        pass
+
+    def conflicts(self):
+        # messages for commands inside this one that can't run together
+        return []
+
+    def leaves(self):
+        # the commands that aren't groups running inside this one right now
+        return [self]
+
+
+class CommandGroup(Command):
+    # A command made of other commands, it needs everything they need
+    def __init__(self, *commands):
+        super().__init__()
+        self.commands = list(commands)
+        for command in self.commands:
+            self.requirements |= command.requirements
+
+    def conflicts(self):
+        found = []
+        for command in self.commands:
+            found += command.conflicts()
+        return found
+
+
+class SequentialCommandGroup(CommandGroup):
+    # Runs its commands one after another, the next one starts on the tick the previous one ends
+    def initialize(self):
+        self.index = 0
+        if self.commands:
+            self.commands[0].initialize()
+
+    def execute(self):
+        if self.index >= len(self.commands):
+            return
+        current = self.commands[self.index]
+        current.execute()
+        if current.isFinished():
+            current.end(False)
+            self.index += 1
+            if self.index < len(self.commands):
+                self.commands[self.index].initialize()
+
+    def isFinished(self):
+        return self.index >= len(self.commands)
+
+    def leaves(self):
+        if self.index < len(self.commands):
+            return self.commands[self.index].leaves()
+        return []
+
+    def end(self, interrupted):
+        if interrupted and self.index < len(self.commands):
+            self.commands[self.index].end(True)
+
+
+class ParallelCommandGroup(CommandGroup):
+    # Runs all of its commands at once, finished when every one of them is
+    def initialize(self):
+        self.running = list(self.commands)
+        self.finished = []
+        for command in self.running:
+            command.initialize()
+
+    def execute(self):
+        for command in list(self.running):
+            command.execute()
+            if command.isFinished():
+                command.end(False)
+                self.running.remove(command)
+                self.finished.append(command)
+
+    def isFinished(self):
+        return not self.running
+
+    def leaves(self):
+        found = []
+        for command in self.running:
+            found += command.leaves()
+        return found
+
+    def end(self, interrupted):
+        # commands still running when the group ends are interrupted
+        for command in self.running:
+            command.end(True)
+        self.running = []
+
+    def conflicts(self):
+        found = super().conflicts()
+        seen = set()
+        for command in self.commands:
+            for requirement in sorted(seen & command.requirements):
+                found.append(f"{self} has two commands that need the {requirement}")
+            seen |= command.requirements
+        return found
+
+
+class ParallelRaceGroup(ParallelCommandGroup):
+    # Runs all of its commands at once, finished as soon as one of them is
+    def isFinished(self):
+        return bool(self.finished) or not self.running
+
+
+class ParallelDeadlineGroup(ParallelCommandGroup):
+    # Runs all of its commands at once, finished when the first one (the deadline) is
+    def __init__(self, deadline, *commands):
+        super().__init__(deadline, *commands)
+        self.deadline = deadline
+
+    def isFinished(self):
+        return self.deadline in self.finished
+
+
+class CommandScheduler:
+    # Runs the scheduled commands, one pass over all of them per tick
+    def __init__(self):
+        self.scheduled = []  # running commands, in the order they were scheduled
+        self.onConflict = None  # called with a message for every requirement conflict
+        self.conflictLog = []
+
+    def schedule(self, command):
+        for message in command.conflicts():
+            self.report(message)
+        # like on the robot, a new command interrupts running commands that need the same subsystem
+        for other in list(self.scheduled):
+            shared = other.requirements & command.requirements
+            if shared:
+                self.report(
+                    f"{command} interrupted {other}, both need the {min(shared)}"
+                )
+                self.cancel(other)
+        command.initialize()
+        self.scheduled.append(command)
+
+    def run(self):
+        # one tick: execute every scheduled command once and end the ones that are finished
+        for command in list(self.scheduled):
+            command.execute()
+            if command.isFinished():
+                command.end(False)
+                self.scheduled.remove(command)
+
+    def isScheduled(self, command):
+        return command in self.scheduled
+
+    def cancel(self, command):
+        if command in self.scheduled:
+            self.scheduled.remove(command)
+            command.end(True)
+
+    def cancelAll(self):
+        for command in list(self.scheduled):
+            self.cancel(command)
+
+    def report(self, message):
+        self.conflictLog.append(message)
+        if self.onConflict:
+            self.onConflict(message)
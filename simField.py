@@ -0,0 +1,412 @@
+"""
+Simulation Field:
+
+    The state of every robot, note and obstacle on the field, stored as columns (one array per property) instead of
+    one object per item. Each item is a row number: row 0 is the first robot.
+
+    A 10,000 item field takes a few hundred kilobytes. Collisions only check the items in the 3x3 cells around
+    the moving item, found through an occupancy grid kept in the same kind of arrays.
+
+    Drawing is done by the view in main.py, this module has no pygame dependency so tools can use it headlessly.
+"""
+
+import math
+from array import array
+
+# kinds of item
+ROBOT, NOTE, OBSTACLE = 0, 1, 2
+EMPTY = 3  # row of a removed item, hidden until an added item reuses it
+kindNames = ("RobotIcon", "NoteIcon", "ObstacleIcon")
+kindCodes = {name: code for code, name in enumerate(kindNames)}
+# flags
+VISIBLE = 1  # on the field; intaked notes are hidden
+INTAKE = 2  # intake is on
+SHOOTING = 4  # currently shooting its note
+
+OUTSIDE = -2  # slot of an item outside the occupancy grid
+UNLINKED = -1  # slot of an item not in the occupancy grid at all (hidden)
+gridMargin = (
+    20  # cells added around the starting items so moving items stay in the grid
+)
+smallField = (
+    16  # fields up to this many items are checked item by item, quicker than the grid
+)
+
+
+class SimField:
+    # Struct of arrays holding every sim item
+    def __init__(self, cellSize=50):
+        self.cellSize = cellSize  # pixels per grid cell
+        self.kind = array("B")
+        self.x = array("i")  # pixels
+        self.y = array("i")
+        self.direction = array("d")  # 0-right,1-down,2-left,3-up
+        self.flags = array("B")
+        self.held = array("i")  # row of the intaked note, -1 if none
+        # occupancy grid, each cell holds the first row in it and nextInCell links to the next
+        self.gridX = 0  # first cell of the grid
+        self.gridY = 0
+        self.gridW = 0
+        self.gridH = 0
+        self.grid = array("i")
+        self.nextInCell = array("i")
+        self.slot = array("i")  # grid index the row is linked into, OUTSIDE or UNLINKED
+        self.outside = []  # rows that have left the grid, checked one by one
+        self.onBlocked = (
+            None  # called with the row when an item is pushed into an obstacle
+        )
+        self.robotRows = None  # rows of the robots, found again when items are added
+
+    @classmethod
+    def fromEntities(cls, entities, cellSize=50):
+        # builds a field from (name, x, y) cell positions, like the ones read from simSetup.txt
+        field = cls(cellSize)
+        for name, x, y in entities:
+            field.add(kindCodes[name], x, y)
+        field.buildGrid()
+        return field
+
+    def __len__(self):
+        return len(self.kind)
+
+    def add(self, kind, cellX, cellY, direction=3):
+        # adds an item at a cell, returns its row
+        row = len(self.kind)
+        self.kind.append(kind)
+        self.x.append(cellX * self.cellSize)
+        self.y.append(cellY * self.cellSize)
+        self.direction.append(direction)
+        self.flags.append(VISIBLE)
+        self.held.append(-1)
+        self.nextInCell.append(-1)
+        self.slot.append(UNLINKED)
+        self.robotRows = None
+        if self.gridW:
+            self.link(row)
+        return row
+
+    def robots(self):
+        if self.robotRows is None:
+            self.robotRows = [
+                row for row in range(len(self.kind)) if self.kind[row] == ROBOT
+            ]
+        return self.robotRows
+
+    def empty(self, row):
+        # removes the item at a row without renumbering the other rows
+        self.hide(row)
+        self.kind[row] = EMPTY
+        self.held[row] = -1
+        self.robotRows = None
+
+    def applyEntities(self, entities):
+        # changes the field to match (name, x, y) cell positions, like the ones read from simSetup.txt,
+        # only touching the rows that differ: an item of the same kind is moved, extra items are emptied and
+        # new ones reuse emptied rows before new rows are added. Returns (moved, added, removed) counts
+        cs = self.cellSize
+        kind = self.kind
+        # rows already where the file wants them are left alone
+        unmatched = {}
+        for row in range(len(kind)):
+            if kind[row] != EMPTY:
+                unmatched.setdefault((kind[row], self.x[row], self.y[row]), []).append(
+                    row
+                )
+        added = {}  # kind -> cells the field doesn't have yet, in file order
+        for name, x, y in entities:
+            key = (kindCodes[name], x * cs, y * cs)
+            rows = unmatched.get(key)
+            if rows:
+                rows.pop(0)
+            else:
+                added.setdefault(key[0], []).append((x, y))
+        removed = {}  # kind -> rows the file doesn't have anymore, in row order
+        for key, rows in unmatched.items():
+            removed.setdefault(key[0], []).extend(rows)
+        moved = addedCount = removedCount = 0
+        newItems = []
+        for k in sorted(set(added) | set(removed)):
+            cells = added.get(k, [])
+            rows = sorted(removed.get(k, []))
+            # an item that moved is an item removed and one of the same kind added, keep its row
+            for row, (x, y) in zip(rows, cells):
+                self.x[row] = x * cs
+                self.y[row] = y * cs
+                self.relink(row)
+                moved += 1
+            for row in rows[len(cells) :]:
+                self.empty(row)
+                removedCount += 1
+            newItems += [(k, x, y) for x, y in cells[len(rows) :]]
+        # new items fill the emptied rows first so the field doesn't keep growing
+        free = [row for row in range(len(kind)) if kind[row] == EMPTY]
+        for k, x, y in newItems:
+            if free:
+                self.refill(free.pop(0), k, x, y)
+            else:
+                self.add(k, x, y)
+            addedCount += 1
+        return moved, addedCount, removedCount
+
+    def refill(self, row, kind, cellX, cellY):
+        # puts a new item in an emptied row
+        self.kind[row] = kind
+        self.x[row] = cellX * self.cellSize
+        self.y[row] = cellY * self.cellSize
+        self.direction[row] = 3
+        self.flags[row] = 0
+        self.robotRows = None
+        self.show(row)
+
+    def visibleRows(self):
+        flags = self.flags
+        return [row for row in range(len(flags)) if flags[row] & VISIBLE]
+
+    # ---------
+    # OCCUPANCY GRID
+    def buildGrid(self):
+        # sizes the grid around every item with a margin, then links every visible item into it
+        cs = self.cellSize
+        if len(self.kind):
+            x0 = min(self.x) // cs - gridMargin
+            y0 = min(self.y) // cs - gridMargin
+            x1 = max(self.x) // cs + gridMargin
+            y1 = max(self.y) // cs + gridMargin
+        else:
+            x0, y0, x1, y1 = -gridMargin, -gridMargin, gridMargin, gridMargin
+        self.gridX, self.gridY = x0, y0
+        self.gridW, self.gridH = x1 - x0 + 1, y1 - y0 + 1
+        self.grid = array("i", [-1]) * (self.gridW * self.gridH)
+        self.outside = []
+        for row in range(len(self.kind)):
+            self.slot[row] = UNLINKED
+            self.nextInCell[row] = -1
+            if self.flags[row] & VISIBLE:
+                self.link(row)
+
+    def slotOf(self, row):
+        # grid index of the cell the row's top left corner is in
+        cx = self.x[row] // self.cellSize - self.gridX
+        cy = self.y[row] // self.cellSize - self.gridY
+        if 0 <= cx < self.gridW and 0 <= cy < self.gridH:
+            return cy * self.gridW + cx
+        return OUTSIDE
+
+    def link(self, row):
+        slot = self.slotOf(row)
+        self.slot[row] = slot
+        if slot == OUTSIDE:
+            self.outside.append(row)
+        else:
+            self.nextInCell[row] = self.grid[slot]
+            self.grid[slot] = row
+
+    def unlink(self, row):
+        slot = self.slot[row]
+        self.slot[row] = UNLINKED
+        if slot == OUTSIDE:
+            self.outside.remove(row)
+        elif slot >= 0:
+            if self.grid[slot] == row:
+                self.grid[slot] = self.nextInCell[row]
+            else:
+                prev = self.grid[slot]
+                while self.nextInCell[prev] != row:
+                    prev = self.nextInCell[prev]
+                self.nextInCell[prev] = self.nextInCell[row]
+            self.nextInCell[row] = -1
+
+    def relink(self, row):
+        # call after moving a row, only touches the grid when it changed cells
+        if self.slot[row] != UNLINKED and self.slotOf(row) != self.slot[row]:
+            self.unlink(row)
+            self.link(row)
+
+    def near(self, row):
+        # rows that could overlap the given row: everything in the 3x3 cells around it, in row order
+        if len(self.kind) <= smallField:
+            return range(len(self.kind))
+        cs = self.cellSize
+        cx = self.x[row] // cs - self.gridX
+        cy = self.y[row] // cs - self.gridY
+        found = list(self.outside)
+        for gy in range(max(cy - 1, 0), min(cy + 2, self.gridH)):
+            base = gy * self.gridW
+            for gx in range(max(cx - 1, 0), min(cx + 2, self.gridW)):
+                other = self.grid[base + gx]
+                while other >= 0:
+                    found.append(other)
+                    other = self.nextInCell[other]
+        if len(found) > 1:
+            found.sort()
+        return found
+
+    def rowsIn(self, left, top, right, bottom):
+        # visible rows whose cell is inside the pixel rectangle (with one cell of margin), in row order
+        cs = self.cellSize
+        x0 = max(left // cs - 1 - self.gridX, 0)
+        x1 = min(right // cs + 1 - self.gridX, self.gridW - 1)
+        y0 = max(top // cs - 1 - self.gridY, 0)
+        y1 = min(bottom // cs + 1 - self.gridY, self.gridH - 1)
+        found = list(self.outside)
+        for gy in range(y0, y1 + 1):
+            base = gy * self.gridW
+            for gx in range(x0, x1 + 1):
+                other = self.grid[base + gx]
+                while other >= 0:
+                    found.append(other)
+                    other = self.nextInCell[other]
+        found.sort()
+        return found
+
+    def overlaps(self, a, b):
+        cs = self.cellSize
+        return abs(self.x[a] - self.x[b]) < cs and abs(self.y[a] - self.y[b]) < cs
+
+    # ---------
+    # MOVEMENT
+    def moveDirection(self, row, vForward, vStrafe, vtheta, direction=None):
+        # Move this item relative to the direction it (or the given direction) faces
+        if (
+            direction is None
+        ):  # if no direction given, use the current direction it is facing
+            direction = round(self.direction[row])
+        vx, vy = 0, 0  # convert to global vx and vy based on direction
+        match direction % 4:
+            case 0:  # right
+                vx, vy = vForward, vStrafe
+            case 2:  # left
+                vx, vy = vForward * -1, vStrafe * -1
+            case 1:  # down
+                vx, vy = -1 * vStrafe, vForward
+            case 3:  # up
+                vx, vy = vStrafe, vForward * -1
+        self.move(row, vx, vy, vtheta)
+
+    def move(self, row, vX, vY, vtheta):
+        # move in a global frame, vX and vY are in cells
+        cs = self.cellSize
+        # positions are whole pixels, rounded the same way pygame rounds rect positions
+        self.x[row] = math.floor(self.x[row] + vX * cs + 0.5)
+        self.y[row] = math.floor(self.y[row] + vY * cs + 0.5)
+        d = self.direction[row] + vtheta
+        self.direction[row] = 4 + d if d < 0 else d - 4 if d > 4 else d
+        self.relink(row)
+        note = self.held[row]
+        if note >= 0:  # keep an intaked note with the robot
+            self.x[note] = self.x[row]
+            self.y[note] = self.y[row]
+        self.checkCollisions(row, vX, vY)
+
+    def checkCollisions(self, row, vx, vy):
+        # Pushes, intakes or backs away from anything this row now overlaps
+        kind, flags = self.kind, self.flags
+        for other in self.near(row):
+            # skip itself, and a robot that is shooting so its note can leave it
+            if other == row:
+                continue
+            if kind[row] == NOTE and kind[other] == ROBOT and flags[other] & SHOOTING:
+                continue
+            if not flags[other] & VISIBLE or not self.overlaps(row, other):
+                continue
+            if kind[other] == NOTE:
+                # a robot with its intake on and nothing in it picks up a note once the note reaches its center
+                if (
+                    kind[row] == ROBOT
+                    and flags[row] & INTAKE
+                    and kind[other] == NOTE
+                    and self.held[row] < 0
+                ):
+                    cs = self.cellSize
+                    centerX = self.x[row] + cs // 2
+                    centerY = self.y[row] + cs // 2
+                    if (
+                        self.x[other] <= centerX < self.x[other] + cs
+                        and self.y[other] <= centerY < self.y[other] + cs
+                    ):
+                        self.held[row] = other
+                        self.hide(other)
+                else:  # otherwise push it along
+                    self.move(other, vx, vy, 0)
+            else:  # obstacles and other robots can't be pushed, so back away
+                self.move(row, -1 * vx, -1 * vy, 0)
+                if self.onBlocked:
+                    self.onBlocked(row)
+
+    def setIntake(self, row, on):
+        if on:
+            self.flags[row] |= INTAKE
+        else:
+            self.flags[row] &= ~INTAKE & 0xFF
+
+    def setShooting(self, row, on):
+        if on:
+            self.flags[row] |= SHOOTING
+        else:
+            self.flags[row] &= ~SHOOTING & 0xFF
+
+    def hide(self, row):
+        self.flags[row] &= ~VISIBLE & 0xFF
+        self.unlink(row)
+
+    def show(self, row):
+        if not self.flags[row] & VISIBLE:
+            self.flags[row] |= VISIBLE
+            self.link(row)
+
+    def snapToGrid(self, robot=None):
+        # snap every item on the field to whole cells
+        # given a robot, only that robot and the notes are snapped so other robots can finish their moves
+        cs = self.cellSize
+        kind = self.kind
+        for row in range(len(kind)):
+            if robot is not None and kind[row] == ROBOT and row != robot:
+                continue
+            if self.flags[row] & VISIBLE:
+                self.x[row] = round(self.x[row] / cs) * cs
+                self.y[row] = round(self.y[row] / cs) * cs
+                self.relink(row)
+
+    # ---------
+    # SNAPSHOTS
+    def snapshot(self):
+        # copies of every column, cheap enough to take before each run
+        return (
+            self.kind[:],
+            self.x[:],
+            self.y[:],
+            self.direction[:],
+            self.flags[:],
+            self.held[:],
+        )
+
+    def restore(self, snapshot):
+        # puts the field back to a snapshot in place
+        kind, x, y, direction, flags, held = snapshot
+        self.kind[:] = kind
+        self.x[:] = x
+        self.y[:] = y
+        self.direction[:] = direction
+        self.flags[:] = flags
+        self.held[:] = held
+        self.robotRows = None
+        del self.nextInCell[len(kind) :]
+        del self.slot[len(kind) :]
+        self.nextInCell.extend(array("i", [-1]) * (len(kind) - len(self.nextInCell)))
+        self.slot.extend(array("i", [UNLINKED]) * (len(kind) - len(self.slot)))
+        self.buildGrid()
+
+    def nbytes(self):
+        # memory used by the columns and the grid
+        columns = (
+            self.kind,
+            self.x,
+            self.y,
+            self.direction,
+            self.flags,
+            self.held,
+            self.grid,
+            self.nextInCell,
+            self.slot,
+        )
+        return sum(len(c) * c.itemsize for c in columns)
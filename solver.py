@@ -0,0 +1,257 @@
+"""
+Solver:
+
+    Searches for a short block program that picks up and shoots every note on a field, for reference solutions and
+    to check that a field can be solved before it is used in class.
+
+    python solver.py                        solve simSetup.txt for the first robot
+    python solver.py field.txt --robot 2 --seconds 10
+
+    The search is best first over grid states (cell, direction, intake, held note, notes left): the state with the
+    fewest blocks so far plus a lower bound on the blocks still needed is expanded next, so the first program found
+    uses the fewest blocks (ties go to the shortest run time). A state already reached with fewer blocks is skipped.
+    It stops after the time budget.
+
+    Moves go the way the analysis (analysis.py) follows them: obstacles and other robots stop the robot, a note is
+    picked up when the intake is on and the robot holds nothing. Programs never push a note, never shoot into
+    anything and never drive over a note they shot, so the sim does what the solver planned. Repeated runs of
+    blocks are folded into loops.
+"""
+
+import argparse
+import heapq
+import time
+
+from analysis import (
+    forwardSteps,
+    moveBlocks,
+    shotDistance,
+    simDuration,
+    strafeSteps,
+    tickSeconds,
+    turnBlocks,
+)
+from simField import NOTE, OBSTACLE, ROBOT, kindCodes
+
+maxMove = 10  # the largest item of a move block
+margin = 2  # cells the robot may drive outside the items on the field
+
+
+class Solution:
+    # The program found for a field, blocks is None if the field wasn't solved within the budget
+    def __init__(self, blocks, ticks, expanded, seconds):
+        self.blocks = blocks  # (name, item) and ("Loop", count, body) entries
+        self.ticks = ticks
+        self.expanded = expanded  # states searched
+        self.seconds = seconds  # time the search took
+
+    @property
+    def solved(self):
+        return self.blocks is not None
+
+    def blockCount(self):
+        # blocks the program takes in the editor, a loop counts its Loop and EndLoop
+        def count(blocks):
+            return sum(count(b[2]) + 2 if b[0] == "Loop" else 1 for b in blocks)
+
+        return count(self.blocks or [])
+
+    def lines(self, indent=""):
+        # one line per block, loop bodies indented
+        def walk(blocks, indent):
+            for block in blocks:
+                if block[0] == "Loop":
+                    yield f"{indent}Loop {block[1]}x"
+                    yield from walk(block[2], indent + "    ")
+                    yield f"{indent}EndLoop"
+                else:
+                    name, item = block
+                    yield f"{indent}{name} {item}" if item else f"{indent}{name}"
+
+        return list(walk(self.blocks or [], indent))
+
+
+def fieldProblem(kinds, xs, ys, directions, cellSize, robot):
+    # the obstacles, notes and robot start (cell x, cell y, direction) of one robot on a field
+    # the other robots count as obstacles
+    obstacles, notes = set(), set()
+    for row in range(len(kinds)):
+        cell = (xs[row] // cellSize, ys[row] // cellSize)
+        if kinds[row] == NOTE:
+            notes.add(cell)
+        elif kinds[row] == OBSTACLE or kinds[row] == ROBOT and row != robot:
+            obstacles.add(cell)
+    start = (xs[robot] // cellSize, ys[robot] // cellSize, round(directions[robot]))
+    return frozenset(obstacles), frozenset(notes), start
+
+
+def lowerBound(state):
+    # blocks still needed at least: every note left needs a move onto it and a shot, a held note a shot,
+    # and the intake has to be turned on
+    x, y, direction, intake, held, notes, landed = state
+    return 2 * len(notes) + held + (1 if notes and not intake else 0)
+
+
+def successors(state, obstacles, bounds):
+    # (name, item, ticks, next state) for every block that can run from a state
+    x, y, direction, intake, held, notes, landed = state
+    left, top, right, bottom = bounds
+    for name, (forward, strafe) in moveBlocks.items():
+        fx, fy = forwardSteps[direction]
+        sx, sy = strafeSteps[direction]
+        dx, dy = forward * fx + strafe * sx, forward * fy + strafe * sy
+        cx, cy, h, n = x, y, held, notes
+        for item in range(1, maxMove + 1):
+            cx, cy = cx + dx, cy + dy
+            cell = (cx, cy)
+            if not (left <= cx <= right and top <= cy <= bottom):
+                break
+            if cell in obstacles or cell in landed:
+                break
+            if cell in n:
+                if not intake or h:
+                    break  # would push the note
+                h = True
+                n = n - {cell}
+            yield name, item, 50 * item, (cx, cy, direction, intake, h, n, landed)
+    for name, turn in turnBlocks.items():
+        for item in (1, 2):
+            turned = (x, y, (direction + turn * item) % 4, intake, held, notes, landed)
+            yield name, item, 45 * item, turned
+    if intake:
+        yield "IntakeStop", 0, 1, (x, y, direction, False, held, notes, landed)
+    else:
+        yield "IntakeStart", 0, 1, (x, y, direction, True, held, notes, landed)
+    if held:
+        # only shoot where the note can fly without hitting anything
+        fx, fy = forwardSteps[direction]
+        flight = [(x + fx * i, y + fy * i) for i in range(1, shotDistance + 1)]
+        if not any(c in obstacles or c in notes or c in landed for c in flight):
+            shot = (x, y, direction, intake, False, notes, landed | {flight[-1]})
+            yield "Shoot", 0, 50, shot
+
+
+def solve(obstacles, notes, start, seconds=5.0):
+    # best first search for the fewest blocks that shoot every note, None blocks if not found in time
+    began = time.perf_counter()
+    cells = list(obstacles) + list(notes) + [start[:2]]
+    bounds = (
+        min(c[0] for c in cells) - margin,
+        min(c[1] for c in cells) - margin,
+        max(c[0] for c in cells) + margin,
+        max(c[1] for c in cells) + margin,
+    )
+    first = start + (False, False, frozenset(notes), frozenset())
+    best = {first: (0, 0)}  # state -> (blocks, ticks) of the cheapest way found to it
+    came = {first: None}  # state -> (previous state, name, item)
+    queue = [(lowerBound(first), 0, 0, 0, first)]
+    expanded = pushed = 0
+    while queue:
+        if expanded % 256 == 0 and time.perf_counter() - began > seconds:
+            break
+        _, ticks, blocks, _, state = heapq.heappop(queue)
+        if best[state] < (blocks, ticks):
+            continue  # already reached for less
+        if not state[5] and not state[4]:
+            return Solution(
+                fold(path(came, state)),
+                ticks,
+                expanded,
+                time.perf_counter() - began,
+            )
+        expanded += 1
+        for name, item, cost, nextState in successors(state, obstacles, bounds):
+            cost = (blocks + 1, ticks + max(cost, simDuration))
+            if nextState in best and best[nextState] <= cost:
+                continue
+            best[nextState] = cost
+            came[nextState] = (state, name, item)
+            # pushed breaks ties, states themselves can't be ordered
+            pushed += 1
+            heapq.heappush(
+                queue,
+                (cost[0] + lowerBound(nextState), cost[1], cost[0], pushed, nextState),
+            )
+    return Solution(None, 0, expanded, time.perf_counter() - began)
+
+
+def path(came, state):
+    # the blocks that lead to a state
+    blocks = []
+    while came[state]:
+        state, name, item = came[state]
+        blocks.append((name, item))
+    blocks.reverse()
+    return blocks
+
+
+def fold(blocks):
+    # replaces runs of the same blocks repeated one after another with a loop, when it takes fewer blocks
+    folded = []
+    i = 0
+    while i < len(blocks):
+        bestSaved, bestLength, bestCount = 0, 0, 0
+        for length in range(1, (len(blocks) - i) // 2 + 1):
+            body = blocks[i : i + length]
+            count = 1
+            while blocks[i + count * length : i + (count + 1) * length] == body:
+                count += 1
+            # a loop costs a Loop and an EndLoop block and holds at most 10 repeats
+            count = min(count, 10)
+            saved = length * (count - 1) - 2
+            if saved > bestSaved:
+                bestSaved, bestLength, bestCount = saved, length, count
+        if bestSaved > 0:
+            folded.append(("Loop", bestCount, blocks[i : i + bestLength]))
+            i += bestLength * bestCount
+        else:
+            folded.append(blocks[i])
+            i += 1
+    return folded
+
+
+def solveField(field, robot=0, seconds=5.0):
+    # solve a SimField for the robot at a row
+    return solve(
+        *fieldProblem(
+            field.kind, field.x, field.y, field.direction, field.cellSize, robot
+        ),
+        seconds,
+    )
+
+
+def main():
+    from fieldSetup import readField
+    from simField import SimField
+
+    parser = argparse.ArgumentParser(
+        description="Find a block program that shoots every note"
+    )
+    parser.add_argument("filename", nargs="?", default="simSetup.txt")
+    parser.add_argument(
+        "--robot", type=int, default=1, help="which robot, 1 is the first"
+    )
+    parser.add_argument("--seconds", type=float, default=5.0, help="time budget")
+    args = parser.parse_args()
+    entities = readField(args.filename, kindCodes)
+    field = SimField.fromEntities(entities)
+    robots = field.robots()
+    if not 1 <= args.robot <= len(robots):
+        parser.error(f"{args.filename} has {len(robots)} robot(s)")
+    solution = solveField(field, robots[args.robot - 1], args.seconds)
+    if not solution.solved:
+        print(
+            f"No program found in {args.seconds:g}s ({solution.expanded} states searched)"
+        )
+        return 1
+    for line in solution.lines():
+        print(line)
+    print(
+        f"{solution.blockCount()} blocks, {solution.ticks * tickSeconds:.1f}s of auto, "
+        f"found in {solution.seconds:.2f}s ({solution.expanded} states searched)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
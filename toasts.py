@@ -0,0 +1,132 @@
+"""
+Toasts:
+
+    The warning and success messages over the editor. Each message is drawn once onto its own surface (background,
+    wrapped text and repeat counter together), so showing it is a single blit per frame, even while the sim runs.
+
+    A message that is already showing isn't added again: its counter goes up ("x3") and its timer starts over.
+    At most limit messages show at once, a new one pushes out the oldest. Messages go away by themselves after
+    their lifetime, or when clicked.
+"""
+
+import time
+
+import pygame
+
+WARNING = "warning"
+SUCCESS = "success"
+colors = {WARNING: (200, 45, 50, 200), SUCCESS: (45, 200, 50, 200)}
+lifetimes = {WARNING: 10.0, SUCCESS: 4.0}  # seconds a message shows
+limit = 5  # messages showing at once
+width = 500
+padding = 10  # around the text
+lineHeight = 30
+gap = 20  # between messages
+
+
+class Toast:
+    # One message and the surface it is drawn on
+    def __init__(self, kind, content):
+        self.kind = kind
+        self.content = content
+        self.count = 1
+        self.surface = None  # drawn by Toasts.composite
+        self.rect = pygame.Rect(0, 0, width, 0)
+        self.expires = 0.0
+
+
+class Toasts:
+    # The messages showing, newest last
+    def __init__(self, font, pose=(400, 200)):
+        self.font = font
+        self.pose = pose  # top left of the first message
+        self.showing = []
+
+    def warn(self, content):
+        self.add(WARNING, content)
+
+    def succeed(self, content):
+        self.add(SUCCESS, content)
+
+    def add(self, kind, content):
+        now = time.monotonic()
+        for toast in self.showing:
+            if toast.kind == kind and toast.content == content:
+                toast.count += 1
+                toast.surface = None  # drawn again with the new count
+                break
+        else:
+            toast = Toast(kind, content)
+            self.showing.append(toast)
+            del self.showing[:-limit]
+        toast.expires = now + lifetimes[kind]
+        self.layout()
+
+    def has(self, kind):
+        # if any message of a kind is showing
+        return any(toast.kind == kind for toast in self.showing)
+
+    def contains(self, content):
+        return any(toast.content == content for toast in self.showing)
+
+    def clear(self, kind=None):
+        # removes every message, or every message of a kind
+        self.showing = [t for t in self.showing if kind and t.kind != kind]
+        self.layout()
+
+    def click(self, pos):
+        # removes the message at pos, returns if there was one
+        for toast in self.showing:
+            if toast.rect.collidepoint(pos):
+                self.showing.remove(toast)
+                self.layout()
+                return True
+        return False
+
+    def expire(self):
+        # once per frame, removes the messages whose time is up
+        now = time.monotonic()
+        if any(toast.expires <= now for toast in self.showing):
+            self.showing = [t for t in self.showing if t.expires > now]
+            self.layout()
+
+    def layout(self):
+        # stacks the messages below each other, only when they change
+        x, y = self.pose
+        for toast in self.showing:
+            if toast.surface is None:
+                self.composite(toast)
+            toast.rect.topleft = (x, y)
+            y = toast.rect.bottom + gap
+
+    def composite(self, toast):
+        # draws the background, text and counter of a message onto its surface
+        content = toast.content
+        if toast.count > 1:
+            content += f" (x{toast.count})"
+        lines = self.wrap(content, width - 2 * padding)
+        toast.rect.height = len(lines) * lineHeight + 2 * padding
+        toast.surface = pygame.Surface(toast.rect.size, pygame.SRCALPHA)
+        toast.surface.fill(colors[toast.kind])
+        for i, line in enumerate(lines):
+            text = self.font.render(line, True, (0, 0, 0))
+            center = (width // 2, padding + i * lineHeight + lineHeight // 2)
+            toast.surface.blit(text, text.get_rect(center=center))
+
+    def wrap(self, content, space):
+        # splits the content into lines that fit into space pixels, a word too long for a line gets its own
+        lines = []
+        line = ""
+        for word in content.split(" "):
+            longer = f"{line} {word}" if line else word
+            if line and self.font.size(longer)[0] > space:
+                lines.append(line)
+                line = word
+            else:
+                line = longer
+        lines.append(line)
+        return lines
+
+    def draw(self, surf):
+        for toast in self.showing:
+            surf.blit(toast.surface, toast.rect)
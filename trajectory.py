@@ -0,0 +1,265 @@
+"""
+Trajectories:
+
+    A second way to export a program (Shift+click the java icon): instead of one command per block, where the robot
+    stops at the end of every block, the blocks of a sequence are driven as one continuous path with a velocity and
+    acceleration limited profile, given to the robot as a single FollowTrajectory command.
+
+    The path is the one the sim drives, worked out the same way as the analysis (analysis.py): moves in a row that
+    go the same way on the field become one straight piece, the robot stops where the path turns a corner, turns
+    in place for Turn blocks and stands still for as long as a shot takes. IntakeStart, IntakeStop and Shoot become
+    events at the time the robot gets to their place on the path. Parallel groups still run as commands, a new
+    trajectory starts after them.
+
+    new FollowTrajectory(new double[][] {{t, x, y, heading, speed}, ...}, new TrajectoryEvent(t, new Shoot()), ...)
+
+    States are every sampleSeconds and at the end of every piece: t in seconds from the start of the trajectory,
+    x and y in field cells like the sim (y down), heading in degrees clockwise from +x (the sim's direction * 90)
+    and speed in cells per second along the path.
+"""
+
+import math
+
+from analysis import State, moveBlocks, tickSeconds, turnBlocks
+
+maxSpeed = 2.0  # cells per second
+maxAcceleration = 3.0  # cells per second squared
+maxTurnRate = 180.0  # degrees per second
+maxTurnAcceleration = 360.0  # degrees per second squared
+shootSeconds = (
+    50 * tickSeconds
+)  # the robot stands still while a note is shot, as long as in the sim
+sampleSeconds = 0.1
+events = ("IntakeStart", "IntakeStop", "Shoot")
+
+
+def profile(distance, speed, acceleration):
+    # trapezoid profile from standing to standing: (duration, position(t), speed(t))
+    if distance <= 0:
+        return 0.0, lambda t: 0.0, lambda t: 0.0
+    rampTime = speed / acceleration
+    rampDistance = acceleration * rampTime**2 / 2
+    if 2 * rampDistance > distance:
+        # never gets to full speed
+        rampTime = math.sqrt(distance / acceleration)
+        rampDistance = distance / 2
+        speed = acceleration * rampTime
+    cruiseTime = (distance - 2 * rampDistance) / speed
+    duration = 2 * rampTime + cruiseTime
+
+    def position(t):
+        t = max(0.0, min(t, duration))
+        if t < rampTime:
+            return acceleration * t * t / 2
+        if t < rampTime + cruiseTime:
+            return rampDistance + speed * (t - rampTime)
+        left = duration - t
+        return distance - acceleration * left * left / 2
+
+    def velocity(t):
+        t = max(0.0, min(t, duration))
+        return min(speed, acceleration * t, acceleration * (duration - t))
+
+    return duration, position, velocity
+
+
+class Piece:
+    # One part of a trajectory: a straight drive, a turn in place or a wait, starting and ending standing still
+    def __init__(self, start, end):
+        self.start = start  # (x, y, heading) in cells and degrees
+        self.end = end
+        self.wait = 0.0  # seconds of standing still after the motion
+        self.marks = []  # (cells along the drive, event) for events on the way
+
+    def build(self):
+        # works out the profile, after the piece is finished
+        (x0, y0, h0), (x1, y1, h1) = self.start, self.end
+        self.distance = math.hypot(x1 - x0, y1 - y0)
+        if self.distance:
+            motion = profile(self.distance, maxSpeed, maxAcceleration)
+        else:
+            motion = profile(abs(h1 - h0), maxTurnRate, maxTurnAcceleration)
+        self.motionTime, self.position, self.speed = motion
+        self.duration = self.motionTime + self.wait
+
+    def timeAt(self, distance):
+        # seconds into the piece when the robot is distance cells along it
+        low, high = 0.0, self.motionTime
+        for _ in range(40):
+            middle = (low + high) / 2
+            if self.position(middle) < distance:
+                low = middle
+            else:
+                high = middle
+        return high
+
+    def state(self, t):
+        # (x, y, heading, speed) t seconds into the piece
+        (x0, y0, h0), (x1, y1, h1) = self.start, self.end
+        if self.distance:
+            f = self.position(t) / self.distance
+            return x0 + (x1 - x0) * f, y0 + (y1 - y0) * f, h0, self.speed(t)
+        total = h1 - h0
+        f = self.position(t) / abs(total) if total else 1.0
+        return x0, y0, h0 + total * f, 0.0
+
+
+class Trajectory:
+    # The pieces of one run of blocks and the events on it
+    def __init__(self, x, y, direction):
+        self.pieces = []
+        self.pose = (x, y, direction * 90.0)
+        self.pending = []  # events at the current pose, put on the next piece
+        self.events = []  # (seconds, block name), after build
+
+    def piece(self):
+        # a new piece starting where the last one ended
+        piece = Piece(self.pose, self.pose)
+        piece.marks = [(0.0, name) for name in self.pending]
+        self.pending = []
+        self.pieces.append(piece)
+        return piece
+
+    def drive(self, x, y):
+        # drive straight to a cell, joined to the last piece if that one drives the same way
+        last = self.pieces[-1] if self.pieces else None
+        x0, y0, heading = self.pose
+        step = (sign(x - x0), sign(y - y0))
+        if step == (0, 0):
+            return
+        if (
+            last
+            and last.end == self.pose
+            and not last.wait
+            and last.start[2] == heading
+        ):
+            lx, ly = last.end[0] - last.start[0], last.end[1] - last.start[1]
+            if (lx or ly) and (sign(lx), sign(ly)) == step:
+                done = math.hypot(lx, ly)
+                last.marks += [(done, name) for name in self.pending]
+                self.pending = []
+                last.end = (x, y, heading)
+                self.pose = last.end
+                return
+        piece = self.piece()
+        piece.end = self.pose = (x, y, heading)
+
+    def turn(self, degrees):
+        piece = self.piece()
+        x, y, heading = self.pose
+        piece.end = self.pose = (x, y, heading + degrees)
+
+    def shoot(self):
+        self.pending.append("Shoot")
+        piece = self.piece()
+        piece.wait = shootSeconds
+
+    def event(self, name):
+        self.pending.append(name)
+
+    def build(self):
+        # profiles every piece and places the events, returns the states
+        if self.pending:
+            self.piece()
+        states = []
+        began = 0.0
+        for piece in self.pieces:
+            piece.build()
+            for distance, name in piece.marks:
+                self.events.append((began + piece.timeAt(distance), name))
+            steps = max(math.ceil(piece.duration / sampleSeconds), 1)
+            for i in range(steps + 1):
+                if i == 0 and states:
+                    continue  # the end of the piece before
+                t = min(i * sampleSeconds, piece.duration)
+                states.append((began + t,) + piece.state(t))
+            began += piece.duration
+        self.duration = began
+        return states
+
+    def java(self):
+        states = self.build()
+        rows = ", ".join(
+            "{" + ", ".join(f"{value:.3f}".rstrip("0").rstrip(".") for value in s) + "}"
+            for s in states
+        )
+        events = "".join(
+            f", new TrajectoryEvent({t:.3f}, new {name}())" for t, name in self.events
+        )
+        return f"new FollowTrajectory(new double[][] {{{rows}}}{events})"
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+def sequence(block):
+    # the blocks a chain runs, in order, loops written out, up to the end of the group it is in
+    while block is not None and str(block) not in ("EndParallelGroup", "EndLoop"):
+        name = str(block)
+        if name == "Loop":
+            if block.children:
+                for _ in range(block.item):
+                    yield from sequence(block.children[0])
+            block = block.otherChild
+        elif name == "ParallelGroup":
+            yield block
+            block = block.otherChild
+        else:
+            if name != "Start":
+                yield block
+            block = block.children[0] if block.children else None
+
+
+def groupCommand(group):
+    # a parallel group on its own, like ParallelObject.command without the blocks after it
+    sides = [
+        f"new SequentialCommandGroup({child.command()})"
+        for child in group.children
+        if str(child) != "EndParallelGroup"
+    ]
+    return f"new ParallelCommandGroup({', '.join(sides)})"
+
+
+def trajectoryCommand(start, analyzer, x, y, direction):
+    # the java for the program below a Start block with its runs of blocks as trajectories
+    # analyzer has the field set (Analyzer.setField), the robot starts at cell x, y facing direction
+    # returns (java, seconds the program takes)
+    state = State(x, y, round(direction), False, False, analyzer.notes)
+    commands = []
+    run = None
+    seconds = 0.0
+    for block in sequence(start):
+        name = str(block)
+        if name == "ParallelGroup":
+            if run:
+                commands.append(run.java())
+                seconds += run.duration
+                run = None
+            result = analyzer.parallel(block, state)
+            commands.append(groupCommand(block))
+            seconds += result.ticks * tickSeconds
+            state = result.state
+            continue
+        if run is None:
+            run = Trajectory(state.x, state.y, state.direction)
+        result = analyzer.block(block, state)
+        if result is None:
+            continue
+        after = result.state
+        if name in moveBlocks:
+            # to where the analysis stops, short of an obstacle like in the sim
+            run.drive(after.x, after.y)
+        elif name in turnBlocks:
+            run.turn(turnBlocks[name] * block.item * 90.0)
+        elif name == "Shoot":
+            run.shoot()
+        elif name in events:
+            run.event(name)
+        state = after
+    if run:
+        commands.append(run.java())
+        seconds += run.duration
+    if not commands:
+        return "", 0.0
+    return f"new SequentialCommandGroup({', '.join(commands)});", seconds
@@ -0,0 +1,426 @@
+"""
+Vectorized Simulation:
+
+    Runs many block programs at once on the same field, one lane per program, so a whole class's routines can be
+    compared in one go. Every lane has its own robot and notes stored as NumPy arrays, and each tick moves every
+    lane together. Obstacles never move, so all lanes check them in one shared occupancy grid.
+
+    Programs are compiled from their entries (programs.py, the same lists the grader is sent) into segments: a
+    number of ticks with a constant forward/strafe/turn speed, things that happen on the first tick (intake on/off,
+    shoot) and whether the field is snapped to the grid on the last tick. A tick is one call of runSim in the
+    interactive sim, a block takes the same number of ticks here as it does there (without the wall clock delay
+    between blocks).
+
+    sim = VectorSim(field, [compileProgram(start) for start in programs])
+    sim.run()
+    sim.results()  # final cell, direction, shots and bumps of every lane
+
+    Needs numpy (pip install numpy), the interactive editor does not.
+"""
+
+import numpy as np
+
+from programs import entriesOf
+from simField import NOTE, OBSTACLE
+
+simDuration = 50  # the least ticks a block takes, same as main.simDuration
+# things a segment does on its first tick
+INTAKE_ON = 1
+INTAKE_OFF = 2
+SHOOT = 4
+shotDistance = 4  # cells a shot note travels
+shotTime = 50  # ticks it takes to get there
+margin = 2  # empty cells around the field in the grid
+# direction (0-right,1-down,2-left,3-up) -> how forward and strafe speeds turn into global x and y
+forwardX = np.array([1, 0, -1, 0])
+forwardY = np.array([0, 1, 0, -1])
+strafeX = np.array([0, -1, 0, 1])
+strafeY = np.array([1, 0, -1, 0])
+
+
+# ---------
+# COMPILING
+# a segment is (ticks, forward, strafe, turn, events, snap), speeds are per tick
+def blockSegments(name, item):
+    # the segments of one ordinary block, the same timing as its runSim
+    match name:
+        case "MoveForward" | "MoveBackward" | "MoveLeft" | "MoveRight":
+            ticks = 50 * item
+            speed = item / ticks
+            forward = {"MoveForward": speed, "MoveBackward": -speed}.get(name, 0)
+            strafe = {"MoveRight": speed, "MoveLeft": -speed}.get(name, 0)
+            segments = [(ticks, forward, strafe, 0, 0, False)]
+        case "TurnLeft" | "TurnRight":
+            ticks = 45 * item
+            turn = item / ticks if name == "TurnRight" else -item / ticks
+            segments = [(ticks, 0, 0, turn, 0, False)]
+        case "IntakeStart":
+            segments = [(1, 0, 0, 0, INTAKE_ON, False)]
+        case "IntakeStop":
+            segments = [(1, 0, 0, 0, INTAKE_OFF, False)]
+        case "Shoot":
+            segments = [(1, 0, 0, 0, SHOOT, False)]
+        case _:
+            raise ValueError(f"can't simulate a {name} block")
+    # pad to the least duration of a block and snap to the grid at the end
+    used = sum(s[0] for s in segments)
+    if used < simDuration:
+        segments.append((simDuration - used, 0, 0, 0, 0, False))
+    segments[-1] = segments[-1][:5] + (True,)
+    return segments
+
+
+def mergeSegments(first, second):
+    # runs two segment lists at the same time, like the two sides of a parallel group
+    # speeds add up, a segment is split wherever either side changes
+    merged = []
+    a, b = list(first), list(second)
+    while a and b:
+        ticks = min(a[0][0], b[0][0])
+        merged.append(
+            (
+                ticks,
+                a[0][1] + b[0][1],
+                a[0][2] + b[0][2],
+                a[0][3] + b[0][3],
+                a[0][4] | b[0][4],
+                ticks == a[0][0] and a[0][5] or ticks == b[0][0] and b[0][5],
+            )
+        )
+        # what is left of the longer segment starts after the events have happened
+        for side in (a, b):
+            if side[0][0] == ticks:
+                side.pop(0)
+            else:
+                side[0] = (side[0][0] - ticks,) + side[0][1:4] + (0, side[0][5])
+    return merged + a + b
+
+
+def compileProgram(start):
+    # the segments of the program below a Start block, read the same way as programs sent to the grader
+    return compileEntries(entriesOf(start))
+
+
+def compileEntries(entries, limit=None):
+    # segments of a program sent as entries (grader.py): [name, item], ["Loop", count, body] and
+    # ["ParallelGroup", side, side]; with limit, stops once the program takes that many ticks
+    segments = []
+    ticks = 0
+    for entry in entries:
+        if limit is not None and ticks >= limit:
+            break
+        name = entry[0]
+        if name == "Loop":
+            body = compileEntries(entry[2], limit)
+            count = entry[1]
+            bodyTicks = sum(s[0] for s in body)
+            if limit is not None and bodyTicks:
+                count = min(count, -(-(limit - ticks) // bodyTicks))
+            added = body * count
+        elif name == "ParallelGroup":
+            added = []
+            for side in entry[1:]:
+                added = mergeSegments(added, compileEntries(side, limit))
+        else:
+            added = blockSegments(name, entry[1])
+        segments += added
+        ticks += sum(s[0] for s in added)
+    return segments
+
+
+# ---------
+# SIMULATION
+class VectorSim:
+    # Steps one lane per program, every lane starts from the same field
+    def __init__(self, field, programs, robot=0):
+        self.cellSize = cs = field.cellSize
+        lanes = len(programs)
+        self.lanes = lanes
+        # programs packed into (lane, segment) arrays, short programs padded with empty segments
+        count = max([len(p) for p in programs] + [1])
+        self.segCount = np.array([len(p) for p in programs], dtype=np.int64)
+        self.segTicks = np.zeros((lanes, count + 1), dtype=np.int64)
+        self.segForward = np.zeros((lanes, count + 1))
+        self.segStrafe = np.zeros((lanes, count + 1))
+        self.segTurn = np.zeros((lanes, count + 1))
+        self.segEvents = np.zeros((lanes, count + 1), dtype=np.uint8)
+        self.segSnap = np.zeros((lanes, count + 1), dtype=bool)
+        for lane, program in enumerate(programs):
+            if program:
+                ticks, forward, strafe, turn, events, snap = zip(*program)
+                n = len(program)
+                self.segTicks[lane, :n] = ticks
+                self.segForward[lane, :n] = forward
+                self.segStrafe[lane, :n] = strafe
+                self.segTurn[lane, :n] = turn
+                self.segEvents[lane, :n] = events
+                self.segSnap[lane, :n] = snap
+        self.segment = np.zeros(lanes, dtype=np.int64)  # current segment of each lane
+        self.left = self.segTicks[:, 0].copy()  # ticks left in the current segment
+        self.lane = np.arange(lanes)
+
+        # one grid for every lane, sized around the field with an empty margin
+        # positions off the grid count as the nearest edge cell, the margin keeps edge cells free of obstacles
+        rows = range(len(field))
+        cells = [(field.x[r] // cs, field.y[r] // cs) for r in rows] or [(0, 0)]
+        self.gridX = min(c[0] for c in cells) - margin
+        self.gridY = min(c[1] for c in cells) - margin
+        gridW = max(c[0] for c in cells) - self.gridX + margin + 1
+        gridH = max(c[1] for c in cells) - self.gridY + margin + 1
+        # obstacles never move, so every lane shares them
+        self.occupied = np.zeros((gridH, gridW), dtype=bool)
+        for r in rows:
+            if field.kind[r] == OBSTACLE:
+                self.occupied[cells[r][1] - self.gridY, cells[r][0] - self.gridX] = True
+
+        # the robot of every lane
+        self.x = np.full(lanes, field.x[robot], dtype=np.int64)
+        self.y = np.full(lanes, field.y[robot], dtype=np.int64)
+        self.direction = np.full(lanes, field.direction[robot])
+        self.intake = np.zeros(lanes, dtype=bool)
+        self.held = np.full(lanes, -1, dtype=np.int64)  # note column, -1 if none
+        # ticks spent backing off obstacles
+        self.bumps = np.zeros(lanes, dtype=np.int64)
+        self.shots = np.zeros(lanes, dtype=np.int64)
+        self.finished = np.full(lanes, -1, dtype=np.int64)  # tick each lane finished on
+
+        # every lane's own copy of the notes, one column per note
+        notes = [r for r in rows if field.kind[r] == NOTE]
+        self.noteX = np.tile(
+            np.array([field.x[r] for r in notes], dtype=np.int64), (lanes, 1)
+        )
+        self.noteY = np.tile(
+            np.array([field.y[r] for r in notes], dtype=np.int64), (lanes, 1)
+        )
+        self.noteVisible = np.ones((lanes, len(notes)), dtype=bool)
+        # visible notes in each cell of each lane and the sum of their columns, so a robot finds the note
+        # next to it without looking at every note (when a cell has one note, the sum is its column)
+        self.noteCount = np.zeros((lanes, gridH, gridW), dtype=np.int16)
+        self.noteSum = np.zeros((lanes, gridH, gridW), dtype=np.int32)
+        self.countNotes(*np.nonzero(self.noteVisible), 1)
+        # column of the note being shot
+        self.flying = np.full(lanes, -1, dtype=np.int64)
+        self.flyLeft = np.zeros(lanes, dtype=np.int64)  # ticks of flight left
+        self.tick = 0
+
+    def cellOf(self, x, y):
+        # grid cell (row, column) of pixel positions
+        cs = self.cellSize
+        h, w = self.occupied.shape
+        gy = np.minimum(np.maximum(y // cs - self.gridY, 0), h - 1)
+        gx = np.minimum(np.maximum(x // cs - self.gridX, 0), w - 1)
+        return gy, gx
+
+    def blocked(self, x, y):
+        # True where a box at pixel x,y overlaps an obstacle, checks the up to 4 cells it touches
+        cs = self.cellSize
+        top, left = self.cellOf(x, y)
+        bottom, right = self.cellOf(x + cs - 1, y + cs - 1)
+        occupied = self.occupied
+        return (
+            occupied[top, left]
+            | occupied[top, right]
+            | occupied[bottom, left]
+            | occupied[bottom, right]
+        )
+
+    def countNotes(self, lanes, columns, change):
+        # adds change to the note counts of the cells the given notes are in
+        gy, gx = self.cellOf(self.noteX[lanes, columns], self.noteY[lanes, columns])
+        np.add.at(self.noteCount, (lanes, gy, gx), change)
+        np.add.at(self.noteSum, (lanes, gy, gx), change * columns)
+
+    def done(self):
+        return self.segment >= self.segCount
+
+    def step(self):
+        # one tick of every lane that hasn't finished
+        cs = self.cellSize
+        active = ~self.done()
+        seg = self.segment
+        lane = self.lane
+        starting = active & (self.left == self.segTicks[lane, seg])
+        events = np.where(starting, self.segEvents[lane, seg], 0)
+        self.intake &= (events & INTAKE_OFF) == 0
+        self.intake |= (events & INTAKE_ON) != 0
+        # shooting sends the held note off in the direction the robot faces
+        shoot = ((events & SHOOT) != 0) & (self.held >= 0)
+        if shoot.any():
+            shooters = lane[shoot]
+            self.flying[shoot] = self.held[shoot]
+            self.flyLeft[shoot] = shotTime
+            self.noteVisible[shooters, self.held[shoot]] = True
+            self.countNotes(shooters, self.held[shoot], 1)
+            self.held[shoot] = -1
+            self.shots[shoot] += 1
+
+        # move the robots
+        facing = np.rint(self.direction).astype(np.int64) % 4
+        forward = np.where(active, self.segForward[lane, seg], 0)
+        strafe = np.where(active, self.segStrafe[lane, seg], 0)
+        vx = forward * forwardX[facing] + strafe * strafeX[facing]
+        vy = forward * forwardY[facing] + strafe * strafeY[facing]
+        oldX, oldY = self.x, self.y
+        self.x = np.floor(oldX + vx * cs + 0.5).astype(np.int64)
+        self.y = np.floor(oldY + vy * cs + 0.5).astype(np.int64)
+        d = self.direction + np.where(active, self.segTurn[lane, seg], 0)
+        self.direction = np.where(d < 0, d + 4, np.where(d > 4, d - 4, d))
+        # robots can't move into obstacles, they back off to where they were
+        bumped = self.blocked(self.x, self.y)
+        self.x = np.where(bumped, oldX, self.x)
+        self.y = np.where(bumped, oldY, self.y)
+        self.bumps += bumped
+        self.touchNotes(vx, vy)
+        self.flyNotes()
+
+        # finish segments, snapping to the grid where the block ends
+        self.left -= active
+        ended = active & (self.left == 0)
+        snap = ended & self.segSnap[lane, seg]
+        if snap.any():
+            self.snap(snap)
+        self.segment = seg + ended
+        self.left = np.where(ended, self.segTicks[lane, self.segment], self.left)
+        self.finished[ended & self.done()] = self.tick
+        self.tick += 1
+
+    def touchNotes(self, vx, vy):
+        # intake or push the notes each robot now overlaps, held notes ride along with the robot
+        cs = self.cellSize
+        carrying = self.held >= 0
+        self.noteX[self.lane[carrying], self.held[carrying]] = self.x[carrying]
+        self.noteY[self.lane[carrying], self.held[carrying]] = self.y[carrying]
+        lanes, columns = self.nearbyNotes()
+        if not len(lanes):
+            return
+        x, y = self.x[lanes], self.y[lanes]
+        noteX, noteY = self.noteX[lanes, columns], self.noteY[lanes, columns]
+        touching = (
+            (columns != self.flying[lanes])
+            & (np.abs(noteX - x) < cs)
+            & (np.abs(noteY - y) < cs)
+        )
+        # a robot with its intake on and nothing in it picks up a note once the note reaches its center
+        canIntake = (self.intake & (self.held < 0))[lanes]
+        centered = (
+            touching
+            & canIntake
+            & (noteX <= x + cs // 2)
+            & (x + cs // 2 < noteX + cs)
+            & (noteY <= y + cs // 2)
+            & (y + cs // 2 < noteY + cs)
+        )
+        if centered.any():
+            # the first note of each lane, pairs are in lane then column order
+            grabbers, first = np.unique(lanes[centered], return_index=True)
+            column = columns[centered][first]
+            self.countNotes(grabbers, column, -1)
+            self.held[grabbers] = column
+            self.noteVisible[grabbers, column] = False
+            self.noteX[grabbers, column] = self.x[grabbers]
+            self.noteY[grabbers, column] = self.y[grabbers]
+        # everything else it touches is pushed along
+        push = touching & ~canIntake
+        if push.any():
+            self.pushNotes(lanes[push], columns[push], vx[lanes[push]], vy[lanes[push]])
+
+    def nearbyNotes(self):
+        # (lane, column) of every visible note in the 3x3 cells around each robot, in lane then column order
+        top, left = self.cellOf(self.x - self.cellSize, self.y - self.cellSize)
+        bottom, right = self.cellOf(self.x + self.cellSize, self.y + self.cellSize)
+        lanes, columns = [], []
+        crowded = np.zeros(self.lanes, dtype=bool)
+        # cells at the edge of the grid can come up twice, that is fine since pairs are made unique below
+        for gy in (top, (top + bottom) // 2, bottom):
+            for gx in (left, (left + right) // 2, right):
+                count = self.noteCount[self.lane, gy, gx]
+                one = count == 1
+                lanes.append(self.lane[one])
+                columns.append(self.noteSum[self.lane[one], gy[one], gx[one]])
+                crowded |= count > 1
+        # cells with more than one note don't say which, look at every note of those lanes
+        if crowded.any():
+            crowdedLanes = self.lane[crowded]
+            rows, cols = np.nonzero(self.noteVisible[crowdedLanes])
+            lanes.append(crowdedLanes[rows])
+            columns.append(cols)
+        key = np.unique(
+            np.concatenate(lanes) * self.noteX.shape[1] + np.concatenate(columns)
+        )
+        return key // self.noteX.shape[1], key % self.noteX.shape[1]
+
+    def pushNotes(self, lanes, columns, vx, vy):
+        # moves notes by vx, vy cells, notes stop at obstacles
+        cs = self.cellSize
+        self.countNotes(lanes, columns, -1)
+        oldX = self.noteX[lanes, columns]
+        oldY = self.noteY[lanes, columns]
+        newX = np.floor(oldX + vx * cs + 0.5).astype(np.int64)
+        newY = np.floor(oldY + vy * cs + 0.5).astype(np.int64)
+        bumped = self.blocked(newX, newY)
+        self.noteX[lanes, columns] = np.where(bumped, oldX, newX)
+        self.noteY[lanes, columns] = np.where(bumped, oldY, newY)
+        self.countNotes(lanes, columns, 1)
+
+    def flyNotes(self):
+        # shot notes travel in the direction of the robot that shot them
+        flying = self.flyLeft > 0
+        if not flying.any():
+            return
+        lanes = self.lane[flying]
+        facing = np.rint(self.direction[flying]).astype(np.int64) % 4
+        speed = shotDistance / shotTime
+        self.pushNotes(
+            lanes,
+            self.flying[flying],
+            speed * forwardX[facing],
+            speed * forwardY[facing],
+        )
+        self.flyLeft[flying] -= 1
+        self.flying[self.flyLeft == 0] = -1
+
+    def snap(self, lanes):
+        # snap the robot and the notes of the given lanes to whole cells
+        cs = self.cellSize
+        self.x[lanes] = np.rint(self.x[lanes] / cs).astype(np.int64) * cs
+        self.y[lanes] = np.rint(self.y[lanes] / cs).astype(np.int64) * cs
+        # most notes are already on whole cells, only the others move
+        snapped = self.lane[lanes]
+        offGrid = (self.noteX[snapped] % cs != 0) | (self.noteY[snapped] % cs != 0)
+        rows, columns = np.nonzero(offGrid & self.noteVisible[snapped])
+        rows = snapped[rows]
+        if not len(rows):
+            return
+        self.countNotes(rows, columns, -1)
+        self.noteX[rows, columns] = (
+            np.rint(self.noteX[rows, columns] / cs).astype(np.int64) * cs
+        )
+        self.noteY[rows, columns] = (
+            np.rint(self.noteY[rows, columns] / cs).astype(np.int64) * cs
+        )
+        self.countNotes(rows, columns, 1)
+
+    def run(self, maxTicks=None):
+        # steps until every lane is finished (or maxTicks), returns the ticks run
+        start = self.tick
+        while not self.done().all():
+            if maxTicks is not None and self.tick - start >= maxTicks:
+                break
+            self.step()
+        return self.tick - start
+
+    def results(self):
+        # where every lane ended up, positions in cells
+        cs = self.cellSize
+        return [
+            {
+                "x": int(self.x[i]) / cs,
+                "y": int(self.y[i]) / cs,
+                "direction": float(self.direction[i]),
+                "holdingNote": bool(self.held[i] >= 0),
+                "shots": int(self.shots[i]),
+                "bumps": int(self.bumps[i]),
+                "finishedTick": int(self.finished[i]),
+            }
+            for i in range(self.lanes)
+        ]